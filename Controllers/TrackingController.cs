@@ -1,4 +1,5 @@
-﻿using ApiWebTrackerGanado.Dtos;
+﻿using ApiWebTrackerGanado.Data;
+using ApiWebTrackerGanado.Dtos;
 using ApiWebTrackerGanado.Interfaces;
 using Microsoft.AspNetCore.Authorization;
 using Microsoft.AspNetCore.Http;
@@ -11,11 +12,16 @@ namespace ApiWebTrackerGanado.Controllers
     [ApiController]
     public class TrackingController : ControllerBase
     {
+        // Maximum readings per request to tracker-data/batch
+        public const int MaxBatchSize = 1000;
+
         private readonly ITrackingService _trackingService;
+        private readonly CattleTrackingContext _context;
 
-        public TrackingController(ITrackingService trackingService)
+        public TrackingController(ITrackingService trackingService, CattleTrackingContext context)
         {
             _trackingService = trackingService;
+            _context = context;
         }
 
         [HttpPost("tracker-data")]
@@ -33,6 +39,53 @@ namespace ApiWebTrackerGanado.Controllers
             }
         }
 
+        [HttpPost("tracker-data/batch")]
+        [AllowAnonymous] // Emulators and gateways upload many readings in one request
+        public async Task<IActionResult> ReceiveTrackerDataBatch([FromBody] List<TrackerDataDto> trackerDataBatch)
+        {
+            if (trackerDataBatch == null || trackerDataBatch.Count == 0)
+                return BadRequest(new { success = false, message = "Expected a non-empty array" });
+
+            if (trackerDataBatch.Count > MaxBatchSize)
+                return StatusCode(StatusCodes.Status413PayloadTooLarge, new
+                {
+                    success = false,
+                    message = $"Batch has {trackerDataBatch.Count} readings, the maximum is {MaxBatchSize}",
+                    maxBatchSize = MaxBatchSize
+                });
+
+            var processed = 0;
+            var failedItems = new List<object>();
+
+            for (var index = 0; index < trackerDataBatch.Count; index++)
+            {
+                var trackerData = trackerDataBatch[index];
+                try
+                {
+                    await _trackingService.ProcessTrackerDataAsync(trackerData);
+                    processed++;
+                }
+                catch (Exception ex)
+                {
+                    // All items share the request's DbContext: drop the entities of the failed item,
+                    // otherwise every later SaveChanges in this batch retries them and fails too
+                    _context.ChangeTracker.Clear();
+                    failedItems.Add(new { index, deviceId = trackerData.DeviceId, error = ex.Message });
+                }
+            }
+
+            var result = new { success = failedItems.Count == 0, processed, failed = failedItems.Count, failedItems };
+            if (failedItems.Count == 0)
+                return Ok(result);
+
+            // Nothing was stored: a plain server error, so clients retry the whole batch
+            if (processed == 0)
+                return StatusCode(StatusCodes.Status500InternalServerError, result);
+
+            // 207: the body lists which readings were not stored (by index) so the client retries only those
+            return StatusCode(StatusCodes.Status207MultiStatus, result);
+        }
+
         [HttpGet("animal/{animalId}/current-location")]
         // [Authorize] // TODO: Re-enable authentication when implemented properly
         public async Task<ActionResult<LocationDto>> GetAnimalCurrentLocation(int animalId)
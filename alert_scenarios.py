@@ -0,0 +1,643 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Escenarios de alerta sobre los emuladores: latencia lectura -> alerta
+TrackingService.ProcessTrackerDataAsync guarda cada lectura y despues corre
+AlertService.CheckLocationAlertsAsync y CheckActivityAlertsAsync, pero los
+emuladores casi nunca cumplen esas reglas. Este script elige una fraccion del
+rebaño y le inyecta episodios en las lecturas antes de enviarlas:
+
+    breach         la posicion sale `--breach-m` metros fuera del limite de la granja
+                   (--boundary: FarmBoundaries via db:<farmId> / api:<farmId>, o un GeoJSON)
+                   -> OutOfBounds
+    immobility     posicion fija y velocidad 0 -> Immobility cuando todas las lecturas de
+                   las ultimas 2 horas (al menos 20) quedan a menos de 10 m de la ultima;
+                   con la hora real el episodio dura 2 horas de lecturas
+    low_activity   actividad 0 -> LowActivity (menos del 30% del promedio de 24 h y < 20)
+    high_activity  actividad 100 -> HighActivity (mas del doble del promedio de 24 h y > 80)
+
+AlertRuleModel reproduce esas reglas sobre las lecturas de los animales con
+episodio, asi se sabe en que lectura se cumple la condicion de cada uno.
+
+En paralelo consulta GET /api/Alerts cada `--poll` segundos y empareja cada
+alerta nueva con el episodio de su animal (via GET /api/Trackers: deviceId ->
+animalId). Mide dos latencias desde la lectura en la que se cumple la condicion
+(incluye su espera en el envio): hasta que la alerta se ve en el endpoint
+(resolucion: --poll) y hasta su CreatedAt (requiere relojes sincronizados con
+el API). Reporta percentiles por tipo de episodio, episodios sin alerta y
+alertas por segundo.
+
+El API solo crea alertas una vez por animal y tipo mientras no se resuelvan
+(HasSimilarAlertAsync, 24 h): un episodio cuyo animal ya tenia una alerta sin
+resolver del tipo esperado al empezar la prueba cuenta como "con alerta previa",
+y --resolve resuelve al final las alertas emparejadas para poder repetir la
+prueba con los mismos animales. Se usa la hora real (sin sim_clock) porque las
+ventanas de las reglas y las latencias usan el reloj del API. Sin API,
+stub_tracking_server.py aplica las mismas reglas:
+    python stub_tracking_server.py --port 5999 --alert-delay-ms 200 --boundary potreros.geojson
+    python alert_scenarios.py --api http://localhost:5999 --emulator fleet --devices 2000 --interval 1 \
+        --boundary potreros.geojson --kinds breach,low_activity,high_activity
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+import aiohttp
+import numpy as np
+
+from gps_fleet_engine import KM_PER_DEGREE, haversine_km
+from gps_transport import (DEFAULT_API_BASE_URL, EMULATOR_NAMES, GEOFENCE_EMULATORS, create_emulator,
+                           create_sender, run_fleet)
+from hub_load_client import latency_summary, parse_timestamp
+from latency_stats import LatencyHistogram
+
+ALERTS_PATH = "/api/Alerts"
+TRACKERS_PATH = "/api/Trackers"
+
+SCENARIO_KINDS = ("breach", "immobility", "low_activity", "high_activity")
+# Reglas de AlertService.CheckLocationAlertsAsync: GetRecentLocationsAsync(animalId, 2)
+IMMOBILE_WINDOW_S = 2 * 3600
+IMMOBILE_READINGS = 20
+IMMOBILE_METERS = 10.0
+# Reglas de AlertService.CheckActivityAlertsAsync: GetAverageActivityLevelAsync(animalId, 24)
+ACTIVITY_WINDOW_S = 24 * 3600
+LOW_ACTIVITY_RATIO = 0.3
+LOW_ACTIVITY_MAX = 20
+HIGH_ACTIVITY_RATIO = 2.0
+HIGH_ACTIVITY_MIN = 80
+HIGH_ACTIVITY_LEVEL = 100
+# HasSimilarAlertAsync(animalId, type, 24)
+SIMILAR_ALERT_S = 24 * 3600
+DEFAULT_BREACH_M = 500.0
+# Lecturas que dura cada episodio (immobility depende del intervalo); al terminar el emulador
+# vuelve a mandar sus valores
+EPISODE_READINGS = {"breach": 3, "low_activity": 3, "high_activity": 3}
+# Tipo de alerta que responde a cada episodio
+EXPECTED_TYPES = {
+    "breach": ("OutOfBounds",),
+    "immobility": ("Immobility",),
+    "low_activity": ("LowActivity",),
+    "high_activity": ("HighActivity",),
+}
+# Severidad de cada tipo en AlertService.CreateAlertAsync
+ALERT_SEVERITY = {"OutOfBounds": "High", "Immobility": "Medium", "LowActivity": "Medium", "HighActivity": "Medium"}
+ALERT_MESSAGES = {
+    "OutOfBounds": "has left the farm boundaries",
+    "Immobility": "has been immobile for over 2 hours",
+    "LowActivity": "showing unusually low activity levels",
+    "HighActivity": "showing unusually high activity levels",
+}
+
+
+def immobility_readings(interval: float) -> int:
+    """Lecturas quietas para que la ventana de 2 horas tenga solo lecturas del episodio"""
+    return max(IMMOBILE_READINGS, math.ceil(IMMOBILE_WINDOW_S / max(interval, 1e-3)) + 1) + 2
+
+
+class AlertRuleModel:
+    """Condiciones de AlertService para cada lectura (sin HasSimilarAlertAsync)
+
+    Como el API, la lectura ya esta guardada cuando se evaluan las reglas: entra en
+    la ventana de Immobility y en el promedio de actividad. Por animal guarda las
+    posiciones de las ultimas 2 horas y la actividad de las ultimas 24 h en baldes
+    de un minuto. Las ventanas se cortan por el timestamp de la lectura contra
+    `now` (DateTime.UtcNow del API; por defecto el timestamp de la lectura).
+    """
+
+    def __init__(self, boundary=None):
+        # pasture_geofence.Geofence con el limite de la granja (FarmBoundaries); sin limite no hay OutOfBounds
+        self.boundary = boundary
+        self.locations: Dict[object, deque] = {}
+        self.activity: Dict[object, deque] = {}
+        self.activity_totals: Dict[object, List[int]] = {}
+
+    def check(self, animal, reading: dict, now: Optional[float] = None) -> List[str]:
+        """Tipos de alerta cuya condicion cumple la lectura, en el orden de AlertService"""
+        ts = parse_timestamp(reading.get("timestamp"))
+        now = (ts if ts is not None else time.time()) if now is None else now
+        ts = now if ts is None else ts
+        lat, lng = reading["latitude"], reading["longitude"]
+        types = []
+
+        if self.boundary is not None and self.boundary.locate(lat, lng)[0] < 0:
+            types.append("OutOfBounds")
+
+        recent = self.locations.setdefault(animal, deque())
+        recent.append((ts, lat, lng))
+        while recent and recent[0][0] < now - IMMOBILE_WINDOW_S:
+            recent.popleft()
+        if len(recent) >= IMMOBILE_READINGS:
+            # Distancia de cada lectura a la mas nueva (la primera de GetRecentLocationsAsync)
+            newest = max(recent)
+            points = np.array([(r[1], r[2]) for r in recent])
+            if haversine_km(newest[1], newest[2], points[:, 0], points[:, 1]).max() * 1000 < IMMOBILE_METERS:
+                types.append("Immobility")
+
+        level = int(reading.get("activityLevel") or 0)
+        buckets = self.activity.setdefault(animal, deque())
+        totals = self.activity_totals.setdefault(animal, [0, 0])
+        minute = int(ts // 60)
+        if buckets and buckets[-1][0] == minute:
+            buckets[-1][1] += level
+            buckets[-1][2] += 1
+        else:
+            buckets.append([minute, level, 1])
+        totals[0] += level
+        totals[1] += 1
+        while buckets and (buckets[0][0] + 1) * 60 <= now - ACTIVITY_WINDOW_S:
+            _, dropped, count = buckets.popleft()
+            totals[0] -= dropped
+            totals[1] -= count
+        average = totals[0] / totals[1] if totals[1] else 0.0
+        if average > 0:
+            if level < average * LOW_ACTIVITY_RATIO and level < LOW_ACTIVITY_MAX:
+                types.append("LowActivity")
+            if level > average * HIGH_ACTIVITY_RATIO and level > HIGH_ACTIVITY_MIN:
+                types.append("HighActivity")
+        return types
+
+
+@dataclass
+class Episode:
+    device_id: str
+    kind: str
+    # Iteracion (desde 1) de la primera lectura alterada
+    start: int
+    length: int
+    # Rumbo de la salida del area para breach
+    bearing: float = 0.0
+    hold: Optional[tuple] = None
+    # El animal ya tenia una alerta sin resolver del tipo esperado al empezar (el API no crea otra)
+    masked: bool = False
+    # El animal cumplio la condicion antes del episodio: la alerta ya la creo esa lectura
+    preempted: bool = False
+    # Primera lectura alterada y lectura en la que se cumple la condicion de la regla
+    triggered_at: Optional[float] = None
+    condition_at: Optional[float] = None
+    seen_at: Optional[float] = None
+    created_at: Optional[float] = None
+    alert_id: Optional[int] = None
+
+    def step(self, iteration: int) -> Optional[int]:
+        """Lectura del episodio (desde 0) en la iteracion, None fuera del episodio"""
+        step = iteration - self.start
+        return step if 0 <= step < self.length else None
+
+
+def plan_episodes(device_ids: Sequence[str], fraction: float, lengths: Dict[str, int], onset: int = 10,
+                  seed: Optional[int] = None) -> List[Episode]:
+    """Un episodio para `fraction` de los dispositivos, tipos en partes iguales
+
+    Cada episodio arranca en una de las primeras `onset` iteraciones, desde la 2:
+    el promedio de actividad necesita lecturas previas.
+    """
+    kinds = list(lengths)
+    rng = random.Random(seed)
+    chosen = rng.sample(list(device_ids), min(len(device_ids), round(len(device_ids) * fraction)))
+    return [Episode(device_id, kinds[i % len(kinds)], 2 + rng.randrange(max(1, onset)),
+                    lengths[kinds[i % len(kinds)]], rng.uniform(0, 360))
+            for i, device_id in enumerate(chosen)]
+
+
+class ScenarioInjector:
+    """Altera las lecturas de los dispositivos con episodio antes de que se envien"""
+
+    def __init__(self, fraction: float, kinds: Sequence[str] = SCENARIO_KINDS, onset: int = 10,
+                 seed: Optional[int] = None, breach_m: float = DEFAULT_BREACH_M, interval: float = 5.0,
+                 boundary=None):
+        if "breach" in kinds and boundary is None:
+            raise ValueError("Los episodios breach necesitan el limite de la granja")
+        self.fraction = fraction
+        self.kinds = list(kinds)
+        self.onset = onset
+        self.seed = seed
+        self.breach_m = breach_m
+        self.boundary = boundary
+        self.lengths = {kind: immobility_readings(interval) if kind == "immobility" else EPISODE_READINGS[kind]
+                        for kind in self.kinds}
+        self.rules = AlertRuleModel(boundary)
+        self.episodes: List[Episode] = []
+        self.by_device: Dict[str, Episode] = {}
+        self.iteration = 0
+        self.readings = 0
+
+    @property
+    def iterations(self) -> int:
+        """Iteraciones hasta que termina el ultimo episodio posible"""
+        return 1 + self.onset + max(self.lengths.values())
+
+    def wrap(self, generate_readings: Callable[[], List[dict]]) -> Callable[[], List[dict]]:
+        return lambda: self.apply(generate_readings())
+
+    def apply(self, readings: List[dict]) -> List[dict]:
+        if not self.episodes:
+            # El rebaño se conoce con la primera tanda de lecturas
+            self.episodes = plan_episodes([r["deviceId"] for r in readings], self.fraction, self.lengths,
+                                          self.onset, self.seed)
+            self.by_device = {episode.device_id: episode for episode in self.episodes}
+        self.iteration += 1
+        now = time.time()
+        for reading in readings:
+            episode = self.by_device.get(reading["deviceId"])
+            if episode is None:
+                continue
+            step = episode.step(self.iteration)
+            if step is not None:
+                self._inject(episode, step, reading)
+                self.readings += 1
+                if episode.triggered_at is None:
+                    episode.triggered_at = now
+            # Historial del animal para el modelo de reglas (tambien fuera del episodio)
+            met = self.rules.check(episode.device_id, reading)
+            if any(kind in met for kind in EXPECTED_TYPES[episode.kind]):
+                if episode.triggered_at is None:
+                    episode.preempted = True
+                elif step is not None and episode.condition_at is None:
+                    episode.condition_at = now
+        return readings
+
+    def _inject(self, episode: Episode, step: int, reading: dict):
+        if episode.kind == "breach":
+            boundary = self.boundary
+            lat_min, lat_max = float(boundary.lat_min.min()), float(boundary.lat_max.max())
+            lng_min, lng_max = float(boundary.lng_min.min()), float(boundary.lng_max.max())
+            lat, lng = (lat_min + lat_max) / 2, (lng_min + lng_max) / 2
+            # Fuera de la caja que envuelve el limite = fuera del poligono
+            radius_km = float(haversine_km(lat, lng, lat_max, lng_max))
+            distance_km = radius_km + self.breach_m / 1000
+            reading["latitude"] = lat + distance_km * math.cos(math.radians(episode.bearing)) / KM_PER_DEGREE
+            reading["longitude"] = lng + distance_km * math.sin(math.radians(episode.bearing)) / (
+                KM_PER_DEGREE * math.cos(math.radians(lat)))
+        elif episode.kind == "immobility":
+            if episode.hold is None:
+                episode.hold = (reading["latitude"], reading["longitude"])
+            reading["latitude"], reading["longitude"] = episode.hold
+            reading["speed"] = 0.0
+        elif episode.kind == "low_activity":
+            reading["activityLevel"] = 0
+        else:
+            reading["activityLevel"] = HIGH_ACTIVITY_LEVEL
+
+
+@dataclass
+class KindStats:
+    visible: LatencyHistogram = field(default_factory=LatencyHistogram)
+    created: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+
+class AlertWatcher:
+    """Consulta las alertas del API y las empareja con los episodios inyectados"""
+
+    def __init__(self, api_base_url: str, injector: ScenarioInjector, poll: float = 1.0,
+                 farms: Sequence[int] = (), timeout: float = 10.0):
+        self.api_base_url = api_base_url.rstrip("/")
+        self.injector = injector
+        self.poll = poll
+        self.farms = list(farms)
+        self.timeout = timeout
+        self.seen = set()
+        self.device_of_animal: Dict[int, str] = {}
+        self.stats = {kind: KindStats() for kind in SCENARIO_KINDS}
+        # Alertas nuevas que no responden a un episodio, por tipo
+        self.unmatched: Dict[str, int] = {}
+        self.alerts = 0
+        self.polls = 0
+        self.poll_latency = LatencyHistogram()
+        self.errors: Dict[str, int] = {}
+        self.start = 0.0
+        self._tracker_refresh = 0.0
+        self._baseline: List[dict] = []
+        # Alertas de animales sin tracker conocido que se reintentan en la consulta siguiente
+        self._deferred = set()
+
+    async def _get(self, session: aiohttp.ClientSession, path: str, params: Optional[dict] = None):
+        async with session.get(f"{self.api_base_url}{path}", params=params) as response:
+            if response.status != 200:
+                raise ConnectionError(f"http {response.status}")
+            return await response.json()
+
+    async def fetch_alerts(self, session: aiohttp.ClientSession) -> List[dict]:
+        """Alertas sin resolver: todas (GET /api/Alerts) o solo las de --farms"""
+        if not self.farms:
+            return await self._get(session, ALERTS_PATH, {"isResolved": "false"})
+        pages = await asyncio.gather(*(self._get(session, f"{ALERTS_PATH}/farm/{farm_id}")
+                                       for farm_id in self.farms))
+        return [alert for page in pages for alert in page]
+
+    async def refresh_trackers(self, session: aiohttp.ClientSession):
+        trackers = await self._get(session, TRACKERS_PATH, {"onlyActive": "false"})
+        self.device_of_animal = {t["animalId"]: t["deviceId"] for t in trackers if t.get("animalId") is not None}
+        self._tracker_refresh = time.monotonic()
+
+    async def baseline(self, session: aiohttp.ClientSession):
+        """Las alertas que ya existian no cuentan (pero tapan los episodios de su animal y tipo)"""
+        self._baseline = await self.fetch_alerts(session)
+        self.seen = {alert["id"] for alert in self._baseline}
+        self.start = time.time()
+
+    async def poll_once(self, session: aiohttp.ClientSession):
+        started = time.perf_counter()
+        try:
+            alerts = await self.fetch_alerts(session)
+        except asyncio.TimeoutError:
+            self._error("timeout")
+            return
+        except (aiohttp.ClientError, ConnectionError, OSError, ValueError) as e:
+            self._error(f"consulta ({e.__class__.__name__}: {e})")
+            return
+        seen_at = time.time()
+        self.polls += 1
+        self.poll_latency.record(time.perf_counter() - started)
+
+        new = [alert for alert in alerts if alert["id"] not in self.seen]
+        baseline = self._baseline if self.injector.episodes else []
+        # Los trackers que el API crea en la ingesta aparecen despues del primer listado
+        if any(alert.get("animalId") not in self.device_of_animal for alert in new + baseline) and \
+                time.monotonic() - self._tracker_refresh > self.poll:
+            try:
+                await self.refresh_trackers(session)
+            except (asyncio.TimeoutError, aiohttp.ClientError, ConnectionError, OSError, ValueError):
+                self._error("consulta de trackers")
+        if baseline:
+            for alert in baseline:
+                self._mask(alert)
+            self._baseline = []
+        for alert in new:
+            if alert.get("animalId") not in self.device_of_animal and alert["id"] not in self._deferred:
+                self._deferred.add(alert["id"])
+                continue
+            self.seen.add(alert["id"])
+            self.alerts += 1
+            self._match(alert, seen_at)
+
+    def _episode(self, alert: dict) -> Optional[Episode]:
+        """Episodio del animal de la alerta si el tipo es uno de los esperados"""
+        episode = self.injector.by_device.get(self.device_of_animal.get(alert.get("animalId")))
+        if episode is None or alert.get("type") not in EXPECTED_TYPES[episode.kind]:
+            return None
+        return episode
+
+    def _mask(self, alert: dict):
+        """Alerta sin resolver al empezar: HasSimilarAlertAsync la ve si tiene menos de 24 h"""
+        episode = self._episode(alert)
+        created = parse_timestamp(alert.get("createdAt"))
+        if episode is not None and (created is None or created >= self.start - SIMILAR_ALERT_S):
+            episode.masked = True
+
+    def _match(self, alert: dict, seen_at: float):
+        episode = self._episode(alert)
+        # Antes de la primera lectura alterada la alerta es del animal, no del episodio
+        if episode is None or episode.masked or episode.preempted or episode.triggered_at is None or \
+                episode.seen_at is not None:
+            kind = alert.get("type") or "?"
+            self.unmatched[kind] = self.unmatched.get(kind, 0) + 1
+            return
+        episode.seen_at = seen_at
+        episode.alert_id = alert["id"]
+        stats = self.stats[episode.kind]
+        reference = episode.condition_at if episode.condition_at is not None else episode.triggered_at
+        stats.visible.record(max(0.0, seen_at - reference))
+        created = parse_timestamp(alert.get("createdAt"))
+        if created is not None:
+            episode.created_at = created
+            stats.created.record(max(0.0, created - reference))
+
+    def _error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def pending(self) -> int:
+        """Episodios que ya cumplen la condicion de la regla y todavia no tienen alerta"""
+        return sum(1 for e in self.injector.episodes
+                   if e.condition_at is not None and e.seen_at is None and not e.masked and not e.preempted)
+
+    async def run(self, session: aiohttp.ClientSession, stop: asyncio.Event):
+        while not stop.is_set():
+            next_poll = time.perf_counter() + self.poll
+            await self.poll_once(session)
+            try:
+                await asyncio.wait_for(stop.wait(), max(0.0, next_poll - time.perf_counter()))
+            except asyncio.TimeoutError:
+                pass
+        await self.poll_once(session)
+
+    async def resolve_matched(self, session: aiohttp.ClientSession) -> int:
+        """PUT /api/Alerts/{id}/resolve de las alertas emparejadas (para repetir la prueba)"""
+        resolved = 0
+        for episode in self.injector.episodes:
+            if episode.alert_id is None:
+                continue
+            async with session.put(f"{self.api_base_url}{ALERTS_PATH}/{episode.alert_id}/resolve") as response:
+                resolved += response.status < 300
+        return resolved
+
+    def result(self, seconds: float) -> dict:
+        kinds = {}
+        for kind in self.injector.kinds:
+            episodes = [e for e in self.injector.episodes if e.kind == kind]
+            stats = self.stats[kind]
+            kinds[kind] = {
+                "episodes": len(episodes),
+                "triggered": sum(e.triggered_at is not None for e in episodes),
+                "conditionMet": sum(e.condition_at is not None for e in episodes),
+                "alerted": sum(e.seen_at is not None for e in episodes),
+                "masked": sum(e.masked for e in episodes),
+                "preempted": sum(e.preempted and not e.masked for e in episodes),
+                "missing": sum(e.condition_at is not None and e.seen_at is None and not e.masked and not e.preempted
+                               for e in episodes),
+                "visibleLatencyMs": latency_summary(stats.visible),
+                "createdLatencyMs": latency_summary(stats.created),
+            }
+        visible = LatencyHistogram()
+        for stats in self.stats.values():
+            visible.merge(stats.visible)
+        matched = visible.total
+        return {
+            "seconds": round(seconds, 3),
+            "alerts": self.alerts,
+            "matched": matched,
+            "alertsPerSecond": round(self.alerts / seconds, 2) if seconds > 0 else 0.0,
+            "matchedPerSecond": round(matched / seconds, 2) if seconds > 0 else 0.0,
+            "visibleLatencyMs": latency_summary(visible),
+            "byKind": kinds,
+            "unmatched": dict(self.unmatched),
+            "polls": self.polls,
+            "pollLatencyMs": latency_summary(self.poll_latency),
+            "errors": dict(self.errors),
+        }
+
+
+def fleet_generator(devices: int, seed: Optional[int] = None, boundary=None) -> Callable[[], List[dict]]:
+    """Rebaño del motor vectorizado (gps_fleet_engine) con hora real, para flotas grandes
+
+    Con `boundary` el rebaño se coloca y se mantiene dentro del limite de la granja,
+    asi solo los episodios breach salen del area.
+    """
+    from gps_fleet_engine import FleetState, build_payloads, step_fleet
+    from pasture_geofence import PaddockFence
+    from sim_clock import WallClock
+
+    rng = np.random.default_rng(seed)
+    fleet = FleetState.create(devices, rng, seed=seed)
+    fence = None
+    if boundary is not None:
+        fence = PaddockFence(boundary)
+        fence.place(fleet, rng)
+    clock = WallClock()
+
+    def generate_readings() -> List[dict]:
+        step_fleet(fleet, rng, fence=fence)
+        return build_payloads(fleet, rng, clock.timestamp())
+
+    return generate_readings
+
+
+async def run_scenarios(generate_readings: Callable[[], List[dict]], sender, injector: ScenarioInjector,
+                        watcher: AlertWatcher, interval: float, iterations: int, settle: float,
+                        resolve: bool = False) -> dict:
+    """Corre el emulador con los episodios y sigue consultando alertas hasta `settle` segundos despues"""
+    timeout = aiohttp.ClientTimeout(total=watcher.timeout)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        await watcher.baseline(session)
+        stop = asyncio.Event()
+        polling = asyncio.ensure_future(watcher.run(session, stop))
+        await run_fleet(injector.wrap(generate_readings), sender, interval, iterations)
+
+        deadline = time.perf_counter() + settle
+        while watcher.pending() and time.perf_counter() < deadline:
+            await asyncio.sleep(min(watcher.poll, deadline - time.perf_counter()))
+        stop.set()
+        await polling
+        seconds = time.time() - watcher.start
+        result = watcher.result(seconds)
+        if resolve:
+            result["resolved"] = await watcher.resolve_matched(session)
+    return result
+
+
+def print_result(result: dict):
+    print("\n" + "=" * 60)
+    print(f"Alertas nuevas: {result['alerts']:,} en {result['seconds']:.1f}s ({result['alertsPerSecond']:,.2f}/s) | "
+          f"emparejadas: {result['matched']:,} ({result['matchedPerSecond']:,.2f}/s)")
+    for kind, data in result["byKind"].items():
+        visible, created = data["visibleLatencyMs"], data["createdLatencyMs"]
+        print(f"  {kind:<13} episodios {data['episodes']:5d} | iniciados {data['triggered']:5d} | "
+              f"con condicion {data['conditionMet']:5d} | con alerta {data['alerted']:5d} | "
+              f"sin alerta {data['missing']:5d} | con alerta previa {data['masked']:5d} | "
+              f"condicion previa {data['preempted']:5d}")
+        if data["alerted"]:
+            print(f"  {'':<13} visible ms: p50 {visible['p50']} | p95 {visible['p95']} | p99 {visible['p99']} | "
+                  f"max {visible['max']}")
+            print(f"  {'':<13} CreatedAt ms: p50 {created['p50']} | p95 {created['p95']} | p99 {created['p99']} | "
+                  f"max {created['max']}")
+    if result["unmatched"]:
+        print("Alertas sin episodio: " + ", ".join(f"{kind}: {count}" for kind, count in
+                                                  sorted(result["unmatched"].items())))
+    poll = result["pollLatencyMs"]
+    print(f"Consultas: {result['polls']:,} (p50 {poll['p50']} ms, p99 {poll['p99']} ms)")
+    for kind, count in sorted(result["errors"].items()):
+        print(f"  {kind}: {count:,}")
+    if "resolved" in result:
+        print(f"Alertas resueltas: {result['resolved']:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inyecta episodios de alerta y mide la latencia hasta /api/Alerts")
+    parser.add_argument("--emulator", choices=["fleet"] + EMULATOR_NAMES, default="fleet",
+                        help="fleet = motor vectorizado con --devices vacas")
+    parser.add_argument("--devices", type=int, default=1000, help="Vacas del emulador fleet")
+    parser.add_argument("--api", default=DEFAULT_API_BASE_URL, help="URL base del API")
+    parser.add_argument("--concurrency", type=int, default=100, help="Envios simultaneos maximos")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="Lecturas por lote a /tracker-data/batch (0 = una lectura por request)")
+    parser.add_argument("--interval", type=float, default=5.0, help="Segundos entre iteraciones")
+    parser.add_argument("--iterations", type=int, default=None,
+                        help="Iteraciones (default: hasta que termina el ultimo episodio)")
+    parser.add_argument("--fraction", type=float, default=0.1, help="Fraccion del rebaño con episodio (0-1)")
+    parser.add_argument("--kinds", default=None,
+                        help=f"Tipos de episodio separados por coma ({', '.join(SCENARIO_KINDS)}; "
+                             f"default: todos, sin breach si no hay --boundary)")
+    parser.add_argument("--onset", type=int, default=10, help="Los episodios empiezan en las primeras N iteraciones")
+    parser.add_argument("--boundary", default=None,
+                        help="Limite de la granja para OutOfBounds: db:<farmId>, api:<farmId> o GeoJSON "
+                             "(sin limite no hay episodios breach)")
+    parser.add_argument("--breach-m", type=float, default=DEFAULT_BREACH_M,
+                        help="Metros fuera del limite de la granja en los episodios breach")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla (trayectorias y eleccion de episodios)")
+    parser.add_argument("--poll", type=float, default=1.0, help="Segundos entre consultas a /api/Alerts")
+    parser.add_argument("--farms", default="", help="Consultar /api/Alerts/farm/{id} de estas granjas: '3' o '1,4'")
+    parser.add_argument("--settle", type=float, default=60.0,
+                        help="Segundos de espera al final por las alertas pendientes")
+    parser.add_argument("--resolve", action="store_true", help="Resolver al final las alertas emparejadas")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--output", default=None, help="Archivo JSON con el resultado")
+    args = parser.parse_args()
+
+    if args.kinds is None:
+        kinds = [kind for kind in SCENARIO_KINDS if args.boundary or kind != "breach"]
+    else:
+        kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in SCENARIO_KINDS]
+    if unknown or not kinds:
+        parser.error(f"--kinds: tipos validos {', '.join(SCENARIO_KINDS)}")
+    if "breach" in kinds and not args.boundary:
+        parser.error("los episodios breach necesitan --boundary (el limite que usa OutOfBounds)")
+    if args.boundary and args.emulator not in ["fleet"] + GEOFENCE_EMULATORS:
+        parser.error(f"--boundary solo aplica a los emuladores fleet, {', '.join(GEOFENCE_EMULATORS)}")
+    if not 0 < args.fraction <= 1:
+        parser.error("--fraction debe estar entre 0 y 1")
+
+    boundary = None
+    if args.boundary:
+        from pasture_geofence import load_geofence
+        boundary = load_geofence(args.boundary, args.api, farm_boundary=True)
+    if args.emulator == "fleet":
+        generate_readings = fleet_generator(args.devices, args.seed, boundary)
+    else:
+        generate_readings = create_emulator(args.emulator, args.api, args.seed,
+                                            geofence=boundary).generate_readings
+    injector = ScenarioInjector(args.fraction, kinds, args.onset, args.seed, args.breach_m, args.interval, boundary)
+    farms = [int(farm) for farm in args.farms.split(",") if farm.strip()]
+    watcher = AlertWatcher(args.api, injector, args.poll, farms, args.timeout)
+    sender = create_sender(args.api, args.concurrency, args.batch_size)
+    iterations = args.iterations or injector.iterations
+
+    print("ESCENARIOS DE ALERTA")
+    print("=" * 60)
+    print(f"API: {args.api} | emulador: {args.emulator} | episodios: {args.fraction:.0%} del rebaño "
+          f"({', '.join(kinds)}) | {iterations} iteraciones cada {args.interval:g}s")
+    try:
+        result = asyncio.run(run_scenarios(generate_readings, sender, injector, watcher, args.interval,
+                                           iterations, args.settle, args.resolve))
+    except KeyboardInterrupt:
+        print("\nPrueba interrumpida por el usuario")
+        return
+    except (aiohttp.ClientError, ConnectionError, OSError) as e:
+        print(f"No se pudo consultar {args.api}{ALERTS_PATH}: {e}")
+        return
+
+    result = {
+        "startedAt": datetime.fromtimestamp(watcher.start, timezone.utc).isoformat(),
+        "config": {"api": args.api, "emulator": args.emulator, "fraction": args.fraction, "kinds": kinds,
+                   "interval": args.interval, "iterations": iterations, "poll": args.poll,
+                   "injectedReadings": injector.readings},
+        **result,
+    }
+    print_result(result)
+    print(f"Lecturas enviadas: {sender.sent:,} | fallidas: {sender.failed:,}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Resultado guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
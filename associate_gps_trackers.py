@@ -5,85 +5,38 @@ Script para asociar los trackers GPS con los animales GPS-ER-001 a GPS-ER-015
 en la granja "Entre Rios - Vaca GPS" (Farm ID 7)
 """
 
-import requests
-import json
-import time
+from tracker_api_client import TrackerApiClient, describe_error
+from tracker_inventory import InventorySnapshot
 
 API_BASE_URL = "http://localhost:5192/api"
 
-def get_animals_by_farm(farm_id):
-    """Obtiene todos los animales de una granja específica"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/Animals")
-        response.raise_for_status()
-        animals = response.json()
-
-        # Filtrar solo los animales de la granja específica con tags GPS-ER
-        farm_animals = [animal for animal in animals
-                       if animal['farmId'] == farm_id and animal['tag'].startswith('GPS-ER-')]
+# Una sola conexion keep-alive para todas las llamadas del script
+client = TrackerApiClient(API_BASE_URL)
 
-        return farm_animals
-    except Exception as e:
-        print(f"Error obteniendo animales: {e}")
-        return []
-
-def get_all_trackers():
-    """Obtiene todos los trackers del sistema"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/Trackers")
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"Error obteniendo trackers: {e}")
-        return []
-
-def update_animal_tracker(animal_id, tracker_id):
+def update_animal_tracker(inventory, animal, tracker_id):
     """Actualiza el tracker de un animal"""
     try:
-        # Primero obtener los datos actuales del animal
-        response = requests.get(f"{API_BASE_URL}/Animals/{animal_id}")
-        response.raise_for_status()
-        animal_data = response.json()
-
-        # Actualizar solo el trackerId
-        update_data = {
-            "name": animal_data["name"],
-            "tag": animal_data["tag"],
-            "birthDate": animal_data["birthDate"],
-            "gender": animal_data["gender"],
-            "breed": animal_data["breed"],
-            "weight": animal_data["weight"],
-            "status": animal_data["status"],
-            "trackerId": tracker_id
-        }
-
-        response = requests.put(f"{API_BASE_URL}/Animals/{animal_id}",
-                              json=update_data,
-                              headers={"Content-Type": "application/json"})
-        response.raise_for_status()
+        inventory.assign(client, animal, tracker_id)
         return True
     except Exception as e:
-        print(f"Error actualizando animal {animal_id} con tracker {tracker_id}: {e}")
+        print(f"Error actualizando animal {animal['id']} con tracker {tracker_id}: {describe_error(e)}")
         return False
 
 def main():
     print("ASOCIACION DE TRACKERS GPS ENTRE RIOS")
     print("=" * 60)
 
-    # Obtener animales de la granja 7 (Entre Rios - Vaca GPS)
-    animals = get_animals_by_farm(7)
-    print(f"Encontrados {len(animals)} animales GPS-ER en la granja Entre Rios - Vaca GPS")
+    # Animales y trackers en una sola descarga, indexados
+    inventory = InventorySnapshot.from_api(client)
 
-    # Obtener todos los trackers
-    trackers = get_all_trackers()
-    print(f"Encontrados {len(trackers)} trackers en el sistema")
+    # Animales GPS-ER de la granja 7 (Entre Rios - Vaca GPS), ordenados por tag
+    animals = inventory.farm_animals(7, 'GPS-ER-')
+    print(f"Encontrados {len(animals)} animales GPS-ER en la granja Entre Rios - Vaca GPS")
+    print(f"Encontrados {len(inventory.trackers)} trackers en el sistema")
 
-    # Crear mapeo de device IDs a tracker IDs
-    device_to_tracker = {}
-    for tracker in trackers:
-        device_id = tracker['deviceId']
-        if device_id.startswith('COW_GPS_ER_'):
-            device_to_tracker[device_id] = tracker['id']
+    # Mapeo de device IDs a tracker IDs
+    device_to_tracker = {device_id: tracker['id']
+                         for device_id, tracker in inventory.trackers_with_prefix('COW_GPS_ER_').items()}
 
     print(f"\nTrackers COW_GPS_ER encontrados: {len(device_to_tracker)}")
 
@@ -94,7 +47,7 @@ def main():
     print("\nPROCESANDO ASOCIACIONES:")
     print("-" * 60)
 
-    for animal in sorted(animals, key=lambda x: x['tag']):
+    for animal in animals:
         tag = animal['tag']
         animal_id = animal['id']
         current_tracker = animal['trackerId']
@@ -111,7 +64,7 @@ def main():
                     if current_tracker != tracker_id:
                         print(f"ASOCIANDO: {tag} (Animal {animal_id}) -> Tracker {tracker_id} ({expected_device_id})")
 
-                        if update_animal_tracker(animal_id, tracker_id):
+                        if update_animal_tracker(inventory, animal, tracker_id):
                             associations_made += 1
                             print(f"  OK - Asociacion completada")
                         else:
@@ -5,22 +5,21 @@ Script para asociar automáticamente trackers con animales basado en los tags
 """
 
 import requests
-import json
+
+from tracker_api_client import TrackerApiClient
 
 # Configuracion
 API_BASE = "http://localhost:5192/api"
 
+# Una sola conexion keep-alive para todas las llamadas del script
+client = TrackerApiClient(API_BASE, timeout=5)
+
 def get_animals():
     """Obtiene todos los animales de la granja 7"""
     try:
-        response = requests.get(f"{API_BASE}/farms/7/animals")
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Error obteniendo animales: {response.status_code}")
-            return []
+        return client.get_farm_animals(7)
     except Exception as e:
-        print(f"Error de conexion: {e}")
+        print(f"Error obteniendo animales: {e}")
         return []
 
 def associate_trackers():
@@ -69,18 +68,11 @@ def associate_trackers():
 
                 try:
                     # Enviar datos de tracking
-                    track_response = requests.post(
-                        f"{API_BASE}/tracking/tracker-data",
-                        json=data,
-                        headers={"Content-Type": "application/json"},
-                        timeout=5
-                    )
-
-                    if track_response.status_code == 200:
-                        print(f"DATOS ENVIADOS: {animal_tag} -> {device_id}")
-                    else:
-                        print(f"ERROR enviando datos: {animal_tag} -> {device_id} (HTTP {track_response.status_code})")
+                    client.send_tracker_data(data)
+                    print(f"DATOS ENVIADOS: {animal_tag} -> {device_id}")
 
+                except requests.exceptions.HTTPError as e:
+                    print(f"ERROR enviando datos: {animal_tag} -> {device_id} (HTTP {e.response.status_code})")
                 except Exception as e:
                     print(f"ERROR con {animal_tag}: {e}")
             else:
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Alta masiva de collares: crea trackers y los asocia a sus animales
+Lee un manifiesto CSV o JSON con pares deviceId -> tag de animal y los procesa con
+un pool acotado de workers sobre la misma sesion keep-alive.
+
+Es idempotente: el inventario indexado (tracker_inventory) se descarga una vez y
+las filas cuyo tracker ya existe se reutilizan, y las que ya estan asociadas se
+saltean, asi que re-ejecutar el mismo manifiesto tras un corte solo completa lo
+que falto. Un tracker asociado a otro animal se informa como conflicto (para
+mover collares entre animales usar tracker_reconciler.py).
+
+Manifiesto CSV (con encabezado) o JSON (lista de objetos):
+    deviceId,tag[,model][,farmId]
+    COW_LOTE7_0001,LOTE7-0001,GPS Tracker v2.0,7
+Los tags solo son unicos dentro de una granja: si el tag de una fila existe en
+mas de una granja y la fila no trae farmId, se rechaza como ambiguo.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from latency_stats import LatencyHistogram
+from tracker_api_client import DEFAULT_API_BASE_URL, DEFAULT_TRACKER_MODEL, Animal, TrackerApiClient, describe_error
+from tracker_inventory import InventorySnapshot
+
+
+@dataclass
+class ManifestRow:
+    device_id: str
+    tag: str
+    model: str = DEFAULT_TRACKER_MODEL
+    line: int = 0
+    farm_id: Optional[int] = None
+
+
+@dataclass
+class ProvisionTask:
+    row: ManifestRow
+    animal: Animal
+    # None = hay que crear el tracker antes de asociarlo
+    tracker_id: Optional[int]
+
+
+@dataclass
+class ProvisionPlan:
+    tasks: List[ProvisionTask] = field(default_factory=list)
+    already_done: int = 0
+    # (fila, motivo)
+    rejected: List[tuple] = field(default_factory=list)
+
+
+def read_manifest(path: str, default_model: str = DEFAULT_TRACKER_MODEL) -> List[ManifestRow]:
+    """Filas del manifiesto; acepta deviceId/device_id, tag/animalTag y farmId/farm_id"""
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        first_line = 1
+    else:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            records = list(csv.DictReader(f))
+        first_line = 2  # la linea 1 es el encabezado
+
+    rows = []
+    for offset, record in enumerate(records):
+        device_id = (record.get("deviceId") or record.get("device_id") or "").strip()
+        tag = (record.get("tag") or record.get("animalTag") or "").strip()
+        model = (record.get("model") or "").strip() or default_model
+        farm = str(record.get("farmId") or record.get("farm_id") or "").strip()
+        farm_id = int(farm) if farm.isdigit() else None
+        rows.append(ManifestRow(device_id, tag, model, first_line + offset, farm_id))
+    return rows
+
+
+def build_plan(rows: List[ManifestRow], inventory: InventorySnapshot) -> ProvisionPlan:
+    """Resuelve cada fila contra el inventario: que crear, que asociar y que saltear"""
+    plan = ProvisionPlan()
+    seen_devices = set()
+    seen_animals = set()
+
+    for row in rows:
+        if not row.device_id or not row.tag:
+            plan.rejected.append((row, "fila sin deviceId o tag"))
+            continue
+        if row.device_id in seen_devices:
+            plan.rejected.append((row, "deviceId repetido en el manifiesto"))
+            continue
+        seen_devices.add(row.device_id)
+
+        animal = inventory.animal_by_tag(row.tag, row.farm_id)
+        if animal is None:
+            farms = sorted(a["farmId"] for a in inventory.animals_by_tag(row.tag))
+            if row.farm_id is None and len(farms) > 1:
+                plan.rejected.append((row, f"el tag {row.tag} existe en las granjas {farms}: indicar farmId"))
+            else:
+                plan.rejected.append((row, f"no existe el animal {row.tag}"))
+            continue
+        if animal["id"] in seen_animals:
+            plan.rejected.append((row, "animal repetido en el manifiesto"))
+            continue
+        seen_animals.add(animal["id"])
+
+        tracker = inventory.tracker_by_device(row.device_id)
+        if tracker is None:
+            plan.tasks.append(ProvisionTask(row, animal, None))
+            continue
+
+        if animal.get("trackerId") == tracker["id"]:
+            plan.already_done += 1
+            continue
+        holder = inventory.holder_of(tracker["id"])
+        if holder is not None:
+            plan.rejected.append((row, f"{row.device_id} ya esta asociado a {holder.get('tag')}"))
+            continue
+        plan.tasks.append(ProvisionTask(row, animal, tracker["id"]))
+
+    return plan
+
+
+class ProvisionProgress:
+    """Avance y throughput, impresos como mucho cada `every` segundos"""
+
+    def __init__(self, total: int, every: float = 2.0):
+        self.total = total
+        self.every = every
+        self.done = 0
+        self.failed = 0
+        self.created = 0
+        self.latency = LatencyHistogram()
+        self.start = time.monotonic()
+        self._last_print = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, ok: bool, created: bool, seconds: float):
+        with self._lock:
+            self.done += 1
+            self.failed += 0 if ok else 1
+            self.created += 1 if created else 0
+            self.latency.record(seconds)
+            now = time.monotonic()
+            if now - self._last_print >= self.every or self.done == self.total:
+                self._last_print = now
+                self.print(now)
+
+    def print(self, now: Optional[float] = None):
+        elapsed = (now or time.monotonic()) - self.start
+        rate = self.done / max(elapsed, 1e-9)
+        remaining = (self.total - self.done) / rate if rate else 0.0
+        print(f"  {self.done:,}/{self.total:,} collares ({rate:,.1f}/s, errores {self.failed}, "
+              f"faltan ~{remaining:,.0f}s)")
+
+
+def provision(client: TrackerApiClient, inventory: InventorySnapshot, plan: ProvisionPlan,
+              workers: int = 16) -> ProvisionProgress:
+    """Crea y asocia los trackers del plan con a lo sumo `workers` llamadas en vuelo
+
+    Las filas que fallan se agregan a `plan.rejected`.
+    """
+    progress = ProvisionProgress(len(plan.tasks))
+    failures: List[tuple] = []
+
+    def run(task: ProvisionTask):
+        started = time.monotonic()
+        created = False
+        try:
+            tracker_id = task.tracker_id
+            if tracker_id is None:
+                tracker = client.create_tracker(task.row.device_id, task.row.model)
+                inventory.add_tracker(tracker)
+                tracker_id = tracker["id"]
+                created = True
+            inventory.assign(client, task.animal, tracker_id)
+            progress.record(True, created, time.monotonic() - started)
+        except Exception as e:
+            failures.append((task.row, describe_error(e)))
+            progress.record(False, created, time.monotonic() - started)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(run, task) for task in plan.tasks]):
+            future.result()
+
+    plan.rejected.extend(failures)
+    return progress
+
+
+def write_failed(path: str, rejected: List[tuple]):
+    """Manifiesto con las filas que no se pudieron procesar (para corregir y reintentar)"""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["deviceId", "tag", "model", "farmId", "error"])
+        for row, reason in rejected:
+            writer.writerow([row.device_id, row.tag, row.model, row.farm_id or "", reason])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alta masiva de trackers desde un manifiesto CSV/JSON")
+    parser.add_argument("manifest", help="Archivo .csv o .json con deviceId y tag")
+    parser.add_argument("--api", default=DEFAULT_API_BASE_URL)
+    parser.add_argument("--workers", type=int, default=16, help="Llamadas concurrentes al API")
+    parser.add_argument("--model", default=DEFAULT_TRACKER_MODEL, help="Modelo si la fila no lo indica")
+    parser.add_argument("--failed", default=None, help="CSV donde guardar las filas rechazadas o fallidas")
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar que se haria")
+    args = parser.parse_args()
+
+    rows = read_manifest(args.manifest, args.model)
+    print("ALTA MASIVA DE TRACKERS")
+    print("=" * 60)
+    print(f"Filas en el manifiesto: {len(rows):,}")
+
+    with TrackerApiClient(args.api, pool_size=args.workers) as client:
+        inventory = InventorySnapshot.from_api(client)
+        plan = build_plan(rows, inventory)
+        to_create = sum(1 for task in plan.tasks if task.tracker_id is None)
+        print(f"Ya asociados: {plan.already_done:,}")
+        print(f"A crear y asociar: {to_create:,}")
+        print(f"A asociar (tracker existente): {len(plan.tasks) - to_create:,}")
+        print(f"Rechazados: {len(plan.rejected):,}")
+
+        if not args.dry_run and plan.tasks:
+            print(f"\nProcesando con {args.workers} workers...")
+            progress = provision(client, inventory, plan, args.workers)
+            elapsed = time.monotonic() - progress.start
+            latency = progress.latency.percentiles((50, 99))
+            print(f"\nTrackers creados: {progress.created:,}")
+            print(f"Asociaciones realizadas: {progress.done - progress.failed:,}")
+            print(f"Tiempo: {elapsed:.1f}s ({progress.done / max(elapsed, 1e-9):,.1f} collares/s, "
+                  f"p50 {latency['p50'] * 1000:.0f} ms, p99 {latency['p99'] * 1000:.0f} ms)")
+
+    for row, reason in plan.rejected[:20]:
+        print(f"  ERROR linea {row.line} ({row.device_id} -> {row.tag}): {reason}")
+    if len(plan.rejected) > 20:
+        print(f"  ... y {len(plan.rejected) - 20} mas")
+    if args.failed and plan.rejected:
+        write_failed(args.failed, plan.rejected)
+        print(f"Filas con error guardadas en {args.failed}")
+
+    if plan.rejected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,12 @@ Esto forzará al sistema a crear los trackers automáticamente
 """
 
 import requests
-import json
 from datetime import datetime
 
+from tracker_api_client import TrackerApiClient
+
 # Configuracion
-API_URL = "http://localhost:5192/api/tracking/tracker-data"
+API_BASE_URL = "http://localhost:5192/api"
 CENTER_LAT = -33.0167
 CENTER_LNG = -58.5167
 
@@ -20,6 +21,9 @@ def send_initial_data():
     print("Enviando datos iniciales para crear trackers automáticamente...")
     print("=" * 60)
 
+    # Las 15 lecturas viajan por la misma conexion keep-alive
+    client = TrackerApiClient(API_BASE_URL, timeout=5)
+
     for i in range(1, 16):  # 1 a 15
         device_id = f"COW_GPS_ER_{i:02d}"
         tag = f"GPS-ER-{i:03d}"
@@ -39,21 +43,15 @@ def send_initial_data():
         }
 
         try:
-            response = requests.post(
-                API_URL,
-                json=data,
-                headers={"Content-Type": "application/json"},
-                timeout=5
-            )
-
-            if response.status_code == 200:
-                print(f"OK {tag} ({device_id}) - Datos enviados correctamente")
-            else:
-                print(f"ERROR {tag} ({device_id}) - Error HTTP {response.status_code}")
+            client.send_tracker_data(data)
+            print(f"OK {tag} ({device_id}) - Datos enviados correctamente")
 
+        except requests.exceptions.HTTPError as e:
+            print(f"ERROR {tag} ({device_id}) - Error HTTP {e.response.status_code}")
         except requests.exceptions.RequestException as e:
             print(f"ERROR {tag} ({device_id}) - Error de conexion: {e}")
 
+    client.close()
     print("=" * 60)
     print("Datos iniciales enviados. Los trackers deberían crearse automáticamente.")
 
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Estado compacto de los collares simulados
+Los emuladores objeto-por-vaca guardaban cada vaca como dict, dataclass u
+objeto con su propio __dict__, y cada campo como un float o int de Python
+suelto. DeviceTable guarda el estado de todos los collares de un emulador en
+arrays paralelos (float64 para coordenadas, enteros chicos para bateria,
+actividad y contadores, bool para flags) que crecen por bloques, y
+DeviceRecord es una vista con __slots__ (tabla + indice) que expone cada
+columna como atributo, asi el codigo de los emuladores sigue escribiendo
+`cow.current_lat += ...`. Cada emulador declara sus columnas en su subclase
+de DeviceRecord con Column(dtype).
+
+El generador de cada collar (sim_random.device_rng) se guarda aparte, en
+DeviceTable.rngs: con semilla es un DeviceStream de unos 100 bytes (antes un
+random.Random de ~2.5 KB, lo que mas pesaba por animal) y sin semilla todos
+los collares comparten uno solo. El benchmark mide las formas anteriores tal
+como guardaban la vaca (sin generador propio) y muestra aparte lo que suma el
+generador de las corridas con semilla.
+
+Benchmark de memoria (bytes por animal simulado):
+    python device_records.py --animals 100000
+"""
+
+import argparse
+import copy
+import random
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from sim_random import SHARED_RNG, DeviceStream, device_rng, device_seed
+
+DEFAULT_CAPACITY = 16
+
+
+class Column:
+    """Atributo de un DeviceRecord guardado en la columna del mismo nombre de su tabla"""
+
+    def __init__(self, dtype):
+        self.dtype = np.dtype(dtype)
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, record, owner=None):
+        if record is None:
+            return self
+        # item() devuelve un float/int/bool de Python (serializable a JSON)
+        return record.table.columns[self.name].item(record.index)
+
+    def __set__(self, record, value):
+        record.table.columns[self.name][record.index] = value
+
+
+def record_columns(record_class: type) -> Dict[str, np.dtype]:
+    """Columnas declaradas en la clase y sus bases, en orden de declaracion"""
+    columns = {}
+    for klass in reversed(record_class.__mro__):
+        for name, value in vars(klass).items():
+            if isinstance(value, Column):
+                columns[name] = value.dtype
+    return columns
+
+
+class DeviceRecord:
+    """Vista de un collar: fila `index` de `table`"""
+
+    __slots__ = ("table", "index")
+
+    # Numero del animal dentro del emulador (de el salen nombre y tag)
+    number = Column(np.int32)
+
+    def __init__(self, table: "DeviceTable", index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def device_id(self) -> str:
+        return self.table.device_ids[self.index]
+
+    @property
+    def rng(self) -> DeviceStream:
+        return self.table.rngs[self.index]
+
+    def values(self) -> Dict[str, Any]:
+        """Columnas de la fila como dict (para depurar y comparar)"""
+        return {name: getattr(self, name) for name in self.table.columns}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.device_id!r}, index={self.index})"
+
+
+class DeviceTable:
+    """Estado de los collares de un emulador en arrays paralelos, uno por columna"""
+
+    def __init__(self, record_class: type = DeviceRecord, shared: Any = None, capacity: int = DEFAULT_CAPACITY):
+        self.record_class = record_class
+        # Configuracion comun a todos los registros (url del API, sender, reloj, ...)
+        self.shared = shared
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.zeros(max(1, capacity), dtype) for name, dtype in record_columns(record_class).items()
+        }
+        self.device_ids: List[str] = []
+        self.rngs: List[Optional[DeviceStream]] = []
+
+    def __len__(self) -> int:
+        return len(self.device_ids)
+
+    def __getitem__(self, index: int):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.record_class(self, index)
+
+    def __iter__(self) -> Iterator[DeviceRecord]:
+        return (self.record_class(self, index) for index in range(len(self)))
+
+    @property
+    def capacity(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def _reserve(self, size: int):
+        if size <= self.capacity:
+            return
+        capacity = max(size, self.capacity * 2)
+        for name, column in self.columns.items():
+            grown = np.zeros(capacity, column.dtype)
+            grown[:len(self)] = column[:len(self)]
+            self.columns[name] = grown
+
+    def add(self, device_id: str, rng: Optional[DeviceStream] = None, **values):
+        """Agrega un collar y devuelve su registro; las columnas no indicadas quedan en 0"""
+        index = len(self)
+        self._reserve(index + 1)
+        self.device_ids.append(device_id)
+        self.rngs.append(rng)
+        for name, value in values.items():
+            if name not in self.columns:
+                raise KeyError(f"{self.record_class.__name__} no tiene la columna '{name}'")
+            self.columns[name][index] = value
+        return self.record_class(self, index)
+
+    def column(self, name: str) -> np.ndarray:
+        """Vista (sin copia) de una columna para los collares cargados"""
+        return self.columns[name][:len(self)]
+
+    def take(self, indices: Sequence[int]) -> "DeviceTable":
+        """Tabla nueva con copias de las filas indicadas (se pueden repetir)"""
+        indices = np.asarray(indices, dtype=np.int64)
+        table = DeviceTable(self.record_class, self.shared, len(indices))
+        for name, column in self.columns.items():
+            table.columns[name][:len(indices)] = column[indices]
+        table.device_ids = [self.device_ids[i] for i in indices]
+        table.rngs = [_copy_rng(self.rngs[i]) for i in indices]
+        return table
+
+    def nbytes(self) -> int:
+        """Bytes de las columnas cargadas (sin ids ni generadores)"""
+        return sum(column.itemsize * len(self) for column in self.columns.values())
+
+
+def _copy_rng(rng: Optional[DeviceStream]) -> Optional[DeviceStream]:
+    if rng is None or rng is SHARED_RNG:
+        # Sin semilla los collares comparten el generador: la copia tambien
+        return rng
+    return copy.copy(rng)
+
+
+# --- Benchmark de memoria ---
+
+@dataclass
+class _DataclassCow:
+    """Forma anterior de CowGPS (dataclass con __dict__)"""
+    device_id: str
+    name: str
+    tag: str
+    base_lat: float
+    base_lng: float
+    current_lat: float
+    current_lng: float
+    speed: float
+    heading: float
+    battery_level: int
+    temperature: float
+    activity_level: int
+
+
+class _BenchmarkCow(DeviceRecord):
+    __slots__ = ()
+
+    base_lat = Column(np.float64)
+    base_lng = Column(np.float64)
+    current_lat = Column(np.float64)
+    current_lng = Column(np.float64)
+    speed = Column(np.float64)
+    heading = Column(np.float64)
+    temperature = Column(np.float64)
+    battery_level = Column(np.int8)
+    activity_level = Column(np.int8)
+
+
+def _cow_values(rng: np.random.Generator, count: int) -> List[tuple]:
+    return list(zip(rng.uniform(-33.1, -33.0, count).tolist(), rng.uniform(-58.6, -58.5, count).tolist(),
+                    rng.uniform(0, 3, count).tolist(), rng.uniform(0, 360, count).tolist(),
+                    rng.uniform(36, 40, count).tolist(), rng.integers(85, 101, count).tolist(),
+                    rng.integers(1, 11, count).tolist()))
+
+
+def _build_dicts(count: int, seed: int):
+    values = _cow_values(np.random.default_rng(seed), count)
+    return [{'device_id': f"COW_{i:07d}", 'name': f"Vaca {i:07d}", 'tag': f"ER{i:07d}",
+             'current_lat': lat, 'current_lng': lng, 'speed': speed, 'activity': activity,
+             'temperature': temperature, 'battery': battery}
+            for i, (lat, lng, speed, heading, temperature, battery, activity) in enumerate(values)]
+
+
+def _build_dataclasses(count: int, seed: int):
+    values = _cow_values(np.random.default_rng(seed), count)
+    return [_DataclassCow(f"COW_{i:07d}", f"Vaca {i:07d}", f"ER{i:07d}", lat, lng, lat, lng, speed, heading,
+                          battery, temperature, activity)
+            for i, (lat, lng, speed, heading, temperature, battery, activity) in enumerate(values)]
+
+
+def _build_table(count: int, seed: int, streams: bool = False):
+    """Como las formas anteriores, sin generador por vaca salvo con `streams` (corridas con semilla)"""
+    values = _cow_values(np.random.default_rng(seed), count)
+    table = DeviceTable(_BenchmarkCow, capacity=len(values))
+    records = [
+        table.add(f"COW_{i:07d}", device_rng(seed, f"COW_{i:07d}") if streams else None, number=i, base_lat=lat, base_lng=lng,
+                  current_lat=lat, current_lng=lng, speed=speed, heading=heading, temperature=temperature,
+                  battery_level=battery, activity_level=activity)
+        for i, (lat, lng, speed, heading, temperature, battery, activity) in enumerate(values)
+    ]
+    return table, records
+
+
+def measure(build, *args) -> int:
+    """Bytes que quedan reservados despues de construir (tracemalloc)
+
+    Los valores se generan dentro de `build`, asi cada forma cuenta sus propios
+    objetos float/int (los temporales ya liberados no cuentan).
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(*args)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes por animal simulado segun la forma del estado")
+    parser.add_argument("--animals", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows = [
+        ("dict por vaca (Simple10CowsEmulator anterior)", measure(_build_dicts, args.animals, args.seed)),
+        ("dataclass por vaca (CowGPS anterior)", measure(_build_dataclasses, args.animals, args.seed)),
+        ("DeviceTable + DeviceRecord por vaca", measure(_build_table, args.animals, args.seed)),
+    ]
+    table, _ = _build_table(args.animals, args.seed)
+    rows.append(("  de eso, columnas (arrays)", table.nbytes()))
+    rows.append(("DeviceTable con semilla (+ DeviceStream por vaca)",
+                 measure(_build_table, args.animals, args.seed, True)))
+    generators = measure(lambda n: [random.Random(device_seed(args.seed, f"COW_{i:07d}")) for i in range(n)],
+                         args.animals)
+    rows.append(("  con random.Random en lugar de DeviceStream", rows[2][1] + generators))
+
+    print(f"Memoria por animal simulado ({args.animals:,} animales)")
+    print("=" * 60)
+    for label, used in rows:
+        print(f"  {label:<48} {used / args.animals:8.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,31 +5,101 @@ Simulates 10 cows with GPS trackers moving in realistic patterns near each other
 """
 
 import requests
-import time
 import random
 import math
-import datetime
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from device_records import Column, DeviceRecord, DeviceTable
+from send_pacer import CATCH_UP, SendPacer
+from sim_clock import WallClock
+from sim_random import device_rng
+
+# Seconds of movement simulated per update
+TICK_SECONDS = 20
+
+# Cows further than this from their base turn back toward it
+MAX_DISTANCE_FROM_BASE_KM = 2.5
+
+# movement type -> (min speed km/h, max speed km/h, max heading change degrees)
+MOVEMENT_PROFILES = {
+    'graze': (0.0, 0.5, 45.0),
+    'walk': (0.5, 2.5, 90.0),
+    'rest': (0.0, 0.1, 10.0),
+}
+
+# Cumulative weights for graze/walk/rest (60/30/10)
+MOVEMENT_WEIGHTS = (0.6, 0.9, 1.0)
+
+def movement_type_for(mode_draw: float) -> str:
+    """Map a uniform [0, 1) draw to graze/walk/rest using MOVEMENT_WEIGHTS"""
+    if mode_draw < MOVEMENT_WEIGHTS[0]:
+        return 'graze'
+    if mode_draw < MOVEMENT_WEIGHTS[1]:
+        return 'walk'
+    return 'rest'
 
 @dataclass
-class CowGPS:
-    device_id: str
-    name: str
-    tag: str
-    base_lat: float
-    base_lng: float
-    current_lat: float
-    current_lng: float
+class MovementDraws:
+    """Random numbers consumed by one cow in one movement update"""
+    mode: float
     speed: float
-    heading: float
-    battery_level: int
+    turn: float
+    return_offset: float
+    battery: float
     temperature: float
     activity_level: int
 
+    @classmethod
+    def sample(cls, rng: random.Random) -> "MovementDraws":
+        return cls(
+            mode=rng.random(),
+            speed=rng.random(),
+            turn=rng.random(),
+            return_offset=rng.random(),
+            battery=rng.random(),
+            temperature=rng.uniform(36, 40),
+            activity_level=rng.randint(1, 10)
+        )
+
+class CowGPS(DeviceRecord):
+    """One cow: a slotted view over a row of the emulator's DeviceTable (see device_records)"""
+    __slots__ = ()
+
+    base_lat = Column(np.float64)
+    base_lng = Column(np.float64)
+    current_lat = Column(np.float64)
+    current_lng = Column(np.float64)
+    speed = Column(np.float64)
+    heading = Column(np.float64)
+    battery_level = Column(np.int8)
+    temperature = Column(np.float64)
+    activity_level = Column(np.int8)
+
+    @property
+    def name(self) -> str:
+        return f"Vaca Entre Ríos {self.number:02d}"
+
+    @property
+    def tag(self) -> str:
+        return f"ER{self.number:03d}"
+
 class MultiCowGPSEmulator:
-    def __init__(self, api_base_url: str = "http://localhost:5192"):
+    def __init__(self, api_base_url: str = "http://localhost:5192", sender=None, outbox=None,
+                 seed: Optional[int] = None, clock: Optional[WallClock] = None):
         self.api_base_url = api_base_url
+        # Same seed -> same trajectories, regardless of how many cows are simulated
+        self.seed = seed
+        # Source of timestamps and waits (sim_clock.VirtualClock to run faster than real time)
+        self.clock = clock or WallClock()
+        # Optional gps_transport.BackgroundSender (pooled keep-alive connections)
+        self.sender = sender
+        # Optional reading_outbox.ReadingOutbox keeping readings the API could not take
+        self.outbox = outbox
+        # Every cow's state lives in one array-backed table; self.cows holds the row views
+        self.devices = DeviceTable(CowGPS)
         self.cows = self._initialize_cows()
 
     def _initialize_cows(self) -> List[CowGPS]:
@@ -43,57 +113,55 @@ class MultiCowGPSEmulator:
         for i in range(1, 11):
             # Spread cows in a 2km radius circle around the base point
             angle = (i - 1) * (360 / 10)  # Distribute evenly in circle
-            radius_km = random.uniform(0.2, 1.5)  # Random radius between 200m and 1.5km
+            device_id = f"COW_GPS_ER_{i:02d}"
+            rng = device_rng(self.seed, device_id)
+            radius_km = rng.uniform(0.2, 1.5)  # Random radius between 200m and 1.5km
 
             # Convert to lat/lng offset
             lat_offset = (radius_km / 111.32) * math.cos(math.radians(angle))
             lng_offset = (radius_km / (111.32 * math.cos(math.radians(base_lat)))) * math.sin(math.radians(angle))
 
-            cow = CowGPS(
-                device_id=f"COW_GPS_ER_{i:02d}",
-                name=f"Vaca Entre Ríos {i:02d}",
-                tag=f"ER{i:03d}",
+            cow = self.devices.add(
+                device_id,
+                rng=rng,
+                number=i,
                 base_lat=base_lat + lat_offset,
                 base_lng=base_lng + lng_offset,
                 current_lat=base_lat + lat_offset,
                 current_lng=base_lng + lng_offset,
-                speed=random.uniform(0, 3),
-                heading=random.uniform(0, 360),
-                battery_level=random.randint(85, 100),
-                temperature=random.uniform(36, 40),
-                activity_level=random.randint(1, 10)
+                speed=rng.uniform(0, 3),
+                heading=rng.uniform(0, 360),
+                battery_level=rng.randint(85, 100),
+                temperature=rng.uniform(36, 40),
+                activity_level=rng.randint(1, 10)
             )
             cows.append(cow)
 
         return cows
 
-    def _update_cow_position(self, cow: CowGPS):
-        """Update cow position with realistic movement"""
+    def _update_cow_position(self, cow: CowGPS, draws: Optional[MovementDraws] = None):
+        """Update cow position with realistic movement
+
+        `draws` holds the random numbers for this tick; the vectorized fleet
+        engine (gps_fleet_engine.py) passes its own so both paths can be
+        compared cow by cow.
+        """
+        if draws is None:
+            draws = MovementDraws.sample(cow.rng)
+
         # Simulate grazing behavior - mostly small movements
-        movement_type = random.choices(
-            ['graze', 'walk', 'rest'],
-            weights=[60, 30, 10]
-        )[0]
-
-        if movement_type == 'graze':
-            # Small movements while grazing
-            speed = random.uniform(0, 0.5)
-            heading_change = random.uniform(-45, 45)
-        elif movement_type == 'walk':
-            # Normal walking
-            speed = random.uniform(0.5, 2.5)
-            heading_change = random.uniform(-90, 90)
-        else:  # rest
-            # Minimal movement
-            speed = random.uniform(0, 0.1)
-            heading_change = random.uniform(-10, 10)
+        movement_type = movement_type_for(draws.mode)
+        speed_min, speed_max, max_turn = MOVEMENT_PROFILES[movement_type]
+
+        speed = speed_min + (speed_max - speed_min) * draws.speed
+        heading_change = max_turn * (2 * draws.turn - 1)
 
         # Update heading
         cow.heading = (cow.heading + heading_change) % 360
         cow.speed = speed
 
         # Calculate movement distance (20 seconds * speed)
-        distance_km = (speed * 20) / 3600  # Convert km/h to km in 20 seconds
+        distance_km = (speed * TICK_SECONDS) / 3600  # Convert km/h to km in 20 seconds
 
         # Convert to lat/lng movement
         lat_change = (distance_km / 111.32) * math.cos(math.radians(cow.heading))
@@ -109,17 +177,18 @@ class MultiCowGPSEmulator:
             cow.base_lat, cow.base_lng
         )
 
-        if dist_from_base > 2.5:  # If too far, head back toward base
+        if dist_from_base > MAX_DISTANCE_FROM_BASE_KM:  # If too far, head back toward base
             bearing = self._calculate_bearing(
                 cow.current_lat, cow.current_lng,
                 cow.base_lat, cow.base_lng
             )
-            cow.heading = bearing + random.uniform(-30, 30)
+            cow.heading = bearing + 60 * draws.return_offset - 30
 
         # Update other attributes
-        cow.battery_level = max(10, cow.battery_level - random.choice([0, 0, 0, 1]))  # Slow battery drain
-        cow.temperature = random.uniform(36, 40)
-        cow.activity_level = random.randint(1, 10)
+        battery_drop = 1 if draws.battery < 0.25 else 0  # Slow battery drain
+        cow.battery_level = max(10, cow.battery_level - battery_drop)
+        cow.temperature = draws.temperature
+        cow.activity_level = draws.activity_level
 
     def _calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
         """Calculate distance between two points in km"""
@@ -145,29 +214,43 @@ class MultiCowGPSEmulator:
         bearing = math.atan2(y, x)
         return (math.degrees(bearing) + 360) % 360
 
+    def build_gps_data(self, cow: CowGPS) -> dict:
+        """Build the tracker-data payload for a cow"""
+        return {
+            "deviceId": cow.device_id,
+            "latitude": cow.current_lat,
+            "longitude": cow.current_lng,
+            "altitude": cow.rng.uniform(15, 30),
+            "speed": cow.speed,
+            "heading": cow.heading,
+            "accuracy": cow.rng.uniform(2, 8),
+            "batteryLevel": cow.battery_level,
+            "temperature": cow.temperature,
+            "signalStrength": cow.rng.randint(70, 95),
+            "activityLevel": cow.activity_level,
+            "timestamp": self.clock.timestamp()
+        }
+
+    def generate_readings(self) -> List[dict]:
+        """Move every cow one step and return their payloads"""
+        readings = []
+        for cow in self.cows:
+            self._update_cow_position(cow)
+            readings.append(self.build_gps_data(cow))
+        return readings
+
     def send_gps_data(self, cow: CowGPS) -> bool:
         """Send GPS data to the API"""
+        gps_data = self.build_gps_data(cow)
         try:
-            gps_data = {
-                "deviceId": cow.device_id,
-                "latitude": cow.current_lat,
-                "longitude": cow.current_lng,
-                "altitude": random.uniform(15, 30),
-                "speed": cow.speed,
-                "heading": cow.heading,
-                "accuracy": random.uniform(2, 8),
-                "batteryLevel": cow.battery_level,
-                "temperature": cow.temperature,
-                "signalStrength": random.randint(70, 95),
-                "activityLevel": cow.activity_level,
-                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat()
-            }
-
-            response = requests.post(
-                f"{self.api_base_url}/api/tracking/tracker-data",
-                json=gps_data,
-                headers={"Content-Type": "application/json"}
-            )
+            if self.sender is not None:
+                response = self.sender.post(gps_data)
+            else:
+                response = requests.post(
+                    f"{self.api_base_url}/api/tracking/tracker-data",
+                    json=gps_data,
+                    headers={"Content-Type": "application/json"}
+                )
 
             if response.status_code == 200:
                 print(f"OK {cow.name} - GPS data sent successfully")
@@ -176,52 +259,68 @@ class MultiCowGPSEmulator:
                 return True
             else:
                 print(f"ERROR {cow.name} - Error: {response.status_code}")
+                if response.status_code >= 500 and self.outbox is not None:
+                    self.outbox.append(gps_data)
                 return False
 
         except Exception as e:
             print(f"ERROR {cow.name} - Exception: {e}")
+            if self.outbox is not None:
+                self.outbox.append(gps_data)
             return False
 
-    def run_simulation(self):
-        """Run the GPS simulation for all cows"""
+    def run_simulation(self, policy: str = CATCH_UP):
+        """Run the GPS simulation for all cows
+
+        Every send has a fixed intended time (cow k of iteration n at n * 20 s + k * 0.5 s),
+        so a slow API response no longer stretches the cycle; `policy` (send_pacer)
+        decides whether late sends catch up, are shed or shift the schedule.
+        """
         print("Starting GPS simulation for 10 cows in Entre Rios, Argentina")
         print("Base coordinates: -33.0167, -58.5167")
-        print("Sending GPS data every 20 seconds...")
+        print(f"Sending GPS data every {TICK_SECONDS} seconds (pacing: {policy})...")
         print("-" * 80)
 
+        pacer = SendPacer(TICK_SECONDS, len(self.cows), spacing=0.5, clock=self.clock, policy=policy)
         iteration = 0
 
         while True:
             try:
                 iteration += 1
-                print(f"\nIteration {iteration} - {datetime.datetime.now().strftime('%H:%M:%S')}")
+                print(f"\nIteration {iteration} - {self.clock.now().astimezone().strftime('%Y-%m-%d %H:%M:%S')}")
                 print("-" * 50)
 
                 successful_sends = 0
 
                 for cow in self.cows:
+                    # Wait for this cow's intended send time
+                    slot = pacer.next_slot()
+
                     # Update cow position
                     self._update_cow_position(cow)
 
+                    if slot.shed:
+                        print(f"SKIP {cow.name} - {slot.lateness:.1f}s behind schedule, reading shed")
+                        continue
+
                     # Send GPS data
-                    if self.send_gps_data(cow):
+                    ok = self.send_gps_data(cow)
+                    pacer.done(slot, ok)
+                    if ok:
                         successful_sends += 1
 
-                    # Small delay between cows to avoid overwhelming the API
-                    time.sleep(0.5)
-
                 print(f"\nSummary: {successful_sends}/{len(self.cows)} cows sent data successfully")
-                print(f"Next update in 20 seconds...")
-
-                # Wait 20 seconds before next update
-                time.sleep(15)  # 15 + (10 cows * 0.5) = ~20 seconds total
+                print(f"Pacing: {pacer.summary()}")
+                print(f"Next update in {pacer.seconds_until_next():.1f} seconds...")
+                pacer.reset_window()
 
             except KeyboardInterrupt:
                 print("\nSimulation stopped by user")
+                print(f"Pacing (total): {pacer.summary(pacer.total)}")
                 break
             except Exception as e:
                 print(f"\nUnexpected error: {e}")
-                time.sleep(5)
+                self.clock.sleep(5)
 
 if __name__ == "__main__":
     emulator = MultiCowGPSEmulator()
@@ -6,17 +6,22 @@ Envia datos GPS cada 20 segundos a la API web
 """
 
 import requests
-import time
-import random
 import json
 import math
-from datetime import datetime, timezone
-from typing import Tuple
+from typing import List, Optional, Tuple
+
+from sim_clock import WallClock
+from sim_random import device_rng
 
 class EntreRiosGPSEmulator:
-    def __init__(self, api_base_url: str = "http://localhost:5192"):
+    def __init__(self, api_base_url: str = "http://localhost:5192", sender=None, outbox=None,
+                 seed: Optional[int] = None, clock: Optional[WallClock] = None):
         self.api_base_url = api_base_url
+        self.sender = sender  # gps_transport.BackgroundSender opcional
+        self.outbox = outbox  # reading_outbox.ReadingOutbox opcional para lecturas no enviadas
+        self.clock = clock or WallClock()  # sim_clock.VirtualClock para simular mas rapido que la hora real
         self.device_id = "COW_GPS_ENTRE_RIOS"  # Nuevo deviceId
+        self.rng = device_rng(seed, self.device_id)  # misma semilla -> misma trayectoria
 
         # Coordenadas de Entre Rios, Argentina
         # Gualeguaychu - coordenadas exactas de la granja creada
@@ -29,7 +34,7 @@ class EntreRiosGPSEmulator:
         # Estado actual de la vaca
         self.current_lat = self.center_lat
         self.current_lng = self.center_lng
-        self.current_heading = random.uniform(0, 360)
+        self.current_heading = self.rng.uniform(0, 360)
         self.is_resting = False
         self.rest_time = 0
 
@@ -45,22 +50,22 @@ class EntreRiosGPSEmulator:
             self.rest_time -= 1
             if self.rest_time <= 0:
                 self.is_resting = False
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Vaca termino de descansar")
+                print(f"[{self.clock.now().astimezone().strftime('%H:%M:%S')}] Vaca termino de descansar")
 
             # Movimiento minimo mientras descansa
-            movement_distance = random.uniform(0.00001, 0.00005)
-            angle_change = random.uniform(-30, 30)
+            movement_distance = self.rng.uniform(0.00001, 0.00005)
+            angle_change = self.rng.uniform(-30, 30)
         else:
             # Decide si va a empezar a descansar
-            if random.random() < self.rest_probability:
+            if self.rng.random() < self.rest_probability:
                 self.is_resting = True
                 self.rest_time = self.rest_duration
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Vaca empieza a descansar/rumiar")
+                print(f"[{self.clock.now().astimezone().strftime('%H:%M:%S')}] Vaca empieza a descansar/rumiar")
                 return self.current_lat, self.current_lng
 
             # Movimiento normal de pastoreo
-            movement_distance = random.uniform(0.0001, 0.0003)  # 10-30 metros
-            angle_change = random.uniform(-45, 45)
+            movement_distance = self.rng.uniform(0.0001, 0.0003)  # 10-30 metros
+            angle_change = self.rng.uniform(-45, 45)
 
         # Cambiar direccion gradualmente
         self.current_heading += angle_change
@@ -84,7 +89,7 @@ class EntreRiosGPSEmulator:
             self.current_heading = math.degrees(math.atan2(
                 self.center_lng - self.current_lng,
                 self.center_lat - self.current_lat
-            )) + random.uniform(-30, 30)
+            )) + self.rng.uniform(-30, 30)
 
             # Recalcular con nueva direccion
             heading_rad = math.radians(self.current_heading)
@@ -106,24 +111,28 @@ class EntreRiosGPSEmulator:
         lat, lng = self.generate_realistic_movement()
 
         # Calcular velocidad basada en movimiento
-        speed = 0.0 if self.is_resting else random.uniform(0.2, self.max_speed)
+        speed = 0.0 if self.is_resting else self.rng.uniform(0.2, self.max_speed)
 
         # Simular otros sensores del collar
         data = {
             "deviceId": self.device_id,
             "latitude": lat,
             "longitude": lng,
-            "altitude": random.uniform(10, 25),  # Entre Rios es plano
+            "altitude": self.rng.uniform(10, 25),  # Entre Rios es plano
             "speed": speed,
-            "activityLevel": 1 if self.is_resting else random.randint(3, 7),
-            "temperature": random.uniform(36.5, 39.5),  # Temperatura corporal normal
-            "batteryLevel": random.randint(85, 100),
-            "signalStrength": random.randint(75, 95),
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "activityLevel": 1 if self.is_resting else self.rng.randint(3, 7),
+            "temperature": self.rng.uniform(36.5, 39.5),  # Temperatura corporal normal
+            "batteryLevel": self.rng.randint(85, 100),
+            "signalStrength": self.rng.randint(75, 95),
+            "timestamp": self.clock.timestamp()
         }
 
         return data
 
+    def generate_readings(self) -> List[dict]:
+        """Genera la lectura de la vaca (para run_fleet de gps_transport)"""
+        return [self.generate_tracker_data()]
+
     def send_data_to_api(self, data: dict) -> bool:
         """Envia datos a la API web"""
         try:
@@ -133,20 +142,27 @@ class EntreRiosGPSEmulator:
                 "Accept": "application/json"
             }
 
-            response = requests.post(url, json=data, headers=headers, timeout=10)
+            if self.sender is not None:
+                response = self.sender.post(data)
+            else:
+                response = requests.post(url, json=data, headers=headers, timeout=10)
 
             if response.status_code == 200:
                 status = "Descansando" if self.is_resting else "Pastando"
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] DATOS ENVIADOS - {status}")
+                print(f"[{self.clock.now().astimezone().strftime('%H:%M:%S')}] DATOS ENVIADOS - {status}")
                 print(f"   Ubicacion: {data['latitude']:.6f}, {data['longitude']:.6f}")
                 print(f"   Velocidad: {data['speed']:.1f} m/s | Temp: {data['temperature']:.1f}C")
                 return True
             else:
                 print(f"ERROR al enviar datos: {response.status_code} - {response.text}")
+                if response.status_code >= 500 and self.outbox is not None:
+                    self.outbox.append(data)
                 return False
 
         except requests.exceptions.RequestException as e:
             print(f"ERROR de conexion: {e}")
+            if self.outbox is not None:
+                self.outbox.append(data)
             return False
 
     def run_simulation(self, duration_minutes: int = 60):
@@ -162,11 +178,12 @@ class EntreRiosGPSEmulator:
         print(f"API: {self.api_base_url}")
         print("="*60)
 
-        end_time = time.time() + (duration_minutes * 60)
+        start_time = self.clock.monotonic()
+        end_time = start_time + (duration_minutes * 60)
         cycle_count = 0
 
         try:
-            while time.time() < end_time:
+            while self.clock.monotonic() < end_time:
                 cycle_count += 1
                 print(f"\n--- CICLO {cycle_count} ---")
 
@@ -175,10 +192,13 @@ class EntreRiosGPSEmulator:
                 success = self.send_data_to_api(tracker_data)
 
                 if not success:
-                    print("Reintentando en 20 segundos...")
+                    if self.outbox is not None:
+                        print("Lectura guardada en el outbox; se reenviara cuando el API responda")
+                    else:
+                        print("Lectura descartada. Proximo envio en 20 segundos...")
 
                 # Esperar 20 segundos
-                time.sleep(20)
+                self.clock.sleep(20)
 
         except KeyboardInterrupt:
             print(f"\n\nSimulacion detenida por el usuario")
@@ -186,10 +206,19 @@ class EntreRiosGPSEmulator:
         print(f"\n{'='*60}")
         print(f"SIMULACION COMPLETADA")
         print(f"Ciclos ejecutados: {cycle_count}")
-        print(f"Tiempo total: {(time.time() - (end_time - duration_minutes * 60))/60:.1f} minutos")
+        print(f"Tiempo total: {(self.clock.monotonic() - start_time)/60:.1f} minutos")
         print(f"{'='*60}")
 
 if __name__ == "__main__":
+    from reading_outbox import OutboxDrainer, ReadingOutbox
+
     print("Iniciando Emulador GPS - Entre Rios...")
-    emulator = EntreRiosGPSEmulator("http://localhost:5192")
-    emulator.run_simulation(60)  # 60 minutos por defecto
\ No newline at end of file
+    outbox = ReadingOutbox("outbox")
+    drainer = OutboxDrainer(outbox, "http://localhost:5192")
+    drainer.start()
+
+    emulator = EntreRiosGPSEmulator("http://localhost:5192", outbox=outbox)
+    emulator.run_simulation(60)  # 60 minutos por defecto
+
+    drainer.stop()
+    outbox.close()
\ No newline at end of file
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Auditoria de granjas y animales directo sobre PostgreSQL
+Los listados se leen con cursores con nombre (del lado del servidor) de a
+`itersize` filas y se recorren como generadores, asi que la memoria no crece
+con el tamano de la granja. Los totales por granja se calculan en SQL (COUNT,
+MIN/MAX de tags) en lugar de concatenar todos los tags con STRING_AGG.
+
+Uso:
+    python farm_audit_report.py                         (resumen por granja)
+    python farm_audit_report.py animals --farm 7        (listado paginado)
+    python farm_audit_report.py animals --csv animales.csv
+"""
+
+import argparse
+import csv
+import sys
+from dataclasses import dataclass, fields
+from typing import Iterable, Iterator, Optional
+
+from tracker_db import add_db_arguments, config_from_args, configure, connection
+
+DEFAULT_ITERSIZE = 2000
+DEFAULT_PAGE_SIZE = 50
+
+_cursor_seq = 0
+
+
+@dataclass
+class FarmSummary:
+    farm_id: int
+    farm_name: str
+    animals: int
+    with_tracker: int
+    active: int
+    first_tag: Optional[str]
+    last_tag: Optional[str]
+
+    def describe(self) -> str:
+        tags = f"{self.first_tag} .. {self.last_tag}" if self.animals else "ninguno"
+        return (f"Farm ID {self.farm_id} {self.farm_name}: {self.animals} animales, "
+                f"{self.with_tracker} con tracker, {self.active} activos ({tags})")
+
+
+@dataclass
+class AnimalRow:
+    farm_id: int
+    farm_name: str
+    animal_id: int
+    tag: Optional[str]
+    name: str
+    status: str
+    tracker_id: Optional[int]
+    device_id: Optional[str]
+
+    def describe(self) -> str:
+        tracker = f"{self.device_id} (ID: {self.tracker_id})" if self.tracker_id is not None else "sin tracker"
+        return f"{self.tag or '(sin tag)'}: {self.name} [{self.status}] -> {tracker}"
+
+
+FARM_SUMMARY_SQL = """
+    SELECT f."Id", f."Name",
+           COUNT(a."Id"),
+           COUNT(a."TrackerId"),
+           COUNT(a."Id") FILTER (WHERE a."Status" = 'Active'),
+           MIN(a."Tag"), MAX(a."Tag")
+    FROM "Farms" f
+    LEFT JOIN "Animals" a ON a."FarmId" = f."Id"
+    {where}
+    GROUP BY f."Id", f."Name"
+    ORDER BY f."Id"
+"""
+
+ANIMALS_SQL = """
+    SELECT a."FarmId", f."Name", a."Id", a."Tag", a."Name", a."Status", a."TrackerId", t."DeviceId"
+    FROM "Animals" a
+    JOIN "Farms" f ON f."Id" = a."FarmId"
+    LEFT JOIN "Trackers" t ON t."Id" = a."TrackerId"
+    WHERE {where}
+    ORDER BY a."FarmId", a."Tag", a."Id"
+"""
+
+
+def stream_rows(conn, sql: str, params: tuple = (), itersize: int = DEFAULT_ITERSIZE) -> Iterator[tuple]:
+    """Filas de una consulta con un cursor del lado del servidor, `itersize` por viaje
+
+    El cursor con nombre vive dentro de la transaccion actual de `conn` (no usar
+    con autocommit) y se cierra al agotar o abandonar el generador.
+    """
+    global _cursor_seq
+    _cursor_seq += 1
+    with conn.cursor(name=f"farm_audit_{_cursor_seq}") as cur:
+        cur.itersize = itersize
+        cur.execute(sql, params)
+        yield from cur
+
+
+def farm_summaries(conn, farm_id: Optional[int] = None,
+                   itersize: int = DEFAULT_ITERSIZE) -> Iterator[FarmSummary]:
+    """Totales por granja calculados en SQL"""
+    where, params = ('WHERE f."Id" = %s', (farm_id,)) if farm_id is not None else ("", ())
+    for row in stream_rows(conn, FARM_SUMMARY_SQL.format(where=where), params, itersize):
+        yield FarmSummary(*row)
+
+
+def farm_animals(conn, farm_id: Optional[int] = None, tag_prefix: str = "", with_tracker: bool = False,
+                 itersize: int = DEFAULT_ITERSIZE) -> Iterator[AnimalRow]:
+    """Animales (con su tracker) ordenados por granja y tag"""
+    conditions = ["TRUE"]
+    params = []
+    if farm_id is not None:
+        conditions.append('a."FarmId" = %s')
+        params.append(farm_id)
+    if tag_prefix:
+        # LIKE con el prefijo escapado para que '_' y '%' se tomen literalmente
+        conditions.append('a."Tag" LIKE %s')
+        params.append(tag_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    if with_tracker:
+        conditions.append('a."TrackerId" IS NOT NULL')
+    sql = ANIMALS_SQL.format(where=" AND ".join(conditions))
+    for row in stream_rows(conn, sql, tuple(params), itersize):
+        yield AnimalRow(*row)
+
+
+def print_paged(items: Iterable, page_size: int = DEFAULT_PAGE_SIZE, pause: Optional[bool] = None,
+                limit: Optional[int] = None, indent: str = "  ") -> int:
+    """Imprime `describe()` de cada item; en una terminal espera Enter entre paginas ('q' corta)
+
+    Con `limit` se imprimen solo los primeros y se informa cuantos quedaron sin mostrar.
+    Devuelve cuantos items se recorrieron.
+    """
+    if pause is None:
+        pause = sys.stdin.isatty() and sys.stdout.isatty()
+    count = 0
+    hidden = 0
+    for item in items:
+        count += 1
+        if limit is not None and count > limit:
+            hidden += 1
+            continue
+        print(f"{indent}{item.describe()}")
+        if pause and count % page_size == 0:
+            if input(f"-- {count} filas, Enter para seguir, q para salir -- ").strip().lower() == "q":
+                return count
+    if hidden:
+        print(f"{indent}... y {hidden} mas")
+    return count
+
+
+def write_csv(items: Iterable, path: str) -> int:
+    """Vuelca dataclasses a CSV (una fila por item, encabezado con los nombres de campo)"""
+    count = 0
+    out = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+    try:
+        writer = None
+        for item in items:
+            if writer is None:
+                writer = csv.writer(out)
+                writer.writerow(f.name for f in fields(item))
+            writer.writerow(getattr(item, f.name) for f in fields(item))
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return count
+
+
+def print_farm_summary(conn, title: str = "Animales por granja:", farm_id: Optional[int] = None):
+    print(title)
+    for summary in farm_summaries(conn, farm_id):
+        print(f"  {summary.describe()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumen por granja y listado de animales (streaming)")
+    parser.add_argument("report", nargs="?", choices=["summary", "animals"], default="summary")
+    parser.add_argument("--farm", type=int, default=None, help="Solo esta granja")
+    parser.add_argument("--prefix", default="", help="Solo tags con este prefijo")
+    parser.add_argument("--with-tracker", action="store_true", help="Solo animales con tracker")
+    parser.add_argument("--csv", default=None, help="Escribir CSV en este archivo ('-' = stdout)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--no-pause", action="store_true", help="No esperar Enter entre paginas")
+    parser.add_argument("--itersize", type=int, default=DEFAULT_ITERSIZE, help="Filas por viaje al servidor")
+    add_db_arguments(parser)
+    args = parser.parse_args()
+
+    # Solo lectura: el commit al salir no confirma nada
+    with connection(configure(config_from_args(args))) as conn:
+        if args.report == "summary":
+            items = farm_summaries(conn, args.farm, args.itersize)
+        else:
+            items = farm_animals(conn, args.farm, args.prefix, args.with_tracker, args.itersize)
+
+        if args.csv:
+            count = write_csv(items, args.csv)
+            if args.csv != "-":
+                print(f"{count} filas escritas en {args.csv}")
+        else:
+            pause = False if args.no_pause else None
+            count = print_paged(items, args.page_size, pause)
+            print(f"Total: {count}")
+
+
+if __name__ == "__main__":
+    main()
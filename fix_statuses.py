@@ -1,30 +1,26 @@
-import requests
-import json
+from tracker_api_client import TrackerApiClient, describe_error
 
 base_url = "http://localhost:5192/api"
 
+# Una sola conexion keep-alive y un solo GET de la lista de animales
+client = TrackerApiClient(base_url)
+animals_by_id = {animal['id']: animal for animal in client.get_animals()}
+
 def update_animal_status(animal_id, new_status):
     try:
-        # Obtener el animal actual
-        response = requests.get(f"{base_url}/animals/{animal_id}")
-        if response.status_code == 200:
-            animal = response.json()
-            print(f"Actualizando animal {animal_id}: {animal.get('name')} -> {new_status}")
+        animal = animals_by_id.get(animal_id)
+        if animal is None:
+            print(f"Error obteniendo animal {animal_id}: no existe")
+            return False
 
-            # Actualizar el status
-            animal['status'] = new_status
+        print(f"Actualizando animal {animal_id}: {animal.get('name')} -> {new_status}")
 
-            # Enviar la actualización
-            put_response = requests.put(f"{base_url}/animals/{animal_id}", json=animal)
-            print(f"  Resultado: {put_response.status_code}")
-            if put_response.status_code not in [200, 204]:
-                print(f"  Error: {put_response.text}")
-            return put_response.status_code in [200, 204]
-        else:
-            print(f"Error obteniendo animal {animal_id}: {response.status_code}")
-            return False
+        # Enviar la actualización con el status nuevo
+        client.update_animal(animal, status=new_status)
+        print(f"  Resultado: OK")
+        return True
     except Exception as e:
-        print(f"Error con animal {animal_id}: {e}")
+        print(f"Error con animal {animal_id}: {describe_error(e)}")
         return False
 
 # Primero cambiar todos a "Healthy"
@@ -44,25 +40,21 @@ for animal_id in [4, 7]:
 
 print("\n=== Verificando estados finales ===")
 try:
-    response = requests.get(f"{base_url}/animals")
-    if response.status_code == 200:
-        animals = response.json()
-        status_count = {}
-        for animal in animals:
-            status = animal.get('status', 'Unknown')
-            status_count[status] = status_count.get(status, 0) + 1
-            print(f"ID {animal['id']}: {animal['name']} - {status}")
-
-        print(f"\nResumen de estados:")
-        for status, count in status_count.items():
-            spanish_status = {
-                'Healthy': 'Saludable',
-                'Sick': 'Enfermo',
-                'Monitoring': 'En observación'
-            }.get(status, status)
-            print(f"  {status} ({spanish_status}): {count} animales")
-    else:
-        print("Error obteniendo lista de animales")
+    animals = client.get_animals()
+    status_count = {}
+    for animal in animals:
+        status = animal.get('status', 'Unknown')
+        status_count[status] = status_count.get(status, 0) + 1
+        print(f"ID {animal['id']}: {animal['name']} - {status}")
+
+    print(f"\nResumen de estados:")
+    for status, count in status_count.items():
+        spanish_status = {
+            'Healthy': 'Saludable',
+            'Sick': 'Enfermo',
+            'Monitoring': 'En observación'
+        }.get(status, status)
+        print(f"  {status} ({spanish_status}): {count} animales")
 except Exception as e:
     print(f"Error verificando estados: {e}")
 
@@ -1,9 +1,13 @@
 import requests
-import json
+
+from tracker_api_client import TrackerApiClient
 
 # API base URL
 base_url = "http://localhost:5192"
 
+# Una sola conexion keep-alive para todas las llamadas del script
+client = TrackerApiClient(f"{base_url}/api")
+
 # Tracker mappings (device ID -> actual tracker ID from API)
 tracker_mappings = {
     "COW_GPS_ER_01": 4,
@@ -32,22 +36,15 @@ animals = [
     {"name": "Vaca Entre Rios 10", "tag": "ER010", "breed": "Angus", "gender": "Male", "birthDate": "2021-02-14", "weight": 505.0, "farmId": 7, "trackerId": 14}
 ]
 
-# Headers for API calls
-headers = {
-    'Content-Type': 'application/json'
-}
-
 print("Creating 10 animals with existing trackers...")
 
 # Create animals
 for animal_data in animals:
     try:
-        response = requests.post(f"{base_url}/api/Animals", json=animal_data, headers=headers)
-        if response.status_code == 201:
-            result = response.json()
-            print(f"OK Created animal {animal_data['tag']} - {animal_data['name']} with tracker ID {animal_data['trackerId']}")
-        else:
-            print(f"FAIL Failed to create animal {animal_data['tag']}: {response.status_code} - {response.text}")
+        client.create_animal(animal_data)
+        print(f"OK Created animal {animal_data['tag']} - {animal_data['name']} with tracker ID {animal_data['trackerId']}")
+    except requests.exceptions.HTTPError as e:
+        print(f"FAIL Failed to create animal {animal_data['tag']}: {e.response.status_code} - {e.response.text}")
     except Exception as e:
         print(f"ERROR Error creating animal {animal_data['tag']}: {str(e)}")
 
@@ -55,7 +52,7 @@ print("\nSetup complete! Testing API endpoint...")
 
 # Test the farm animals endpoint
 try:
-    response = requests.get(f"{base_url}/api/Tracking/farm/7/animals")
+    response = client.session.get(f"{base_url}/api/Tracking/farm/7/animals", timeout=client.timeout)
     if response.status_code == 200:
         animals_data = response.json()
         print(f"OK Farm 7 now has {len(animals_data)} animals with GPS trackers")
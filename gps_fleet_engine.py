@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Vectorized fleet engine for the 10 cows GPS emulator
+Keeps the whole herd as NumPy arrays (structure of arrays) and advances every
+cow in one pass, so 50k-200k collars can be simulated per host.
+
+The movement rules are the same as MultiCowGPSEmulator._update_cow_position;
+run with --parity to compare both paths cow by cow using the same draws.
+
+With a seed, every cow draws from its own counter-based stream keyed by
+(seed, device id, tick) (sim_random.stream_uniforms), so a cow follows the
+same trajectory whatever shard or fleet size it is simulated in.
+"""
+
+import argparse
+import math
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from emulator_10_cows import (
+    CowGPS,
+    MAX_DISTANCE_FROM_BASE_KM,
+    MOVEMENT_PROFILES,
+    MOVEMENT_WEIGHTS,
+    MovementDraws,
+    MultiCowGPSEmulator,
+    TICK_SECONDS,
+)
+from sim_random import device_keys, stream_block
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+# Per movement type (graze, walk, rest) in the order used by MOVEMENT_WEIGHTS
+_PROFILE_ORDER = ('graze', 'walk', 'rest')
+_SPEED_MIN = np.array([MOVEMENT_PROFILES[t][0] for t in _PROFILE_ORDER])
+_SPEED_MAX = np.array([MOVEMENT_PROFILES[t][1] for t in _PROFILE_ORDER])
+_MAX_TURN = np.array([MOVEMENT_PROFILES[t][2] for t in _PROFILE_ORDER])
+_MODE_EDGES = np.array(MOVEMENT_WEIGHTS[:-1])
+
+# Stream tick used for the initial state of seeded fleets
+_INIT_TICK = -1
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distance in km between point arrays (same formula as _calculate_distance)"""
+    lat1_rad = np.radians(lat1)
+    lat2_rad = np.radians(lat2)
+    dlat = lat2_rad - lat1_rad
+    dlng = np.radians(np.asarray(lng2) - np.asarray(lng1))
+    a = (np.sin(dlat / 2) ** 2 +
+         np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlng / 2) ** 2)
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def bearing_deg(lat1, lng1, lat2, lng2):
+    """Bearing in degrees from point arrays 1 to 2 (same as _calculate_bearing)"""
+    lat1_rad = np.radians(lat1)
+    lat2_rad = np.radians(lat2)
+    dlng = np.radians(np.asarray(lng2) - np.asarray(lng1))
+    y = np.sin(dlng) * np.cos(lat2_rad)
+    x = (np.cos(lat1_rad) * np.sin(lat2_rad) -
+         np.sin(lat1_rad) * np.cos(lat2_rad) * np.cos(dlng))
+    return (np.degrees(np.arctan2(y, x)) + 360) % 360
+
+
+@dataclass
+class FleetDraws:
+    """Random numbers for one tick of the whole fleet (one entry per cow)"""
+    mode: np.ndarray
+    speed: np.ndarray
+    turn: np.ndarray
+    return_offset: np.ndarray
+    battery: np.ndarray
+    temperature: np.ndarray
+    activity_level: np.ndarray
+
+    @classmethod
+    def sample(cls, rng: np.random.Generator, n: int) -> "FleetDraws":
+        return cls(
+            mode=rng.random(n),
+            speed=rng.random(n),
+            turn=rng.random(n),
+            return_offset=rng.random(n),
+            battery=rng.random(n),
+            temperature=rng.uniform(36, 40, n),
+            activity_level=rng.integers(1, 11, n, dtype=np.int8)
+        )
+
+    @classmethod
+    def from_streams(cls, keys: np.ndarray, tick: int) -> "FleetDraws":
+        """Draws of step `tick` from each cow's own stream (draw numbers 0-6)"""
+        u = stream_block(keys, tick, 0, 7)
+        return cls(
+            mode=u[0],
+            speed=u[1],
+            turn=u[2],
+            return_offset=u[3],
+            battery=u[4],
+            temperature=36 + 4 * u[5],
+            activity_level=(1 + np.floor(10 * u[6])).astype(np.int8)
+        )
+
+    def for_cow(self, i: int) -> MovementDraws:
+        """Draws of cow `i` in the form the per-cow path expects"""
+        return MovementDraws(
+            mode=float(self.mode[i]),
+            speed=float(self.speed[i]),
+            turn=float(self.turn[i]),
+            return_offset=float(self.return_offset[i]),
+            battery=float(self.battery[i]),
+            temperature=float(self.temperature[i]),
+            activity_level=int(self.activity_level[i])
+        )
+
+
+class FleetState:
+    """Herd state as parallel NumPy arrays, one entry per cow"""
+
+    def __init__(self, device_ids: List[str], base_lat, base_lng, lat, lng,
+                 heading, speed, battery, temperature, activity, keys: Optional[np.ndarray] = None):
+        self.device_ids = device_ids
+        # Per-cow stream keys when seeded (None -> draw from the caller's rng)
+        self.keys = keys
+        self.tick = 0
+        self.base_lat = np.asarray(base_lat, dtype=np.float64)
+        self.base_lng = np.asarray(base_lng, dtype=np.float64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        self.heading = np.asarray(heading, dtype=np.float64)
+        self.speed = np.asarray(speed, dtype=np.float64)
+        self.battery = np.asarray(battery, dtype=np.int16)
+        self.temperature = np.asarray(temperature, dtype=np.float64)
+        self.activity = np.asarray(activity, dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self.device_ids)
+
+    @classmethod
+    def from_cows(cls, cows: List[CowGPS]) -> "FleetState":
+        return cls(
+            device_ids=[cow.device_id for cow in cows],
+            base_lat=[cow.base_lat for cow in cows],
+            base_lng=[cow.base_lng for cow in cows],
+            lat=[cow.current_lat for cow in cows],
+            lng=[cow.current_lng for cow in cows],
+            heading=[cow.heading for cow in cows],
+            speed=[cow.speed for cow in cows],
+            battery=[cow.battery_level for cow in cows],
+            temperature=[cow.temperature for cow in cows],
+            activity=[cow.activity_level for cow in cows]
+        )
+
+    @classmethod
+    def create(cls, count: int, rng: np.random.Generator,
+               base_lat: float = -33.0167, base_lng: float = -58.5167,
+               start_index: int = 1, seed: Optional[int] = None,
+               device_ids: Optional[List[str]] = None) -> "FleetState":
+        """Spread `count` cows around the base point like _initialize_cows does
+
+        With `seed` the initial state also comes from each cow's stream (the
+        angle included), so it does not depend on `count` or `start_index`.
+        `device_ids` overrides the generated COW_GPS_ER_{n} ids (e.g. real trackers).
+        """
+        if device_ids is None:
+            device_ids = [f"COW_GPS_ER_{i:02d}" for i in range(start_index, start_index + count)]
+        count = len(device_ids)
+
+        if seed is None:
+            keys = None
+            angle = np.radians(np.arange(count) * (360 / count))
+            radius_km = rng.uniform(0.2, 1.5, count)
+            speed = rng.uniform(0, 3, count)
+            heading = rng.uniform(0, 360, count)
+            battery = rng.integers(85, 101, count)
+            temperature = rng.uniform(36, 40, count)
+            activity = rng.integers(1, 11, count)
+        else:
+            keys = device_keys(seed, device_ids)
+            u = stream_block(keys, _INIT_TICK, 0, 7)
+            angle = np.radians(360 * u[0])
+            radius_km = 0.2 + 1.3 * u[1]
+            speed = 3 * u[2]
+            heading = 360 * u[3]
+            battery = 85 + np.floor(16 * u[4])
+            temperature = 36 + 4 * u[5]
+            activity = 1 + np.floor(10 * u[6])
+
+        lat = base_lat + (radius_km / KM_PER_DEGREE) * np.cos(angle)
+        lng = base_lng + (radius_km / (KM_PER_DEGREE * math.cos(math.radians(base_lat)))) * np.sin(angle)
+
+        return cls(
+            device_ids=device_ids,
+            base_lat=lat,
+            base_lng=lng,
+            lat=lat.copy(),
+            lng=lng.copy(),
+            speed=speed,
+            heading=heading,
+            battery=battery,
+            temperature=temperature,
+            activity=activity,
+            keys=keys
+        )
+
+    def write_back(self, cows: List[CowGPS]):
+        """Copy the array state into CowGPS objects (same order as from_cows)"""
+        for i, cow in enumerate(cows):
+            cow.current_lat = float(self.lat[i])
+            cow.current_lng = float(self.lng[i])
+            cow.heading = float(self.heading[i])
+            cow.speed = float(self.speed[i])
+            cow.battery_level = int(self.battery[i])
+            cow.temperature = float(self.temperature[i])
+            cow.activity_level = int(self.activity[i])
+
+
+def apply_step(fleet: FleetState, draws: FleetDraws, tick_seconds: float = TICK_SECONDS, steering=None,
+               fence=None):
+    """Advance every cow one tick using the given draws (vectorized _update_cow_position)
+
+    `steering` (e.g. herd_cohesion.HerdCohesion) adjusts the headings after the
+    random turn and before the cows move; without it every cow walks on its own.
+    `fence` (e.g. pasture_geofence.PaddockFence) undoes the steps that leave a
+    cow's paddock and turns those cows back inside.
+    """
+    # graze/walk/rest mixture -> 0/1/2 per cow
+    movement = np.searchsorted(_MODE_EDGES, draws.mode, side='right')
+    speed_min = _SPEED_MIN[movement]
+    speed = speed_min + (_SPEED_MAX[movement] - speed_min) * draws.speed
+    heading_change = _MAX_TURN[movement] * (2 * draws.turn - 1)
+
+    fleet.heading = (fleet.heading + heading_change) % 360
+    if steering is not None:
+        fleet.heading = steering.steer(fleet)
+    fleet.speed = speed
+
+    prev_lat, prev_lng = fleet.lat, fleet.lng
+    distance_km = (speed * tick_seconds) / 3600
+    heading_rad = np.radians(fleet.heading)
+    lat_change = (distance_km / KM_PER_DEGREE) * np.cos(heading_rad)
+    lng_change = (distance_km / (KM_PER_DEGREE * np.cos(np.radians(fleet.lat)))) * np.sin(heading_rad)
+    fleet.lat = fleet.lat + lat_change
+    fleet.lng = fleet.lng + lng_change
+
+    # Cows too far from their base head back toward it
+    too_far = haversine_km(fleet.lat, fleet.lng, fleet.base_lat, fleet.base_lng) > MAX_DISTANCE_FROM_BASE_KM
+    if too_far.any():
+        bearing = bearing_deg(fleet.lat[too_far], fleet.lng[too_far],
+                              fleet.base_lat[too_far], fleet.base_lng[too_far])
+        fleet.heading[too_far] = bearing + 60 * draws.return_offset[too_far] - 30
+    if fence is not None:
+        fence.confine(fleet, prev_lat, prev_lng, draws.return_offset)
+
+    fleet.battery = np.maximum(10, fleet.battery - (draws.battery < 0.25))
+    fleet.temperature = draws.temperature.copy()
+    fleet.activity = draws.activity_level.copy()
+
+
+def step_fleet(fleet: FleetState, rng: np.random.Generator, tick_seconds: float = TICK_SECONDS, steering=None,
+               fence=None):
+    """Advance the whole herd one tick (per-cow streams if seeded, otherwise `rng`)"""
+    if fleet.keys is not None:
+        draws = FleetDraws.from_streams(fleet.keys, fleet.tick)
+    else:
+        draws = FleetDraws.sample(rng, len(fleet))
+    apply_step(fleet, draws, tick_seconds, steering, fence)
+    fleet.tick += 1
+
+
+def sensor_readings(fleet: FleetState, rng: np.random.Generator):
+    """Altitude, accuracy and signal strength arrays for the last step (as build_gps_data)"""
+    n = len(fleet)
+    if fleet.keys is not None:
+        # Sensor noise of the last step (draw numbers 7-9 of that tick)
+        u = stream_block(fleet.keys, fleet.tick - 1, 7, 3)
+        altitude = 15 + 15 * u[0]
+        accuracy = 2 + 6 * u[1]
+        signal = (70 + np.floor(26 * u[2])).astype(np.int64)
+    else:
+        altitude = rng.uniform(15, 30, n)
+        accuracy = rng.uniform(2, 8, n)
+        signal = rng.integers(70, 96, n)
+    return altitude, accuracy, signal
+
+
+def build_payloads(fleet: FleetState, rng: np.random.Generator, timestamp: str) -> List[dict]:
+    """tracker-data payloads for the whole fleet (same fields as build_gps_data)"""
+    altitude, accuracy, signal = sensor_readings(fleet, rng)
+    columns = zip(fleet.device_ids, fleet.lat.tolist(), fleet.lng.tolist(), altitude.tolist(),
+                  fleet.speed.tolist(), fleet.heading.tolist(), accuracy.tolist(),
+                  fleet.battery.tolist(), fleet.temperature.tolist(), signal.tolist(),
+                  fleet.activity.tolist())
+    return [
+        {
+            "deviceId": device_id,
+            "latitude": lat,
+            "longitude": lng,
+            "altitude": alt,
+            "speed": speed,
+            "heading": heading,
+            "accuracy": acc,
+            "batteryLevel": battery,
+            "temperature": temperature,
+            "signalStrength": sig,
+            "activityLevel": activity,
+            "timestamp": timestamp
+        }
+        for (device_id, lat, lng, alt, speed, heading, acc, battery, temperature, sig, activity) in columns
+    ]
+
+
+def check_parity(count: int = 1000, ticks: int = 20, seed: Optional[int] = None) -> float:
+    """Run both engines on the same draws and return the max position difference in degrees"""
+    rng = np.random.default_rng(seed)
+    emulator = MultiCowGPSEmulator()
+    # Independent copies of the 10 emulator cows, repeated up to `count`
+    cows = list(emulator.devices.take(np.arange(count) % len(emulator.cows)))
+    fleet = FleetState.from_cows(cows)
+
+    max_diff = 0.0
+    for _ in range(ticks):
+        draws = FleetDraws.sample(rng, count)
+        apply_step(fleet, draws)
+        for i, cow in enumerate(cows):
+            emulator._update_cow_position(cow, draws.for_cow(i))
+        max_diff = max(
+            max_diff,
+            float(np.max(np.abs(fleet.lat - [cow.current_lat for cow in cows]))),
+            float(np.max(np.abs(fleet.lng - [cow.current_lng for cow in cows])))
+        )
+    return max_diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor vectorizado de rebaño")
+    parser.add_argument("--cows", type=int, default=100_000, help="Cantidad de vacas simuladas")
+    parser.add_argument("--ticks", type=int, default=50, help="Cantidad de pasos a simular")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla del generador aleatorio")
+    parser.add_argument("--parity", action="store_true",
+                        help="Comparar contra el camino por vaca de MultiCowGPSEmulator")
+    args = parser.parse_args()
+
+    if args.parity:
+        max_diff = check_parity(min(args.cows, 5000), args.ticks, args.seed)
+        print(f"Max position difference vs per-cow path: {max_diff:.3e} degrees")
+        return
+
+    rng = np.random.default_rng(args.seed)
+    fleet = FleetState.create(args.cows, rng, seed=args.seed)
+
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        step_fleet(fleet, rng)
+    elapsed = time.perf_counter() - start
+
+    per_tick = elapsed / args.ticks
+    print(f"{args.cows} cows x {args.ticks} ticks in {elapsed:.2f}s")
+    print(f"{per_tick * 1000:.1f} ms per tick ({args.cows / per_tick:,.0f} cow updates/s)")
+
+
+if __name__ == "__main__":
+    main()
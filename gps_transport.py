@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Transporte asincrono compartido para los emuladores GPS
+Un solo pool de conexiones keep-alive (aiohttp) con limite de concurrencia
+configurable para enviar lecturas a /api/tracking/tracker-data.
+
+Los emuladores sincronicos lo usan a traves de BackgroundSender (el event loop
+corre en un hilo propio); los lazos de alta carga usan AsyncTrackerSender
+directamente con run_fleet.
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Set
+
+import aiohttp
+import requests
+
+from latency_stats import LatencyHistogram
+from sim_clock import WallClock, make_clock
+
+DEFAULT_API_BASE_URL = "http://localhost:5192"
+TRACKER_DATA_PATH = "/api/tracking/tracker-data"
+TRACKER_DATA_BATCH_PATH = "/api/tracking/tracker-data/batch"
+# Lecturas maximas por lote que acepta el API (TrackingController.MaxBatchSize)
+MAX_BATCH_SIZE = 1000
+# El lote se guardo en parte: el body lista en failedItems las lecturas que no se guardaron
+MULTI_STATUS = 207
+
+
+class TransportError(requests.exceptions.ConnectionError):
+    """Error de conexion o timeout al enviar una lectura
+
+    Hereda de requests.exceptions.ConnectionError para que los emuladores
+    puedan seguir atrapando RequestException sin importar este modulo.
+    """
+
+
+@dataclass
+class SenderResponse:
+    """Respuesta minima con la misma forma que usan los emuladores (status_code, text)"""
+    status_code: int
+    text: str
+    latency: float
+
+
+class AsyncTrackerSender:
+    """Envia lecturas GPS reutilizando un pool de conexiones keep-alive"""
+
+    def __init__(self, api_base_url: str = DEFAULT_API_BASE_URL, concurrency: int = 100,
+                 timeout: float = 10.0, outbox=None):
+        self.url = f"{api_base_url}{TRACKER_DATA_PATH}"
+        self.concurrency = concurrency
+        self.timeout = timeout
+        # reading_outbox.ReadingOutbox opcional: send() guarda ahi lo que el API no pudo recibir
+        self.outbox = outbox
+        self.sent = 0
+        self.failed = 0
+        self.latency = LatencyHistogram()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Content-Type": "application/json"}
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def post(self, payload: dict) -> SenderResponse:
+        """Envia una lectura y devuelve la respuesta; lanza TransportError si no hay respuesta"""
+        await self.start()
+        start = time.perf_counter()
+        try:
+            async with self._session.post(self.url, json=payload) as response:
+                text = await response.text()
+                latency = time.perf_counter() - start
+                self.latency.record(latency)
+                return SenderResponse(response.status, text, latency)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise TransportError(f"{type(e).__name__}: {e}") from e
+
+    async def send(self, payload: dict) -> bool:
+        """Envia una lectura y solo informa si el API la acepto"""
+        try:
+            response = await self.post(payload)
+            ok = response.status_code == 200
+            api_down = response.status_code >= 500
+        except TransportError:
+            ok = False
+            api_down = True
+
+        if ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+            if api_down and self.outbox is not None:
+                self.outbox.append(payload)
+        return ok
+
+    async def send_many(self, payloads: Iterable[dict]) -> int:
+        """Envia todas las lecturas con a lo sumo `concurrency` en vuelo; devuelve las exitosas"""
+        iterator = iter(payloads)
+        successful = 0
+
+        async def worker():
+            nonlocal successful
+            for payload in iterator:
+                if await self.send(payload):
+                    successful += 1
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return successful
+
+
+class BatchingSender(AsyncTrackerSender):
+    """Acumula lecturas de muchos dispositivos y las envia como un solo array JSON
+
+    El lote se envia al llegar a `batch_size` lecturas (a lo sumo MAX_BATCH_SIZE)
+    o cuando la lectura mas vieja del lote espero `max_delay` segundos. Cada
+    post() espera la respuesta del lote que contiene su lectura. Si el API
+    responde 207, solo las lecturas de failedItems cuentan como fallidas.
+    """
+
+    def __init__(self, api_base_url: str = DEFAULT_API_BASE_URL, concurrency: int = 100,
+                 timeout: float = 10.0, batch_size: int = 500, max_delay: float = 1.0):
+        super().__init__(api_base_url, concurrency, timeout)
+        self.url = f"{api_base_url}{TRACKER_DATA_BATCH_PATH}"
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.max_delay = max_delay
+        self.batches = 0
+        self._buffer: List[tuple] = []
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+
+    async def close(self):
+        if self._buffer:
+            await self._flush()
+        await super().close()
+
+    async def _post_batch(self, payloads: List[dict]) -> SenderResponse:
+        await self.start()
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self.concurrency)
+
+        async with self._in_flight:
+            self.batches += 1
+            start = time.perf_counter()
+            try:
+                async with self._session.post(self.url, json=payloads) as response:
+                    text = await response.text()
+                    latency = time.perf_counter() - start
+                    self.latency.record(latency)
+                    return SenderResponse(response.status, text, latency)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise TransportError(f"{type(e).__name__}: {e}") from e
+
+    async def _flush(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+
+        try:
+            response = await self._post_batch([payload for payload, _ in batch])
+            failed, errors = set(), {}
+            if response.status_code == MULTI_STATUS:
+                # Igual que send_many: un 207 sin failedItems legibles cuenta todo el lote como fallido
+                failed, errors = failed_indexes(response, len(batch)), failed_items(response)
+            for index, (_, future) in enumerate(batch):
+                if future.done():
+                    continue
+                if response.status_code != MULTI_STATUS:
+                    future.set_result(response)
+                elif index in failed:
+                    # El API no pudo guardar esta lectura: send() la trata como error del servidor
+                    future.set_result(SenderResponse(500, errors.get(index, response.text), response.latency))
+                else:
+                    future.set_result(SenderResponse(200, "", response.latency))
+        except TransportError as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def post(self, payload: dict) -> SenderResponse:
+        """Agrega la lectura al lote actual y devuelve la respuesta del lote"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._buffer.append((payload, future))
+
+        if len(self._buffer) >= self.batch_size:
+            asyncio.ensure_future(self._flush())
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(self.max_delay, lambda: asyncio.ensure_future(self._flush()))
+
+        return await future
+
+    async def send_many(self, payloads: Iterable[dict]) -> int:
+        """Parte las lecturas en lotes de `batch_size` y los envia en paralelo"""
+        payloads = list(payloads)
+        batches = [payloads[i:i + self.batch_size] for i in range(0, len(payloads), self.batch_size)]
+
+        async def send_batch(batch: List[dict]) -> int:
+            try:
+                response = await self._post_batch(batch)
+                status = response.status_code
+            except TransportError:
+                response, status = None, None
+
+            if status == 200:
+                self.sent += len(batch)
+                return len(batch)
+            if status == MULTI_STATUS:
+                # Solo las lecturas que el API no guardo se cuentan como fallidas y van al outbox
+                failed = [batch[index] for index in failed_indexes(response, len(batch))]
+                ok = len(batch) - len(failed)
+            else:
+                failed, ok = batch, 0
+            self.sent += ok
+            self.failed += len(failed)
+            # Como send(): un 4xx rechaza el lote por su contenido y reenviarlo no lo arregla
+            api_down = status is None or status == MULTI_STATUS or status >= 500
+            if api_down and self.outbox is not None:
+                for payload in failed:
+                    self.outbox.append(payload)
+            return ok
+
+        return sum(await asyncio.gather(*(send_batch(batch) for batch in batches)))
+
+
+def failed_items(response: SenderResponse) -> dict:
+    """indice -> error de las lecturas que el API no guardo (failedItems de una respuesta 207)"""
+    try:
+        items = json.loads(response.text).get("failedItems") or []
+        return {int(item["index"]): item.get("error", "") for item in items}
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return {}
+
+
+def failed_indexes(response: SenderResponse, size: int) -> Set[int]:
+    """Indices fallidos de un 207; si el body no se puede leer, todo el lote cuenta como fallido"""
+    failed = {index for index in failed_items(response) if 0 <= index < size}
+    return failed or set(range(size))
+
+
+class BackgroundSender:
+    """AsyncTrackerSender corriendo en un hilo propio, para emuladores sincronicos
+
+    Con `batch_size` usa un BatchingSender: post() bloquea hasta que se envia el
+    lote (a lo sumo `max_delay` segundos), asi que conviene combinarlo con submit().
+    """
+
+    def __init__(self, api_base_url: str = DEFAULT_API_BASE_URL, concurrency: int = 100,
+                 timeout: float = 10.0, batch_size: Optional[int] = None, max_delay: float = 1.0):
+        if batch_size:
+            self.sender = BatchingSender(api_base_url, concurrency, timeout, batch_size, max_delay)
+        else:
+            self.sender = AsyncTrackerSender(api_base_url, concurrency, timeout)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, payload: dict) -> "Future[bool]":
+        """Encola el envio sin bloquear; el Future resuelve a True si el API lo acepto"""
+        return asyncio.run_coroutine_threadsafe(self.sender.send(payload), self._loop)
+
+    def post(self, payload: dict) -> SenderResponse:
+        """Envio bloqueante, con la misma forma de respuesta que requests.post"""
+        return asyncio.run_coroutine_threadsafe(self.sender.post(payload), self._loop).result()
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.sender.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+async def run_fleet(generate_readings: Callable[[], List[dict]], sender: AsyncTrackerSender,
+                    interval: float = 20.0, iterations: Optional[int] = None, recorder=None,
+                    clock=None):
+    """Genera las lecturas de todo el rebaño cada `interval` segundos y las envia en paralelo
+
+    `recorder` (trajectory_trace.TraceRecorder opcional) guarda cada lectura generada.
+    `clock` (sim_clock) mide el intervalo; debe ser el mismo reloj que usa el emulador.
+    """
+    clock = clock or WallClock()
+    iteration = 0
+    async with sender:
+        while iterations is None or iteration < iterations:
+            iteration += 1
+            start = time.perf_counter()
+            clock_start = clock.monotonic()
+
+            readings = generate_readings()
+            if recorder is not None:
+                recorder.record_many(readings)
+            successful = await sender.send_many(readings)
+
+            elapsed = time.perf_counter() - start
+            rate = len(readings) / elapsed if elapsed > 0 else 0.0
+            print(f"[{clock.now().astimezone().strftime('%Y-%m-%d %H:%M:%S')}] Iteracion {iteration}: "
+                  f"{successful}/{len(readings)} enviadas en {elapsed:.2f}s ({rate:,.0f}/s)")
+
+            await clock.sleep_async(interval - (clock.monotonic() - clock_start))
+
+
+def create_sender(api_base_url: str, concurrency: int = 100, batch_size: int = 0,
+                  outbox=None) -> AsyncTrackerSender:
+    """AsyncTrackerSender, o BatchingSender si se pide un tamaño de lote"""
+    if batch_size:
+        sender = BatchingSender(api_base_url, concurrency, batch_size=batch_size)
+    else:
+        sender = AsyncTrackerSender(api_base_url, concurrency)
+    sender.outbox = outbox
+    return sender
+
+
+def create_emulator(name: str, api_base_url: str, seed: Optional[int] = None, clock=None, geofence=None):
+    """Crea uno de los emuladores existentes por nombre (con semilla, reloj y geofence opcionales)"""
+    if geofence is not None and name not in GEOFENCE_EMULATORS:
+        raise ValueError(f"El emulador {name} no soporta geofence (opciones: {', '.join(GEOFENCE_EMULATORS)})")
+    if name == "10cows":
+        from emulator_10_cows import MultiCowGPSEmulator
+        return MultiCowGPSEmulator(api_base_url, seed=seed, clock=clock)
+    if name == "simple":
+        from simple_10_cows_emulator import Simple10CowsEmulator
+        return Simple10CowsEmulator(api_base_url, seed=seed, clock=clock, geofence=geofence)
+    if name == "5192":
+        from start_emulator_5192 import EntreRiosGPSEmulator
+        return EntreRiosGPSEmulator(api_base_url, seed=seed, clock=clock, geofence=geofence)
+    if name == "entre_rios":
+        from entre_rios_emulator import EntreRiosGPSEmulator
+        return EntreRiosGPSEmulator(api_base_url, seed=seed, clock=clock)
+    raise ValueError(f"Emulador desconocido: {name}")
+
+
+EMULATOR_NAMES = ["10cows", "simple", "5192", "entre_rios"]
+# Emuladores que aceptan potreros reales (pasture_geofence)
+GEOFENCE_EMULATORS = ["simple", "5192"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecuta un emulador GPS con el transporte asincrono")
+    parser.add_argument("--emulator", choices=EMULATOR_NAMES, default="10cows")
+    parser.add_argument("--api", default=DEFAULT_API_BASE_URL, help="URL base del API")
+    parser.add_argument("--concurrency", type=int, default=100, help="Envios simultaneos maximos")
+    parser.add_argument("--interval", type=float, default=20.0, help="Segundos entre iteraciones")
+    parser.add_argument("--iterations", type=int, default=None, help="Cantidad de iteraciones (default: infinito)")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="Lecturas por lote a /tracker-data/batch (0 = una lectura por request)")
+    parser.add_argument("--outbox", default=None,
+                        help="Directorio donde guardar y reenviar las lecturas que fallen")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla para trayectorias reproducibles")
+    parser.add_argument("--record", default=None,
+                        help="Archivo donde grabar las lecturas generadas (ver trajectory_trace.py)")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="Reloj simulado: multiplicador sobre la hora real (0 = lo mas rapido posible)")
+    parser.add_argument("--start", default=None,
+                        help="Fecha/hora ISO de inicio del reloj simulado (default: ahora)")
+    parser.add_argument("--geofence", default=None,
+                        help="Potreros reales: archivo GeoJSON, api:<farmId> o db:<farmId> "
+                             f"(emuladores {', '.join(GEOFENCE_EMULATORS)})")
+    args = parser.parse_args()
+
+    geofence = None
+    if args.geofence:
+        if args.emulator not in GEOFENCE_EMULATORS:
+            parser.error(f"--geofence solo aplica a los emuladores {', '.join(GEOFENCE_EMULATORS)}")
+        from pasture_geofence import load_geofence
+        geofence = load_geofence(args.geofence, args.api)
+
+    outbox = drainer = None
+    if args.outbox:
+        from reading_outbox import OutboxDrainer, ReadingOutbox
+        outbox = ReadingOutbox(args.outbox)
+        drainer = OutboxDrainer(outbox, args.api)
+        drainer.start()
+
+    recorder = None
+    if args.record:
+        from trajectory_trace import TraceRecorder
+        recorder = TraceRecorder(args.record)
+
+    clock = make_clock(args.speed, args.start)
+    emulator = create_emulator(args.emulator, args.api, args.seed, clock, geofence)
+    sender = create_sender(args.api, args.concurrency, args.batch_size, outbox)
+
+    try:
+        asyncio.run(run_fleet(emulator.generate_readings, sender, args.interval, args.iterations, recorder,
+                              clock))
+    except KeyboardInterrupt:
+        print("\nEmulador detenido por el usuario")
+
+    if recorder is not None:
+        recorder.close()
+        print(f"Grabadas {recorder.rows} lecturas en {args.record}")
+
+    if drainer is not None:
+        drainer.stop()
+        outbox.close()
+
+    print(f"Enviadas: {sender.sent} | Fallidas: {sender.failed}")
+
+
+if __name__ == "__main__":
+    main()
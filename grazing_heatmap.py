@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mapa de calor de pastoreo por granja
+Cuenta las lecturas GPS de cada celda de una grilla regular sobre la granja
+(como np.histogram2d, con celdas de `cell_m` metros), asi se ve donde pasa el
+tiempo cada rodeo.
+
+La grilla se guarda en disco como un array uint32 mapeado en memoria
+(np.memmap, 4 bytes por celda) junto a un meta.json con los limites, el tamaño
+de celda y la marca de agua. La marca de agua es de insercion, no de tiempo: el
+ultimo "Id" de "LocationHistories" ya leido, o la cantidad de filas ya leidas
+de una traza de trajectory_trace.py. Asi cada `update` suma solo las filas
+nuevas (por COPY binario desde la base), aunque traigan un timestamp viejo o
+igual al de otra lectura.
+
+Los "Id" se asignan al insertar pero se hacen visibles al hacer commit: con
+varios emuladores o el endpoint batch, una transaccion con un "Id" menor puede
+terminar despues de que se leyo uno mayor. Por eso cada `update` de la base
+vuelve a leer los ultimos LATE_ID_MARGIN "Id" bajo la marca de agua y descarta
+los que ya conto (recent_ids.npy guarda los "Id" contados de ese margen). Una
+fila que se hace visible cuando ya pasaron mas de LATE_ID_MARGIN "Id" se pierde
+igual; `update --rebuild` la recupera.
+
+Los conteos de un `update` se juntan en memoria y se aplican de una vez con un
+journal: primero se escribe journal.npz (celdas, valores finales, "Id" recientes y
+el meta.json nuevo), despues la grilla, recent_ids.npy y el meta.json, y al final se borra el journal. Si el
+proceso se corta en el medio, al abrir la grilla se vuelve a aplicar el journal
+(los valores son absolutos, no sumas), asi ninguna lectura se cuenta dos veces.
+
+`export` genera teselas PNG XYZ (z/x/y.png, para L.tileLayer en test_map.html)
+y un GeoJSON con las celdas ocupadas (agrupadas a `--geojson-cell` metros).
+
+    python grazing_heatmap.py update db --farm-id 3
+    python grazing_heatmap.py update trace corrida.trace --name corrida --bounds potreros.geojson
+    python grazing_heatmap.py export farm_3 --zoom 14-18
+"""
+
+import argparse
+import json
+import math
+import os
+import struct
+import sys
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from gps_fleet_engine import KM_PER_DEGREE
+from trajectory_analytics import CopyBinarySink, Pass
+
+DEFAULT_STORE = "heatmap"
+DEFAULT_CELL_M = 10.0
+# Margen alrededor de la extension de los datos cuando la grilla no tiene limites dados
+DATA_MARGIN_M = 100.0
+MAX_CELLS = 50_000_000
+TILE_SIZE = 256
+# Metros por pixel en el ecuador a zoom 0 (Web Mercator)
+EQUATOR_M_PER_PIXEL = 156_543.03392
+
+GRID_FILE = "grid.u32"
+META_FILE = "meta.json"
+JOURNAL_FILE = "journal.npz"
+RECENT_IDS_FILE = "recent_ids.npy"
+# "Id" bajo la marca de agua que cada update de la base vuelve a leer (filas que se hicieron visibles tarde)
+LATE_ID_MARGIN = 100_000
+
+# Escala de color: (posicion 0-1, R, G, B, A)
+COLOR_STOPS = np.array([
+    (0.00, 40, 60, 200, 90),
+    (0.35, 40, 170, 90, 150),
+    (0.65, 250, 210, 40, 190),
+    (1.00, 220, 30, 30, 230),
+])
+
+
+@dataclass
+class GridMeta:
+    lat_min: float
+    lat_max: float
+    lng_min: float
+    lng_max: float
+    cell_m: float
+    rows: int
+    cols: int
+    # Ultimo "Id" de LocationHistories ya leido (fuente db) o filas ya leidas (fuente trace)
+    watermark: Optional[int] = None
+    # Timestamp (us desde epoch) de la lectura mas nueva sumada
+    newest_us: Optional[int] = None
+    readings: int = 0
+    # Lecturas nuevas que cayeron fuera de la grilla
+    outside: int = 0
+    source: str = ""
+    updated: str = ""
+
+    @property
+    def cell_lat(self) -> float:
+        return self.cell_m / (KM_PER_DEGREE * 1000)
+
+    @property
+    def cell_lng(self) -> float:
+        return self.cell_lat / math.cos(math.radians((self.lat_min + self.lat_max) / 2))
+
+    @classmethod
+    def for_bounds(cls, lat_min: float, lat_max: float, lng_min: float, lng_max: float,
+                   cell_m: float = DEFAULT_CELL_M, source: str = "") -> "GridMeta":
+        meta = cls(lat_min, lat_max, lng_min, lng_max, cell_m, 0, 0, source=source)
+        meta.rows = max(1, math.ceil((lat_max - lat_min) / meta.cell_lat))
+        meta.cols = max(1, math.ceil((lng_max - lng_min) / meta.cell_lng))
+        if meta.rows * meta.cols > MAX_CELLS:
+            raise ValueError(f"Grilla de {meta.rows}x{meta.cols} celdas: usar un --cell mayor")
+        # Los limites se ajustan a un numero entero de celdas
+        meta.lat_min = lat_max - meta.rows * meta.cell_lat
+        meta.lng_max = lng_min + meta.cols * meta.cell_lng
+        return meta
+
+    def cell_index(self, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        """Indice plano de la celda de cada punto (fila 0 = norte), -1 fuera de la grilla"""
+        row = np.floor((self.lat_max - lat) / self.cell_lat).astype(np.int64)
+        col = np.floor((lng - self.lng_min) / self.cell_lng).astype(np.int64)
+        inside = (row >= 0) & (row < self.rows) & (col >= 0) & (col < self.cols)
+        return np.where(inside, row * self.cols + col, -1)
+
+
+class HeatmapStore:
+    """Grilla de conteos de una granja en disco (memmap uint32 + meta.json)"""
+
+    def __init__(self, path: str, meta: GridMeta, grid: np.memmap):
+        self.path = path
+        self.meta = meta
+        self.grid = grid
+        # "Id" ya contados dentro del margen bajo la marca de agua (fuente db), ordenados
+        self.recent_ids = np.empty(0, np.int64)
+        recent = os.path.join(path, RECENT_IDS_FILE)
+        if os.path.exists(recent):
+            self.recent_ids = np.load(recent)
+        # Conteos de la actualizacion en curso (celdas ordenadas, sin repetir)
+        self._cells = np.empty(0, np.int64)
+        self._counts = np.empty(0, np.int64)
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return os.path.exists(os.path.join(path, META_FILE))
+
+    @classmethod
+    def create(cls, path: str, meta: GridMeta) -> "HeatmapStore":
+        os.makedirs(path, exist_ok=True)
+        grid = np.memmap(os.path.join(path, GRID_FILE), dtype=np.uint32, mode="w+", shape=(meta.rows, meta.cols))
+        if os.path.exists(os.path.join(path, RECENT_IDS_FILE)):
+            os.remove(os.path.join(path, RECENT_IDS_FILE))
+        store = cls(path, meta, grid)
+        store._write_meta()
+        return store
+
+    @classmethod
+    def open(cls, path: str, mode: str = "r+") -> "HeatmapStore":
+        if os.path.exists(os.path.join(path, JOURNAL_FILE)):
+            # Actualizacion cortada antes de terminar: se completa antes de leer la grilla
+            cls(path, *cls._load(path, "r+"))._replay_journal()
+        return cls(path, *cls._load(path, mode))
+
+    @staticmethod
+    def _load(path: str, mode: str) -> Tuple[GridMeta, np.memmap]:
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            fields = json.load(f)
+        if "watermark_us" in fields:
+            raise ValueError(f"{path}: grilla con la marca de agua por timestamp de una version anterior, "
+                             f"recrearla con --rebuild")
+        meta = GridMeta(**fields)
+        return meta, np.memmap(os.path.join(path, GRID_FILE), dtype=np.uint32, mode=mode,
+                               shape=(meta.rows, meta.cols))
+
+    def begin(self) -> Optional[int]:
+        """Empieza una actualizacion; devuelve la marca de agua desde la que hay que leer"""
+        self._cells = np.empty(0, np.int64)
+        self._counts = np.empty(0, np.int64)
+        return self.meta.watermark
+
+    def add(self, data: Pass):
+        """Cuenta lecturas nuevas (en cualquier orden); la grilla no cambia hasta commit()"""
+        if not len(data):
+            return
+        cells = self.meta.cell_index(data.lat, data.lng)
+        inside = cells >= 0
+        self.meta.outside += int(len(cells) - np.count_nonzero(inside))
+        self.meta.readings += int(np.count_nonzero(inside))
+        # Conteo por celda ocupada (sin un array del tamaño de la grilla por bloque)
+        occupied, counts = np.unique(cells[inside], return_counts=True)
+        merged, inverse = np.unique(np.concatenate([self._cells, occupied]), return_inverse=True)
+        self._counts = np.bincount(inverse, np.concatenate([self._counts, counts]), len(merged)).astype(np.int64)
+        self._cells = merged
+        newest = int(data.timestamp_us.max())
+        self.meta.newest_us = newest if self.meta.newest_us is None else max(self.meta.newest_us, newest)
+
+    def commit(self, watermark: Optional[int]):
+        """Aplica los conteos y avanza la marca de agua a traves del journal"""
+        self.meta.watermark = watermark
+        self.meta.updated = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        flat = self.grid.reshape(-1)
+        values = (flat[self._cells].astype(np.int64) + self._counts).astype(np.uint32)
+        journal = os.path.join(self.path, JOURNAL_FILE)
+        with open(journal + ".tmp", "wb") as f:
+            np.savez(f, cells=self._cells, values=values, recent_ids=self.recent_ids,
+                     meta=np.array(json.dumps(asdict(self.meta))))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(journal + ".tmp", journal)
+        self._replay_journal()
+        self._cells = np.empty(0, np.int64)
+        self._counts = np.empty(0, np.int64)
+
+    def _replay_journal(self):
+        """Escribe los valores finales del journal en la grilla, los "Id" recientes y el meta.json, y lo borra"""
+        journal = os.path.join(self.path, JOURNAL_FILE)
+        with np.load(journal) as data:
+            self.grid.reshape(-1)[data["cells"]] = data["values"]
+            self.recent_ids = data["recent_ids"]
+            self.meta = GridMeta(**json.loads(str(data["meta"])))
+        self.grid.flush()
+        temp = os.path.join(self.path, RECENT_IDS_FILE + ".tmp.npy")
+        np.save(temp, self.recent_ids)
+        os.replace(temp, os.path.join(self.path, RECENT_IDS_FILE))
+        self._write_meta()
+        os.remove(journal)
+
+    def _write_meta(self):
+        temp = os.path.join(self.path, META_FILE + ".tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(asdict(self.meta), f, indent=2)
+        os.replace(temp, os.path.join(self.path, META_FILE))
+
+
+# --- Fuentes ---
+
+def _iso(timestamp_us: int) -> str:
+    return str(np.datetime64(int(timestamp_us), "us")) + "+00:00"
+
+
+def add_new_ids(store: HeatmapStore, data: Pass, last_id: int):
+    """Suma las filas de `data` (Pass.animal trae el "Id" de la fila) que no se contaron antes
+
+    Deja en store.recent_ids los "Id" contados dentro del margen bajo `last_id`.
+    """
+    fresh = ~np.isin(data.animal, store.recent_ids)
+    ids = data.animal[fresh]
+    store.add(Pass(ids, data.timestamp_us[fresh], data.lat[fresh], data.lng[fresh]))
+    low = last_id - LATE_ID_MARGIN
+    store.recent_ids = np.union1d(store.recent_ids[store.recent_ids > low], ids[ids > low]).astype(np.int64)
+
+
+def db_update(store: HeatmapStore, farm_id: int, since_id: Optional[int]) -> Optional[int]:
+    """Lecturas de los animales de la granja con "Id" posterior a la marca de agua, por COPY binario
+
+    Vuelve a leer los ultimos LATE_ID_MARGIN "Id" bajo la marca de agua y salta los ya
+    contados, asi suma las filas de transacciones que terminaron despues de la lectura
+    anterior. Devuelve la marca de agua nueva: el "Id" mas alto al empezar (las filas
+    insertadas mientras corre el COPY quedan para el proximo update).
+    """
+    from history_copy_generator import TABLE
+    from tracker_db import connection
+
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(f'SELECT MAX("Id") FROM {TABLE}')
+        last_id = cur.fetchone()[0]
+        if last_id is None:
+            return since_id
+        where, params = 'a."FarmId" = %s AND lh."Id" <= %s', (farm_id, last_id)
+        if since_id is not None:
+            where += ' AND lh."Id" > %s'
+            params += (since_id - LATE_ID_MARGIN,)
+        # El "Id" de la fila va en la columna del animal (el mapa de calor no lo usa)
+        query = cur.mogrify(
+            f'SELECT lh."Id", lh."Timestamp", lh."Latitude", lh."Longitude" FROM {TABLE} lh '
+            f'JOIN "Animals" a ON a."Id" = lh."AnimalId" WHERE {where}', params).decode("utf-8")
+        sink = CopyBinarySink(lambda data: add_new_ids(store, data, last_id))
+        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT binary)", sink, size=1024 * 1024)
+        sink.result()
+    return max(int(last_id), since_id or 0)
+
+
+def db_extent(farm_id: int) -> Optional[Tuple[float, float, float, float]]:
+    """(lat_min, lat_max, lng_min, lng_max) de la granja: su limite o, si no tiene, su historial"""
+    from history_copy_generator import TABLE
+    from tracker_db import connection
+
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute('SELECT MIN("Latitude"), MAX("Latitude"), MIN("Longitude"), MAX("Longitude") '
+                    'FROM "FarmBoundaries" WHERE "FarmId" = %s', (farm_id,))
+        extent = cur.fetchone()
+        if extent[0] is None:
+            cur.execute(f'SELECT MIN(lh."Latitude"), MAX(lh."Latitude"), MIN(lh."Longitude"), '
+                        f'MAX(lh."Longitude") FROM {TABLE} lh JOIN "Animals" a ON a."Id" = lh."AnimalId" '
+                        f'WHERE a."FarmId" = %s', (farm_id,))
+            extent = cur.fetchone()
+    return None if extent[0] is None else tuple(float(value) for value in extent)
+
+
+def trace_blocks(path: str) -> Iterator[Pass]:
+    from trajectory_trace import read_trace
+
+    for block in read_trace(path):
+        yield Pass(block.devices.astype(np.int64), block.timestamps,
+                   block.columns["latitude"], block.columns["longitude"])
+
+
+def trace_update(store: HeatmapStore, path: str, since_rows: Optional[int]) -> int:
+    """Filas de la traza a partir de la marca de agua (filas ya leidas); devuelve el total de filas"""
+    skip = since_rows or 0
+    rows = 0
+    for data in trace_blocks(path):
+        first = min(max(skip - rows, 0), len(data))
+        rows += len(data)
+        if first < len(data):
+            store.add(Pass(data.animal[first:], data.timestamp_us[first:], data.lat[first:], data.lng[first:]))
+    return max(rows, skip)
+
+
+def trace_extent(path: str) -> Optional[Tuple[float, float, float, float]]:
+    extent = None
+    for data in trace_blocks(path):
+        valid = np.isfinite(data.lat) & np.isfinite(data.lng)
+        if not valid.any():
+            continue
+        block = (data.lat[valid].min(), data.lat[valid].max(), data.lng[valid].min(), data.lng[valid].max())
+        extent = block if extent is None else (min(extent[0], block[0]), max(extent[1], block[1]),
+                                               min(extent[2], block[2]), max(extent[3], block[3]))
+    return None if extent is None else tuple(float(value) for value in extent)
+
+
+def geofence_extent(spec: str, api_base_url: Optional[str] = None) -> Tuple[float, float, float, float]:
+    """Caja que envuelve los potreros (GeoJSON, api:<farmId> o db:<farmId>, ver pasture_geofence)"""
+    from pasture_geofence import load_geofence
+
+    geofence = load_geofence(spec, api_base_url)
+    return (float(geofence.lat_min.min()), float(geofence.lat_max.max()),
+            float(geofence.lng_min.min()), float(geofence.lng_max.max()))
+
+
+def padded(extent: Tuple[float, float, float, float], margin_m: float) -> Tuple[float, float, float, float]:
+    lat_min, lat_max, lng_min, lng_max = extent
+    d_lat = margin_m / (KM_PER_DEGREE * 1000)
+    d_lng = d_lat / math.cos(math.radians((lat_min + lat_max) / 2))
+    return lat_min - d_lat, lat_max + d_lat, lng_min - d_lng, lng_max + d_lng
+
+
+def update(path: str, extent: Callable[[], Optional[Tuple[float, float, float, float]]],
+           read: Callable[[HeatmapStore, Optional[int]], Optional[int]], cell_m: float = DEFAULT_CELL_M,
+           source: str = "", rebuild: bool = False, margin_m: float = DATA_MARGIN_M) -> Optional[HeatmapStore]:
+    """Crea la grilla si hace falta y suma las lecturas nuevas desde la marca de agua
+
+    `read(store, since)` pasa las lecturas nuevas a store.add y devuelve la marca de agua nueva.
+    """
+    if rebuild or not HeatmapStore.exists(path):
+        bounds = extent()
+        if bounds is None:
+            return None
+        store = HeatmapStore.create(path, GridMeta.for_bounds(*padded(bounds, margin_m), cell_m, source))
+    else:
+        store = HeatmapStore.open(path)
+    store.commit(read(store, store.begin()))
+    return store
+
+
+# --- Exportacion ---
+
+def pooled(grid: np.ndarray, level: int) -> np.ndarray:
+    """Grilla con celdas 2^level veces mas grandes (suma de bloques)"""
+    for _ in range(level):
+        rows, cols = grid.shape
+        grid = np.pad(grid, ((0, rows % 2), (0, cols % 2)))
+        grid = grid.reshape(grid.shape[0] // 2, 2, grid.shape[1] // 2, 2).sum(axis=(1, 3))
+    return grid
+
+
+def colorize(values: np.ndarray, top: float) -> np.ndarray:
+    """RGBA uint8 con escala logaritmica; las celdas vacias quedan transparentes"""
+    scaled = np.log1p(values) / math.log1p(max(top, 1))
+    rgba = np.stack([np.interp(scaled, COLOR_STOPS[:, 0], COLOR_STOPS[:, i]) for i in range(1, 5)], axis=-1)
+    rgba[values == 0] = 0
+    return rgba.astype(np.uint8)
+
+
+def png_bytes(rgba: np.ndarray) -> bytes:
+    """PNG RGBA de 8 bits (zlib, sin dependencias de imagen)"""
+    height, width, _ = rgba.shape
+    raw = np.concatenate([np.zeros((height, 1), np.uint8), rgba.reshape(height, width * 4)], axis=1)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+def tile_range(meta: GridMeta, zoom: int) -> Tuple[range, range]:
+    n = 2 ** zoom
+
+    def tile_x(lng):
+        return int((lng + 180) / 360 * n)
+
+    def tile_y(lat):
+        lat_rad = math.radians(lat)
+        return int((1 - math.asinh(math.tan(lat_rad)) / math.pi) / 2 * n)
+
+    return (range(tile_x(meta.lng_min), tile_x(meta.lng_max) + 1),
+            range(tile_y(meta.lat_max), tile_y(meta.lat_min) + 1))
+
+
+def export_tiles(store: HeatmapStore, out_dir: str, zooms: List[int]) -> int:
+    """Teselas XYZ z/x/y.png que tocan la grilla (las vacias no se escriben)"""
+    meta = store.meta
+    grid = np.asarray(store.grid)
+    center_lat = math.radians((meta.lat_min + meta.lat_max) / 2)
+    pixel = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+    written = 0
+    for zoom in zooms:
+        # Con pixeles mas grandes que las celdas se suma la grilla en bloques
+        pixel_m = EQUATOR_M_PER_PIXEL * math.cos(center_lat) / 2 ** zoom
+        level = max(0, int(math.floor(math.log2(max(pixel_m / meta.cell_m, 1)))))
+        level_grid = pooled(grid, level)
+        factor = 2 ** level
+        top = float(level_grid.max())
+        n = 2 ** zoom
+        xs, ys = tile_range(meta, zoom)
+        for x in xs:
+            lng = (x + pixel) / n * 360 - 180
+            col = np.floor((lng - meta.lng_min) / (meta.cell_lng * factor)).astype(np.int64)
+            for y in ys:
+                lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + pixel) / n))))
+                row = np.floor((meta.lat_max - lat) / (meta.cell_lat * factor)).astype(np.int64)
+                valid = ((row >= 0) & (row < level_grid.shape[0]))[:, None] & \
+                        ((col >= 0) & (col < level_grid.shape[1]))[None, :]
+                values = np.where(valid, level_grid[np.clip(row, 0, level_grid.shape[0] - 1)[:, None],
+                                                    np.clip(col, 0, level_grid.shape[1] - 1)[None, :]], 0)
+                if not values.any():
+                    continue
+                tile_dir = os.path.join(out_dir, str(zoom), str(x))
+                os.makedirs(tile_dir, exist_ok=True)
+                with open(os.path.join(tile_dir, f"{y}.png"), "wb") as f:
+                    f.write(png_bytes(colorize(values, top)))
+                written += 1
+    return written
+
+
+def export_geojson(store: HeatmapStore, path: str, cell_m: float = 50.0, min_readings: int = 1) -> int:
+    """Celdas ocupadas (agrupadas a ~cell_m metros) como poligonos con su conteo"""
+    meta = store.meta
+    level = max(0, int(round(math.log2(max(cell_m / meta.cell_m, 1)))))
+    grid = pooled(np.asarray(store.grid), level)
+    factor = 2 ** level
+    rows, cols = np.nonzero(grid >= max(1, min_readings))
+    counts = grid[rows, cols]
+    total = max(int(grid.sum()), 1)
+    d_lat, d_lng = meta.cell_lat * factor, meta.cell_lng * factor
+    features = []
+    for row, col, count in zip(rows.tolist(), cols.tolist(), counts.tolist()):
+        north = meta.lat_max - row * d_lat
+        west = meta.lng_min + col * d_lng
+        ring = [[west, north], [west + d_lng, north], [west + d_lng, north - d_lat], [west, north - d_lat],
+                [west, north]]
+        features.append({"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [ring]},
+                         "properties": {"readings": count, "share": round(count / total, 6)}})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features,
+                   "properties": {"cell_m": meta.cell_m * factor, "readings": meta.readings,
+                                  "newest": _iso(meta.newest_us) if meta.newest_us else None}}, f)
+    return len(features)
+
+
+def parse_zooms(text: str) -> List[int]:
+    first, _, last = text.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+
+def print_info(store: HeatmapStore):
+    meta = store.meta
+    grid = np.asarray(store.grid)
+    occupied = int(np.count_nonzero(grid))
+    print(f"Grilla: {meta.rows} x {meta.cols} celdas de {meta.cell_m:g} m "
+          f"({os.path.getsize(os.path.join(store.path, GRID_FILE)) / 1e6:,.1f} MB)")
+    print(f"Limites: lat {meta.lat_min:.6f} .. {meta.lat_max:.6f}, lng {meta.lng_min:.6f} .. {meta.lng_max:.6f}")
+    print(f"Lecturas: {meta.readings:,} en {occupied:,} celdas ocupadas | fuera de la grilla: {meta.outside:,}")
+    kind = "filas leidas" if meta.source.startswith("trace:") else "ultimo Id"
+    newest = _iso(meta.newest_us) if meta.newest_us else "(vacia)"
+    print(f"Marca de agua: {kind} {meta.watermark if meta.watermark is not None else '-'} | "
+          f"lectura mas nueva: {newest} | fuente: {meta.source}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mapa de calor de pastoreo incremental por granja")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="Directorio de las grillas")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    update_parser = subparsers.add_parser("update", help="Suma las lecturas nuevas desde la marca de agua")
+    update_parser.add_argument("--cell", type=float, default=DEFAULT_CELL_M, help="Metros por celda (al crear)")
+    update_parser.add_argument("--bounds", default=None,
+                               help="Limites de la grilla al crearla: GeoJSON, api:<farmId> o db:<farmId> "
+                                    "(default: limite de la granja o extension de los datos)")
+    update_parser.add_argument("--api", default=None, help="URL base del API (para --bounds api:<farmId>)")
+    update_parser.add_argument("--rebuild", action="store_true", help="Recrea la grilla desde cero")
+    sources = update_parser.add_subparsers(dest="source", required=True)
+    db = sources.add_parser("db", help="LocationHistories de los animales de cada granja")
+    db.add_argument("--farm-id", type=int, action="append", required=True, help="Granja (repetible)")
+    from tracker_db import add_db_arguments
+    add_db_arguments(db)
+    trace = sources.add_parser("trace", help="Traza de trajectory_trace.py")
+    trace.add_argument("path", help="Archivo de traza")
+    trace.add_argument("--name", default=None, help="Nombre de la grilla (default: nombre del archivo)")
+
+    export = subparsers.add_parser("export", help="Teselas PNG y GeoJSON de una grilla")
+    export.add_argument("name", help="Grilla (p.ej. farm_3)")
+    export.add_argument("--zoom", default="14-18", help="Niveles de zoom, p.ej. 15 o 13-18")
+    export.add_argument("--geojson-cell", type=float, default=50.0, help="Metros por celda del GeoJSON")
+    export.add_argument("--min-readings", type=int, default=1, help="Lecturas minimas por celda en el GeoJSON")
+
+    info = subparsers.add_parser("info", help="Resumen de una grilla")
+    info.add_argument("name", help="Grilla (p.ej. farm_3)")
+    args = parser.parse_args()
+
+    if args.command == "update":
+        if args.source == "db":
+            from tracker_db import config_from_args, configure
+            configure(config_from_args(args))
+            targets = [(f"farm_{farm_id}", f"db:farm {farm_id}",
+                        (lambda farm_id=farm_id: db_extent(farm_id)),
+                        (lambda store, since, farm_id=farm_id: db_update(store, farm_id, since)))
+                       for farm_id in args.farm_id]
+        else:
+            name = args.name or os.path.splitext(os.path.basename(args.path))[0]
+            targets = [(name, f"trace:{args.path}", lambda: trace_extent(args.path),
+                        lambda store, since: trace_update(store, args.path, since))]
+
+        for name, source, extent, read in targets:
+            if args.bounds:
+                extent = (lambda: geofence_extent(args.bounds, args.api))
+            path = os.path.join(args.store, name)
+            before = HeatmapStore.open(path).meta.readings if HeatmapStore.exists(path) and not args.rebuild else 0
+            start = time.perf_counter()
+            store = update(path, extent, read, args.cell, source, args.rebuild)
+            if store is None:
+                print(f"{name}: sin limites ni lecturas para armar la grilla", file=sys.stderr)
+                continue
+            print(f"{name}: +{store.meta.readings - before:,} lecturas en {time.perf_counter() - start:.1f}s")
+            print_info(store)
+        return
+
+    store = HeatmapStore.open(os.path.join(args.store, args.name), mode="r")
+    if args.command == "info":
+        print_info(store)
+        return
+
+    tiles_dir = os.path.join(args.store, args.name, "tiles")
+    start = time.perf_counter()
+    tiles = export_tiles(store, tiles_dir, parse_zooms(args.zoom))
+    geojson_path = os.path.join(args.store, args.name, "heatmap.geojson")
+    cells = export_geojson(store, geojson_path, args.geojson_cell, args.min_readings)
+    print(f"{tiles} teselas en {tiles_dir}/{{z}}/{{x}}/{{y}}.png y {cells} celdas en {geojson_path} "
+          f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
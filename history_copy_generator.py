@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generador masivo de historial GPS para la tabla "LocationHistories"
+Usa el motor vectorizado de movimiento (gps_fleet_engine.py) para simular
+dias o meses de recorrido y escribe las filas en formato COPY de PostgreSQL
+(texto o binario), ya sea a un archivo, a stdout o directo a la base con
+psycopg2 copy_expert. Las filas se generan por bloques de `chunk_rows`, asi
+la memoria no crece con la cantidad de filas.
+
+Sirve para probar con decenas de millones de filas las consultas
+/api/tracking/animal/{animalId}/location-history y animals-in-area, algo
+inviable enviando cada lectura por POST.
+
+Ejemplos:
+  python history_copy_generator.py --devices 1000 --days 30 --output historial.copy
+  python history_copy_generator.py --db --days 90 --seed 7
+"""
+
+import argparse
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from gps_fleet_engine import FleetState, sensor_readings, step_fleet
+from sim_random import stream_uniforms
+from tracker_db import add_db_arguments, config_from_args, configure, connection
+
+CENTER_LAT = -33.0167
+CENTER_LNG = -58.5167
+
+TABLE = '"LocationHistories"'
+# DeviceId va al final: es la unica columna de largo variable
+COPY_COLUMNS = ["AnimalId", "TrackerId", "Latitude", "Longitude", "Altitude", "Speed",
+                "ActivityLevel", "Temperature", "SignalStrength", "Timestamp", "DeviceId"]
+
+COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_BINARY_TRAILER = struct.pack(">h", -1)
+# Los timestamps binarios de PostgreSQL cuentan microsegundos desde 2000-01-01 UTC
+PG_EPOCH_US = 946_684_800 * 1_000_000
+
+# Tick del stream de cada dispositivo usado para su desfase dentro del intervalo
+_PHASE_TICK = -2
+
+
+@dataclass
+class HistoryDevice:
+    animal_id: int
+    tracker_id: int
+    device_id: str
+
+
+def copy_sql(fmt: str) -> str:
+    columns = ", ".join(f'"{name}"' for name in COPY_COLUMNS)
+    return f"COPY {TABLE} ({columns}) FROM STDIN WITH (FORMAT {fmt})"
+
+
+def synthetic_devices(count: int, first_animal_id: int = 1, first_tracker_id: int = 1) -> List[HistoryDevice]:
+    """Dispositivos COW_GPS_ER_{n} con ids consecutivos (para generar archivos sin base)"""
+    return [HistoryDevice(first_animal_id + i, first_tracker_id + i, f"COW_GPS_ER_{i + 1:02d}")
+            for i in range(count)]
+
+
+def load_devices(conn) -> List[HistoryDevice]:
+    """Animales con tracker asignado (las claves foraneas de LocationHistories deben existir)"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT a."Id", t."Id", t."DeviceId"
+        FROM "Animals" a
+        JOIN "Trackers" t ON t."Id" = a."TrackerId"
+        ORDER BY a."Id"
+    """)
+    devices = [HistoryDevice(animal_id, tracker_id, device_id) for animal_id, tracker_id, device_id in cur.fetchall()]
+    cur.close()
+    return devices
+
+
+class HistoryGenerator:
+    """Produce bloques de columnas NumPy planas (una entrada por fila)
+
+    Con pocos collares el costo fijo de cada paso vectorizado domina, asi que el
+    rango de tiempo se parte en `segments` tramos que avanzan en paralelo como
+    si fueran collares distintos; cada tramo arranca en el punto base de su vaca.
+    segments=1 da una sola trayectoria continua por animal.
+    """
+
+    # Filas por paso a partir de las cuales no hace falta partir en tramos
+    TARGET_WIDTH = 1024
+
+    def __init__(self, devices: List[HistoryDevice], start: datetime, interval: float = 20.0,
+                 seed: Optional[int] = None, base_lat: float = CENTER_LAT, base_lng: float = CENTER_LNG,
+                 segments: Optional[int] = None):
+        self.devices = devices
+        self.start_us = int(start.timestamp() * 1_000_000)
+        self.interval = interval
+        self.seed = seed
+        self.base_lat = base_lat
+        self.base_lng = base_lng
+        self.segments = segments
+        self.rng = np.random.default_rng(seed)
+
+    def _create_fleet(self, segments: int) -> FleetState:
+        n = len(self.devices)
+        stream_ids = [device.device_id if segment == 0 else f"{device.device_id}#{segment}"
+                      for segment in range(segments) for device in self.devices]
+        fleet = FleetState.create(0, self.rng, self.base_lat, self.base_lng, seed=self.seed,
+                                  device_ids=stream_ids)
+        # Todos los tramos de una vaca comparten su punto base
+        for name in ("base_lat", "base_lng"):
+            setattr(fleet, name, np.tile(getattr(fleet, name)[:n], segments))
+        fleet.lat = fleet.base_lat.copy()
+        fleet.lng = fleet.base_lng.copy()
+        return fleet
+
+    def _phase_us(self, fleet: FleetState) -> np.ndarray:
+        """Desfase fijo de cada collar dentro del intervalo (no reportan todos a la vez)"""
+        n = len(self.devices)
+        if fleet.keys is not None:
+            phase = stream_uniforms(fleet.keys[:n], _PHASE_TICK, 0) * self.interval
+        else:
+            phase = self.rng.uniform(0, self.interval, n)
+        return (phase * 1_000_000).astype(np.int64)
+
+    def chunks(self, ticks: int, chunk_rows: int = 100_000) -> Iterator[Dict[str, np.ndarray]]:
+        """Bloques de hasta ~chunk_rows filas; "device" es el indice en self.devices"""
+        n = len(self.devices)
+        segments = self.segments or max(1, min(ticks, -(-self.TARGET_WIDTH // max(n, 1))))
+        segment_ticks = -(-ticks // segments)
+        width = n * segments
+
+        fleet = self._create_fleet(segments)
+        phase_us = np.tile(self._phase_us(fleet), segments)
+        device = np.tile(np.arange(n), segments)
+        segment_start = np.repeat(np.arange(segments, dtype=np.int64) * segment_ticks, n)
+        animal_ids = np.array([d.animal_id for d in self.devices], dtype=np.int64)[device]
+        tracker_ids = np.array([d.tracker_id for d in self.devices], dtype=np.int64)[device]
+        ticks_per_chunk = max(1, chunk_rows // width)
+        interval_us = int(self.interval * 1_000_000)
+
+        for local_start in range(0, segment_ticks, ticks_per_chunk):
+            k = min(ticks_per_chunk, segment_ticks - local_start)
+            columns = {
+                "Latitude": np.empty((k, width)),
+                "Longitude": np.empty((k, width)),
+                "Altitude": np.empty((k, width)),
+                "Speed": np.empty((k, width)),
+                "ActivityLevel": np.empty((k, width), dtype=np.int64),
+                "Temperature": np.empty((k, width)),
+                "SignalStrength": np.empty((k, width), dtype=np.int64),
+            }
+            for j in range(k):
+                step_fleet(fleet, self.rng, self.interval)
+                altitude, _, signal = sensor_readings(fleet, self.rng)
+                columns["Latitude"][j] = fleet.lat
+                columns["Longitude"][j] = fleet.lng
+                columns["Altitude"][j] = altitude
+                columns["Speed"][j] = fleet.speed
+                columns["ActivityLevel"][j] = fleet.activity
+                columns["Temperature"][j] = fleet.temperature
+                columns["SignalStrength"][j] = signal
+
+            tick_index = segment_start[None, :] + (local_start + np.arange(k, dtype=np.int64))[:, None]
+            # El ultimo tramo puede pasarse del total pedido
+            valid = (tick_index < ticks).ravel()
+
+            chunk = {name: values.ravel()[valid] for name, values in columns.items()}
+            chunk["Timestamp"] = (self.start_us + tick_index * interval_us + phase_us[None, :]).ravel()[valid]
+            chunk["AnimalId"] = np.tile(animal_ids, k)[valid]
+            chunk["TrackerId"] = np.tile(tracker_ids, k)[valid]
+            chunk["device"] = np.tile(device, k)[valid]
+            yield chunk
+
+
+def _escape_text(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class TextEncoder:
+    """Formato COPY texto: una linea por fila, columnas separadas por tab"""
+
+    ROW_FORMAT = "%d\t%d\t%r\t%r\t%r\t%r\t%d\t%r\t%d\t%s+00\t%s\n"
+
+    def __init__(self, devices: List[HistoryDevice]):
+        self.device_ids = [_escape_text(device.device_id) for device in devices]
+
+    def header(self) -> bytes:
+        return b""
+
+    def trailer(self) -> bytes:
+        return b""
+
+    def encode(self, chunk: Dict[str, np.ndarray]) -> bytes:
+        timestamps = np.datetime_as_string(chunk["Timestamp"].astype("datetime64[us]"), unit="us")
+        values = [chunk[name].tolist() for name in COPY_COLUMNS[:-2]]
+        device_ids = [self.device_ids[i] for i in chunk["device"].tolist()]
+        fmt = self.ROW_FORMAT
+        return "".join(fmt % row for row in zip(*values, timestamps.tolist(), device_ids)).encode("utf-8")
+
+
+class BinaryEncoder:
+    """Formato COPY binario armado con arrays estructurados (sin lazo por fila)
+
+    Los dispositivos se agrupan por largo del DeviceId; dentro de cada grupo todas
+    las filas miden lo mismo y se escriben con un solo tobytes(). El orden de las
+    filas dentro del bloque no importa para COPY.
+    """
+
+    _FIELD_TYPES = {
+        "AnimalId": ">i4", "TrackerId": ">i4", "Latitude": ">f8", "Longitude": ">f8",
+        "Altitude": ">f8", "Speed": ">f8", "ActivityLevel": ">i4", "Temperature": ">f8",
+        "SignalStrength": ">i4", "Timestamp": ">i8",
+    }
+
+    def __init__(self, devices: List[HistoryDevice]):
+        encoded = [device.device_id.encode("utf-8") for device in devices]
+        lengths = np.array([len(value) for value in encoded])
+        # Grupo de cada dispositivo y, por grupo, su dtype de fila
+        self.device_group = np.zeros(len(encoded), dtype=np.int64)
+        self.dtypes = []
+        for group, length in enumerate(np.unique(lengths)):
+            self.device_group[lengths == length] = group
+            fields = [("field_count", ">i2")]
+            for name in COPY_COLUMNS[:-1]:
+                fields += [(name + "_len", ">i4"), (name, self._FIELD_TYPES[name])]
+            fields += [("DeviceId_len", ">i4"), ("DeviceId", f"S{length}")]
+            self.dtypes.append(np.dtype(fields))
+        self.device_bytes = np.array(encoded, dtype=object)
+
+    def header(self) -> bytes:
+        return COPY_BINARY_HEADER
+
+    def trailer(self) -> bytes:
+        return COPY_BINARY_TRAILER
+
+    def encode(self, chunk: Dict[str, np.ndarray]) -> bytes:
+        groups = self.device_group[chunk["device"]]
+        parts = []
+        for group, dtype in enumerate(self.dtypes):
+            selected = groups == group if len(self.dtypes) > 1 else slice(None)
+            devices = chunk["device"][selected]
+            if not len(devices):
+                continue
+            rows = np.empty(len(devices), dtype=dtype)
+            rows["field_count"] = len(COPY_COLUMNS)
+            for name in COPY_COLUMNS[:-1]:
+                values = chunk[name][selected]
+                if name == "Timestamp":
+                    values = values - PG_EPOCH_US
+                rows[name] = values
+                rows[name + "_len"] = dtype[name].itemsize
+            rows["DeviceId"] = self.device_bytes[devices].astype(dtype["DeviceId"])
+            rows["DeviceId_len"] = dtype["DeviceId"].itemsize
+            parts.append(rows.tobytes())
+        return b"".join(parts)
+
+
+def copy_stream(generator: HistoryGenerator, ticks: int, fmt: str = "binary",
+                chunk_rows: int = 100_000, progress=None) -> Iterator[bytes]:
+    """Bytes del stream COPY completo: cabecera, un bloque por chunk y cierre"""
+    encoder = BinaryEncoder(generator.devices) if fmt == "binary" else TextEncoder(generator.devices)
+    yield encoder.header()
+    for columns in generator.chunks(ticks, chunk_rows):
+        data = encoder.encode(columns)
+        if progress is not None:
+            progress(len(columns["Timestamp"]), len(data))
+        yield data
+    yield encoder.trailer()
+
+
+class CopyStreamReader:
+    """Objeto tipo archivo sobre copy_stream para cursor.copy_expert"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = memoryview(b"")
+
+    def read(self, size: int = -1) -> bytes:
+        while not len(self._buffer):
+            try:
+                self._buffer = memoryview(next(self._chunks))
+            except StopIteration:
+                return b""
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = self._buffer[:size].tobytes()
+        self._buffer = self._buffer[size:]
+        return data
+
+
+class Progress:
+    def __init__(self, total_rows: int):
+        self.total_rows = total_rows
+        self.rows = 0
+        self.bytes = 0
+        self.start = time.monotonic()
+        self._last_print = 0.0
+
+    def __call__(self, rows: int, size: int):
+        self.rows += rows
+        self.bytes += size
+        now = time.monotonic()
+        if now - self._last_print >= 2 or self.rows >= self.total_rows:
+            self._last_print = now
+            elapsed = now - self.start
+            print(f"  {self.rows:,}/{self.total_rows:,} filas ({self.rows / max(elapsed, 1e-9):,.0f}/s, "
+                  f"{self.bytes / 1e6:,.0f} MB)", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera historial GPS masivo en formato COPY de PostgreSQL")
+    parser.add_argument("--devices", type=int, default=100, help="Dispositivos sinteticos (sin --db)")
+    parser.add_argument("--first-animal-id", type=int, default=1, help="AnimalId del primer dispositivo sintetico")
+    parser.add_argument("--first-tracker-id", type=int, default=1, help="TrackerId del primer dispositivo sintetico")
+    parser.add_argument("--days", type=float, default=7.0, help="Dias de historial a generar")
+    parser.add_argument("--interval", type=float, default=20.0, help="Segundos entre lecturas de cada collar")
+    parser.add_argument("--start", default=None, help="Fecha ISO de la primera lectura (default: hace --days dias)")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla para trayectorias reproducibles")
+    parser.add_argument("--segments", type=int, default=None,
+                        help="Tramos de tiempo simulados en paralelo (default: automatico; 1 = trayectoria continua)")
+    parser.add_argument("--format", choices=["binary", "text"], default="binary")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Filas por bloque generado")
+    parser.add_argument("--output", default=None, help="Archivo destino ('-' = stdout)")
+    parser.add_argument("--db", action="store_true", help="Cargar directo en la base con COPY")
+    add_db_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.db and not args.output:
+        parser.error("indicar --output o --db")
+
+    pool = None
+    if args.db:
+        pool = configure(config_from_args(args), maxconn=1)
+        with connection(pool) as conn:
+            devices = load_devices(conn)
+        if not devices:
+            print("No hay animales con tracker asignado en la base", file=sys.stderr)
+            return
+    else:
+        devices = synthetic_devices(args.devices, args.first_animal_id, args.first_tracker_id)
+
+    if args.start:
+        start = datetime.fromisoformat(args.start)
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+    else:
+        start = datetime.now(timezone.utc) - timedelta(days=args.days)
+
+    ticks = int(args.days * 86400 / args.interval)
+    total_rows = ticks * len(devices)
+    print(f"Generando {total_rows:,} filas: {len(devices)} dispositivos x {ticks:,} lecturas "
+          f"desde {start.isoformat()}", file=sys.stderr)
+
+    generator = HistoryGenerator(devices, start, args.interval, args.seed, segments=args.segments)
+    progress = Progress(total_rows)
+    stream = copy_stream(generator, ticks, args.format, args.chunk_rows, progress)
+
+    if pool is not None:
+        with connection(pool) as conn, conn.cursor() as cur:
+            cur.copy_expert(copy_sql(args.format), CopyStreamReader(stream), size=1024 * 1024)
+            conn.commit()
+            # Estadisticas al dia para que el planner use el indice de Timestamp
+            cur.execute(f"ANALYZE {TABLE}")
+        print(f"Cargadas {progress.rows:,} filas en {TABLE}", file=sys.stderr)
+        return
+
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for data in stream:
+            out.write(data)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+    if args.output != "-":
+        print(f"Escrito {args.output}. Para cargarlo desde psql:", file=sys.stderr)
+        columns = ", ".join(f'"{name}"' for name in COPY_COLUMNS)
+        print(f"  \\copy {TABLE} ({columns}) FROM '{args.output}' WITH (FORMAT {args.format})",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
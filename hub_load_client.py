@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga del lado de difusion: suscriptores de LiveTrackingHub (SignalR)
+Abre miles de conexiones WebSocket concurrentes a /tracking-hub con el
+protocolo JSON de SignalR, cada una se une a grupos de granja
+(JoinFarmGroup) y/o de animal (JoinAnimalGroup) y mide la latencia de punta a
+punta: desde el `timestamp` de la lectura que mando el emulador hasta que el
+mensaje LocationUpdate / AnimalLocationUpdate llega al suscriptor.
+
+La latencia se calcula con el reloj de pared, asi que el emulador tiene que
+usar la hora real (no sim_clock.VirtualClock) y correr en la misma maquina o
+con los relojes sincronizados; las diferencias negativas cuentan como 0.
+Un solo proceso de Python recibe unos pocos miles de mensajes por segundo: si
+la latencia crece sin parar y el cliente esta al 100% de CPU, el techo medido
+es el del cliente; repartir las conexiones en varios procesos.
+
+El hub exige JWT: --token, o --username/--password para hacer login en
+/api/users/login. Sin API, stub_tracking_server.py incluye un hub local que
+difunde lo que recibe en la ingesta (no valida el token):
+    python stub_tracking_server.py --port 5999 --hub-farms 10
+    python hub_load_client.py --api http://localhost:5999 --connections 5000 --farms 1-10 --duration 60
+    python load_test_tracker_ingest.py --api http://localhost:5999 --rate 200 --duration 60
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+import requests
+
+from gps_transport import DEFAULT_API_BASE_URL
+from latency_stats import LatencyHistogram
+
+HUB_PATH = "/tracking-hub"
+LOGIN_PATH = "/api/users/login"
+RECORD_SEPARATOR = "\x1e"
+HANDSHAKE = {"protocol": "json", "version": 1}
+
+# Tipos de mensaje del protocolo de hubs de SignalR
+INVOCATION = 1
+COMPLETION = 3
+PING = 6
+CLOSE = 7
+
+# KeepAliveInterval del API (Program.cs); el servidor corta a los 30 s sin noticias
+PING_INTERVAL = 15.0
+CLOSE_TIMEOUT = 2.0
+LOCATION_METHODS = ("LocationUpdate", "AnimalLocationUpdate")
+REPORT_PERCENTILES = (50, 95, 99, 99.9)
+
+
+def encode_message(message: dict) -> str:
+    return json.dumps(message, separators=(",", ":")) + RECORD_SEPARATOR
+
+
+def parse_messages(text: str) -> List[dict]:
+    """Mensajes de un frame de texto (cada uno termina en el separador 0x1E)"""
+    return [json.loads(part) for part in text.split(RECORD_SEPARATOR) if part]
+
+
+def parse_timestamp(value: str) -> Optional[float]:
+    """Epoch de un timestamp ISO 8601 (.NET manda hasta 7 decimales; sin zona = UTC)"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_ids(text: str) -> List[str]:
+    """'7', '1,3,8' o '1-10' (rangos inclusive) -> ids como texto (los metodos del hub reciben string)"""
+    ids = []
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        if "-" in part:
+            first, last = part.split("-", 1)
+            ids.extend(str(i) for i in range(int(first), int(last) + 1))
+        else:
+            ids.append(part)
+    return ids
+
+
+def plan_groups(index: int, farms: List[str], animals: List[str], groups_per_connection: int = 1
+                ) -> List[Tuple[str, str]]:
+    """Grupos de la conexion `index`: reparte granjas y animales round-robin entre las conexiones"""
+    groups = []
+    for n in range(groups_per_connection):
+        slot = index * groups_per_connection + n
+        if farms:
+            groups.append(("JoinFarmGroup", farms[slot % len(farms)]))
+        if animals:
+            groups.append(("JoinAnimalGroup", animals[slot % len(animals)]))
+    return groups
+
+
+@dataclass
+class DeliveryStats:
+    start: float
+    messages: int = 0
+    by_method: Dict[str, int] = field(default_factory=dict)
+    # Mensajes cuyo timestamp no se pudo leer (no entran en la latencia)
+    unparsed: int = 0
+    connected: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def record_message(self, method: str, latency: Optional[float]):
+        self.messages += 1
+        self.by_method[method] = self.by_method.get(method, 0) + 1
+        if latency is None:
+            self.unparsed += 1
+        else:
+            self.latency.record(max(0.0, latency))
+
+    def record_error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def to_dict(self, seconds: float) -> dict:
+        return {
+            "start": round(self.start, 3),
+            "seconds": round(seconds, 3),
+            "connected": self.connected,
+            "messages": self.messages,
+            "deliveriesPerSecond": round(self.messages / seconds, 1) if seconds > 0 else 0.0,
+            "byMethod": dict(self.by_method),
+            "unparsed": self.unparsed,
+            "errors": dict(self.errors),
+            "latencyMs": latency_summary(self.latency),
+        }
+
+
+def latency_summary(histogram: LatencyHistogram) -> Dict[str, float]:
+    summary = {name: round(value * 1000, 3) for name, value in histogram.percentiles(REPORT_PERCENTILES).items()}
+    summary["max"] = round(histogram.max_us / 1000, 3)
+    return summary
+
+
+class HubLoadClient:
+    def __init__(self, api_base_url: str, connections: int, farms: List[str], animals: List[str],
+                 groups_per_connection: int = 1, connect_rate: float = 200.0, duration: float = 60.0,
+                 token: Optional[str] = None, skip_negotiation: bool = False, timeout: float = 10.0,
+                 report_every: float = 5.0):
+        self.api_base_url = api_base_url.rstrip("/")
+        self.connections = connections
+        self.farms = farms
+        self.animals = animals
+        self.groups_per_connection = groups_per_connection
+        self.connect_rate = connect_rate
+        self.duration = duration
+        self.token = token
+        self.skip_negotiation = skip_negotiation
+        self.timeout = timeout
+        self.report_every = report_every
+        self.total = DeliveryStats(0.0)
+        self.intervals: List[Tuple[DeliveryStats, float]] = []
+        self._current = DeliveryStats(0.0)
+        self._open = 0
+        self._start = 0.0
+
+    def _record_message(self, method: str, latency: Optional[float]):
+        self._current.record_message(method, latency)
+        self.total.record_message(method, latency)
+
+    def _record_error(self, kind: str):
+        self._current.record_error(kind)
+        self.total.record_error(kind)
+
+    def _ws_url(self, connection_token: Optional[str]) -> str:
+        url = self.api_base_url.replace("https://", "wss://", 1).replace("http://", "ws://", 1) + HUB_PATH
+        params = []
+        if connection_token:
+            params.append(f"id={connection_token}")
+        if self.token:
+            # Igual que el cliente JS: el token va en la query (ver OnMessageReceived en Program.cs)
+            params.append(f"access_token={self.token}")
+        return f"{url}?{'&'.join(params)}" if params else url
+
+    async def _negotiate(self, session: aiohttp.ClientSession) -> Optional[str]:
+        if self.skip_negotiation:
+            return None
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        async with session.post(f"{self.api_base_url}{HUB_PATH}/negotiate?negotiateVersion=1",
+                                headers=headers) as response:
+            if response.status != 200:
+                raise ConnectionError(f"negotiate http {response.status}")
+            data = await response.json()
+        return data.get("connectionToken") or data.get("connectionId")
+
+    async def _ping(self, ws: aiohttp.ClientWebSocketResponse):
+        while not ws.closed:
+            await asyncio.sleep(PING_INTERVAL)
+            await ws.send_str(encode_message({"type": PING}))
+
+    async def _subscriber(self, session: aiohttp.ClientSession, index: int):
+        """Una conexion: negotiate, handshake, Join*Group y lectura hasta que se cancele al final"""
+        try:
+            connection_token = await self._negotiate(session)
+            ws = await asyncio.wait_for(session.ws_connect(self._ws_url(connection_token), max_msg_size=0),
+                                        self.timeout)
+        except asyncio.TimeoutError:
+            self._record_error("timeout al conectar")
+            return
+        except (aiohttp.ClientError, ConnectionError, OSError) as e:
+            self._record_error(f"conexion ({e.__class__.__name__})")
+            return
+
+        ping_task = None
+        try:
+            await ws.send_str(encode_message(HANDSHAKE))
+            reply = await ws.receive(timeout=self.timeout)
+            if reply.type != aiohttp.WSMsgType.TEXT or parse_messages(reply.data)[0].get("error"):
+                self._record_error("handshake rechazado")
+                return
+
+            for n, (method, group_id) in enumerate(plan_groups(index, self.farms, self.animals,
+                                                               self.groups_per_connection), 1):
+                await ws.send_str(encode_message({"type": INVOCATION, "invocationId": str(n),
+                                                  "target": method, "arguments": [group_id]}))
+            self._open += 1
+            self._current.connected += 1
+            self.total.connected += 1
+            ping_task = asyncio.ensure_future(self._ping(ws))
+            await self._read(ws)
+            # El servidor cerro el socket antes del fin de la prueba
+            self._record_error("desconexion")
+        except asyncio.TimeoutError:
+            self._record_error("timeout en handshake")
+        except (aiohttp.ClientError, ConnectionError, OSError) as e:
+            self._record_error(f"conexion ({e.__class__.__name__})")
+        finally:
+            if ping_task is not None:
+                ping_task.cancel()
+                self._open -= 1
+            # Sin esperar el cierre ordenado si el servidor tiene mensajes encolados
+            try:
+                await asyncio.wait_for(ws.close(), CLOSE_TIMEOUT)
+            except (asyncio.TimeoutError, asyncio.CancelledError, ConnectionError):
+                pass
+
+    async def _read(self, ws: aiohttp.ClientWebSocketResponse):
+        """Lee hasta que el servidor cierre (la tarea se cancela al terminar la prueba)"""
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                return
+            received = time.time()
+            for message in parse_messages(msg.data):
+                kind = message.get("type")
+                if kind == INVOCATION and message.get("target") in LOCATION_METHODS:
+                    arguments = message.get("arguments") or [None, {}]
+                    sent = parse_timestamp((arguments[-1] or {}).get("timestamp"))
+                    self._record_message(message["target"], received - sent if sent is not None else None)
+                elif kind == COMPLETION and message.get("error"):
+                    self._record_error("join rechazado")
+                elif kind == CLOSE:
+                    return
+
+    def _roll_interval(self, now: float):
+        finished = self._current
+        seconds = now - (self._start + finished.start)
+        self.intervals.append((finished, seconds))
+        self.print_interval(finished, seconds)
+        self._current = DeliveryStats(now - self._start)
+
+    def print_interval(self, stats: DeliveryStats, seconds: float):
+        data = stats.to_dict(seconds)
+        latency = data["latencyMs"]
+        errors = ", ".join(f"{kind}: {count}" for kind, count in sorted(stats.errors.items())) or "sin errores"
+        print(f"[{stats.start:6.1f}s] conexiones {self._open:6d}/{self.connections} | "
+              f"entregas {data['deliveriesPerSecond']:9.1f}/s | p50 {latency['p50']:7.1f} "
+              f"p95 {latency['p95']:7.1f} p99 {latency['p99']:7.1f} p99.9 {latency['p99.9']:7.1f} ms | {errors}")
+
+    async def _report(self):
+        next_report = self._start + self.report_every
+        while True:
+            await asyncio.sleep(max(0.0, next_report - time.perf_counter()))
+            self._roll_interval(next_report)
+            next_report += self.report_every
+
+    async def run(self):
+        self._start = time.perf_counter()
+        self._current = DeliveryStats(0.0)
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            reporter = asyncio.ensure_future(self._report())
+            subscribers = []
+            # Las conexiones se abren a --connect-rate por segundo, no todas de golpe
+            for index in range(self.connections):
+                delay = self._start + index / self.connect_rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                subscribers.append(asyncio.ensure_future(self._subscriber(session, index)))
+
+            await asyncio.sleep(max(0.0, self._start + self.duration - time.perf_counter()))
+            reporter.cancel()
+            self._roll_interval(time.perf_counter())
+            self.elapsed = time.perf_counter() - self._start
+            for subscriber in subscribers:
+                subscriber.cancel()
+            await asyncio.gather(*subscribers, return_exceptions=True)
+
+    def result(self) -> dict:
+        return {
+            "startedAt": datetime.now(timezone.utc).isoformat(),
+            "config": {
+                "url": self.api_base_url + HUB_PATH,
+                "connections": self.connections,
+                "farms": self.farms,
+                "animals": self.animals,
+                "groupsPerConnection": self.groups_per_connection,
+                "connectRate": self.connect_rate,
+            },
+            "total": self.total.to_dict(self.elapsed),
+            "intervals": [stats.to_dict(seconds) for stats, seconds in self.intervals],
+            "histogram": self.total.latency.to_dict(),
+        }
+
+
+def login(api_base_url: str, username: str, password: str) -> str:
+    """JWT del API (POST /api/users/login)"""
+    response = requests.post(f"{api_base_url.rstrip('/')}{LOGIN_PATH}",
+                             json={"username": username, "password": password}, timeout=10)
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga de suscriptores SignalR en /tracking-hub")
+    parser.add_argument("--api", default=DEFAULT_API_BASE_URL, help="URL base del API")
+    parser.add_argument("--connections", type=int, default=1000, help="Conexiones concurrentes")
+    parser.add_argument("--connect-rate", type=float, default=200.0, help="Conexiones nuevas por segundo")
+    parser.add_argument("--duration", type=float, default=60.0, help="Segundos desde el inicio")
+    parser.add_argument("--farms", default="", help="Granjas para JoinFarmGroup: '7', '1,3' o '1-10'")
+    parser.add_argument("--animals", default="", help="Animales para JoinAnimalGroup (mismo formato)")
+    parser.add_argument("--groups-per-connection", type=int, default=1,
+                        help="Granjas (y animales) a los que se une cada conexion")
+    parser.add_argument("--token", default=None, help="JWT para el hub")
+    parser.add_argument("--username", default=None, help="Login en el API para obtener el JWT")
+    parser.add_argument("--password", default=None)
+    parser.add_argument("--skip-negotiation", action="store_true",
+                        help="Conectar el WebSocket directo, sin POST /negotiate")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--report-every", type=float, default=5.0, help="Segundos por intervalo")
+    parser.add_argument("--output", default=None, help="Archivo JSON con el resultado")
+    args = parser.parse_args()
+
+    farms, animals = parse_ids(args.farms), parse_ids(args.animals)
+    if not farms and not animals:
+        parser.error("indicar --farms y/o --animals")
+    token = args.token
+    if token is None and args.username:
+        token = login(args.api, args.username, args.password or "")
+
+    client = HubLoadClient(args.api, args.connections, farms, animals, args.groups_per_connection,
+                           args.connect_rate, args.duration, token, args.skip_negotiation, args.timeout,
+                           args.report_every)
+
+    print("PRUEBA DE CARGA - SUSCRIPTORES DE LIVETRACKINGHUB")
+    print("=" * 60)
+    print(f"Hub: {client.api_base_url}{HUB_PATH}")
+    print(f"Conexiones: {args.connections:,} a {args.connect_rate:,.0f}/s | granjas: {len(farms)} | "
+          f"animales: {len(animals)} | grupos por conexion: {args.groups_per_connection}")
+    try:
+        asyncio.run(client.run())
+    except KeyboardInterrupt:
+        print("\nPrueba interrumpida por el usuario")
+        return
+
+    result = client.result()
+    total = result["total"]
+    latency = total["latencyMs"]
+    print("\n" + "=" * 60)
+    print(f"Conectadas: {total['connected']:,}/{args.connections:,} | entregas: {total['messages']:,} | "
+          f"{total['deliveriesPerSecond']:,.1f}/s")
+    print(f"Latencia de punta a punta ms: p50 {latency['p50']} | p95 {latency['p95']} | p99 {latency['p99']} | "
+          f"p99.9 {latency['p99.9']} | max {latency['max']}")
+    for kind, count in sorted(total["errors"].items()):
+        print(f"  {kind}: {count:,}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Resultado guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
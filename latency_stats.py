@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Histograma de latencias con buckets logaritmicos (estilo HDR)
+Precision relativa ~1% en todo el rango, memoria fija y combinable entre
+procesos: cada worker envia sus buckets y el proceso padre los suma.
+"""
+
+import math
+from typing import Dict, Iterable, Optional
+
+# Sub-buckets por potencia de 2: 64 -> error relativo maximo ~1.1%
+SUB_BUCKETS = 64
+# Valores en microsegundos hasta 2^36 us (~19 horas)
+MAX_EXPONENT = 36
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (SUB_BUCKETS * MAX_EXPONENT + 1)
+        self.total = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    @staticmethod
+    def _index(value_us: int) -> int:
+        if value_us < 1:
+            return 0
+        index = int(math.log2(value_us) * SUB_BUCKETS) + 1
+        return min(index, SUB_BUCKETS * MAX_EXPONENT)
+
+    @staticmethod
+    def _upper_value(index: int) -> float:
+        if index == 0:
+            return 0.0
+        return 2 ** (index / SUB_BUCKETS)
+
+    def record(self, seconds: float):
+        """Registra una latencia expresada en segundos"""
+        value_us = int(seconds * 1_000_000)
+        self.counts[self._index(value_us)] += 1
+        self.total += 1
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+
+    def merge(self, other: "LatencyHistogram"):
+        for i, count in enumerate(other.counts):
+            if count:
+                self.counts[i] += count
+        self.total += other.total
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, p: float) -> float:
+        """Latencia en segundos por debajo de la cual cae el `p`% de las muestras"""
+        if self.total == 0:
+            return 0.0
+        target = max(1, math.ceil(self.total * p / 100))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._upper_value(i), self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    def percentiles(self, ps: Iterable[float] = (50, 99)) -> Dict[str, float]:
+        return {f"p{p:g}": self.percentile(p) for p in ps}
+
+    def to_dict(self) -> dict:
+        """Forma compacta (solo buckets con muestras) para enviar entre procesos o a JSON"""
+        return {
+            "buckets": {i: c for i, c in enumerate(self.counts) if c},
+            "total": self.total,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencyHistogram":
+        histogram = cls()
+        for i, count in data["buckets"].items():
+            histogram.counts[int(i)] = count
+        histogram.total = data["total"]
+        histogram.min_us = data["min_us"]
+        histogram.max_us = data["max_us"]
+        return histogram
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga del endpoint de ingesta /api/tracking/tracker-data
+Genera lecturas con el motor vectorizado de rebaño (gps_fleet_engine) y las envia
+en lazo abierto: cada request sale en su instante programado segun la tasa
+objetivo, sin esperar a que terminen las anteriores. La latencia se mide desde
+ese instante programado, asi que si el servidor se atrasa la espera en cola se
+ve en los percentiles (no se esconde bajando la tasa, "coordinated omission").
+
+Perfil de tasa: etapas DURACION:TASA o DURACION:DESDE-HASTA (rampa lineal),
+separadas por comas. Por ejemplo, 30 s a 200 req/s, rampa a 2000 en 60 s y 30 s
+sostenidos:
+    python load_test_tracker_ingest.py --profile 30:200,60:200-2000,30:2000 --output run.json
+
+Con stub_tracking_server.py se puede medir el propio arnes sin el API:
+    python stub_tracking_server.py --port 5999 --delay-ms 5 --error-rate 0.01
+    python load_test_tracker_ingest.py --api http://localhost:5999 --rate 1000 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from gps_fleet_engine import FleetState, build_payloads, step_fleet
+from gps_transport import DEFAULT_API_BASE_URL, AsyncTrackerSender, TransportError
+from latency_stats import LatencyHistogram
+
+REPORT_PERCENTILES = (50, 95, 99, 99.9)
+
+
+@dataclass
+class RateStage:
+    duration: float
+    start_rate: float
+    end_rate: float
+
+    def rate_at(self, t: float) -> float:
+        if self.duration <= 0:
+            return self.end_rate
+        return self.start_rate + (self.end_rate - self.start_rate) * min(t / self.duration, 1.0)
+
+
+class RateProfile:
+    """Tasa objetivo (requests/s) en funcion del tiempo desde el inicio"""
+
+    def __init__(self, stages: List[RateStage]):
+        if not stages:
+            raise ValueError("el perfil necesita al menos una etapa")
+        self.stages = stages
+        self.duration = sum(stage.duration for stage in stages)
+
+    @classmethod
+    def constant(cls, rate: float, duration: float) -> "RateProfile":
+        return cls([RateStage(duration, rate, rate)])
+
+    @classmethod
+    def parse(cls, text: str) -> "RateProfile":
+        """'30:200,60:200-2000,30:2000' -> etapas (segundos:tasa o segundos:desde-hasta)"""
+        stages = []
+        for part in text.split(","):
+            duration, rates = part.strip().split(":")
+            start, _, end = rates.partition("-")
+            stages.append(RateStage(float(duration), float(start), float(end or start)))
+        return cls(stages)
+
+    def rate_at(self, t: float) -> float:
+        for stage in self.stages:
+            if t < stage.duration:
+                return stage.rate_at(t)
+            t -= stage.duration
+        return self.stages[-1].end_rate
+
+    def describe(self) -> str:
+        parts = []
+        for stage in self.stages:
+            rates = f"{stage.start_rate:g}" if stage.start_rate == stage.end_rate else \
+                f"{stage.start_rate:g}->{stage.end_rate:g}"
+            parts.append(f"{stage.duration:g}s a {rates} req/s")
+        return ", ".join(parts)
+
+
+def arrival_times(profile: RateProfile, poisson: bool = False, seed: Optional[int] = None):
+    """Instantes de envio (segundos desde el inicio) que siguen la tasa del perfil
+
+    Con `poisson` las separaciones son exponenciales con la tasa del momento; si no,
+    son regulares (1 / tasa).
+    """
+    rng = random.Random(seed)
+    t = 0.0
+    while t < profile.duration:
+        rate = profile.rate_at(t)
+        if rate <= 0:
+            # Etapa en cero: saltar al proximo decimo de segundo
+            t += 0.1
+            continue
+        yield t
+        t += rng.expovariate(rate) if poisson else 1.0 / rate
+
+
+class PayloadSource:
+    """Lecturas del rebaño en round-robin; el rebaño avanza un paso por vuelta completa
+
+    Cada lectura lleva la hora en que sale (no la del paso del rebaño), para que
+    hub_load_client.py mida la latencia de punta a punta desde el envio.
+    """
+
+    def __init__(self, devices: int, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+        self.fleet = FleetState.create(devices, self.rng, seed=seed,
+                                       device_ids=[f"LOAD_{i:06d}" for i in range(1, devices + 1)])
+        self._payloads: List[dict] = []
+        self._next = 0
+
+    def next(self) -> dict:
+        if self._next >= len(self._payloads):
+            step_fleet(self.fleet, self.rng)
+            self._payloads = build_payloads(self.fleet, self.rng, "")
+            self._next = 0
+        payload = self._payloads[self._next]
+        payload["timestamp"] = datetime.now(timezone.utc).isoformat()
+        self._next += 1
+        return payload
+
+
+@dataclass
+class IntervalStats:
+    start: float
+    target_rate: float = 0.0
+    sent: int = 0
+    ok: int = 0
+    # Arribos que no salieron porque ya habia --max-in-flight requests en vuelo
+    dropped: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def record(self, outcome: str, latency: float):
+        if outcome == "ok":
+            self.ok += 1
+        else:
+            self.errors[outcome] = self.errors.get(outcome, 0) + 1
+        self.latency.record(latency)
+
+    @property
+    def completed(self) -> int:
+        return self.ok + sum(self.errors.values())
+
+    def to_dict(self, seconds: float) -> dict:
+        return {
+            "start": round(self.start, 3),
+            "seconds": round(seconds, 3),
+            "targetRate": round(self.target_rate, 1),
+            "sent": self.sent,
+            "completed": self.completed,
+            "ok": self.ok,
+            "dropped": self.dropped,
+            "throughput": round(self.completed / seconds, 1) if seconds > 0 else 0.0,
+            "errors": dict(self.errors),
+            "latencyMs": latency_summary(self.latency),
+        }
+
+
+def latency_summary(histogram: LatencyHistogram) -> Dict[str, float]:
+    summary = {name: round(value * 1000, 3) for name, value in histogram.percentiles(REPORT_PERCENTILES).items()}
+    summary["max"] = round(histogram.max_us / 1000, 3)
+    return summary
+
+
+def classify(status: Optional[int], error: Optional[TransportError]) -> str:
+    """'ok', 'http 4xx/5xx', 'timeout' o 'conexion'"""
+    if error is not None:
+        cause = error.__cause__
+        return "timeout" if isinstance(cause, asyncio.TimeoutError) else "conexion"
+    return "ok" if status == 200 else f"http {status}"
+
+
+class LoadTest:
+    def __init__(self, api_base_url: str, profile: RateProfile, devices: int = 1000,
+                 max_in_flight: int = 1000, timeout: float = 10.0, report_every: float = 5.0,
+                 poisson: bool = False, seed: Optional[int] = None):
+        self.profile = profile
+        self.max_in_flight = max_in_flight
+        self.report_every = report_every
+        self.poisson = poisson
+        self.seed = seed
+        self.source = PayloadSource(devices, seed)
+        self.sender = AsyncTrackerSender(api_base_url, max_in_flight, timeout)
+        self.total = IntervalStats(0.0)
+        self.intervals: List[Tuple[IntervalStats, float]] = []
+        self._current = IntervalStats(0.0)
+        self._in_flight = set()
+        self._start = 0.0
+
+    async def _request(self, payload: dict, scheduled: float):
+        status = error = None
+        try:
+            response = await self.sender.post(payload)
+            status = response.status_code
+        except TransportError as e:
+            error = e
+        # Desde el instante programado: incluye la espera si el cliente o el servidor se atrasaron
+        latency = time.perf_counter() - scheduled
+        outcome = classify(status, error)
+        # Se cuenta en el intervalo en que termino (throughput), como en un servidor real
+        self._current.record(outcome, latency)
+        self.total.record(outcome, latency)
+
+    def _roll_interval(self, now: float):
+        finished = self._current
+        seconds = now - (self._start + finished.start)
+        self.intervals.append((finished, seconds))
+        self.print_interval(finished, seconds)
+        elapsed = now - self._start
+        self._current = IntervalStats(elapsed, self.profile.rate_at(elapsed))
+
+    def print_interval(self, stats: IntervalStats, seconds: float):
+        data = stats.to_dict(seconds)
+        latency = data["latencyMs"]
+        errors = ", ".join(f"{kind}: {count}" for kind, count in sorted(stats.errors.items())) or "sin errores"
+        dropped = f" | descartados {stats.dropped}" if stats.dropped else ""
+        offered = stats.sent / seconds if seconds > 0 else 0.0
+        print(f"[{stats.start:6.1f}s] ofrecido {offered:7.0f}/s | completado {data['throughput']:8.1f}/s | "
+              f"p50 {latency['p50']:7.1f} p95 {latency['p95']:7.1f} p99 {latency['p99']:7.1f} "
+              f"p99.9 {latency['p99.9']:7.1f} ms | {errors}{dropped}")
+
+    async def run(self):
+        async with self.sender:
+            self._start = time.perf_counter()
+            self._current = IntervalStats(0.0, self.profile.rate_at(0.0))
+            next_report = self._start + self.report_every
+
+            for offset in arrival_times(self.profile, self.poisson, self.seed):
+                scheduled = self._start + offset
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                now = time.perf_counter()
+                while now >= next_report:
+                    self._roll_interval(next_report)
+                    next_report += self.report_every
+
+                self._current.sent += 1
+                self.total.sent += 1
+                if len(self._in_flight) >= self.max_in_flight:
+                    self._current.dropped += 1
+                    self.total.dropped += 1
+                    continue
+                task = asyncio.ensure_future(self._request(self.source.next(), scheduled))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+            if self._in_flight:
+                await asyncio.wait(self._in_flight, timeout=self.sender.timeout + 1)
+            self._roll_interval(time.perf_counter())
+        self.elapsed = time.perf_counter() - self._start
+
+    def result(self) -> dict:
+        return {
+            "startedAt": datetime.now(timezone.utc).isoformat(),
+            "config": {
+                "url": self.sender.url,
+                "profile": [asdict(stage) for stage in self.profile.stages],
+                "devices": len(self.source.fleet),
+                "maxInFlight": self.max_in_flight,
+                "poisson": self.poisson,
+                "seed": self.seed,
+            },
+            "total": self.total.to_dict(self.elapsed),
+            "intervals": [stats.to_dict(seconds) for stats, seconds in self.intervals],
+            "histogram": self.total.latency.to_dict(),
+        }
+
+
+def print_comparison(baseline_path: str, result: dict):
+    """Diferencia de throughput y percentiles contra el JSON de una corrida anterior"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["total"]
+    current = result["total"]
+    print(f"\nComparacion con {baseline_path}:")
+    rows = [("throughput", baseline["throughput"], current["throughput"], "/s")]
+    rows += [(name, baseline["latencyMs"][name], current["latencyMs"][name], " ms")
+             for name in current["latencyMs"]]
+    for name, before, after, unit in rows:
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"  {name:>10}: {before:10.1f}{unit} -> {after:10.1f}{unit} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga en lazo abierto de /api/tracking/tracker-data")
+    parser.add_argument("--api", default=DEFAULT_API_BASE_URL, help="URL base del API")
+    parser.add_argument("--rate", type=float, default=100.0, help="Tasa constante (requests/s)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Segundos a tasa constante")
+    parser.add_argument("--profile", default=None,
+                        help="Etapas 'seg:tasa' o 'seg:desde-hasta' separadas por coma (reemplaza --rate)")
+    parser.add_argument("--poisson", action="store_true", help="Arribos de Poisson en lugar de regulares")
+    parser.add_argument("--devices", type=int, default=1000, help="Collares simulados (round-robin)")
+    parser.add_argument("--max-in-flight", type=int, default=1000,
+                        help="Requests simultaneos maximos; por encima los arribos se descartan")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--report-every", type=float, default=5.0, help="Segundos por intervalo")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Archivo JSON con el resultado")
+    parser.add_argument("--compare", default=None, help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    profile = RateProfile.parse(args.profile) if args.profile else RateProfile.constant(args.rate, args.duration)
+    test = LoadTest(args.api, profile, args.devices, args.max_in_flight, args.timeout, args.report_every,
+                    args.poisson, args.seed)
+
+    print("PRUEBA DE CARGA - INGESTA DE TRACKERS")
+    print("=" * 60)
+    print(f"Destino: {test.sender.url}")
+    print(f"Perfil: {profile.describe()} ({'Poisson' if args.poisson else 'regular'})")
+    try:
+        asyncio.run(test.run())
+    except KeyboardInterrupt:
+        print("\nPrueba interrumpida por el usuario")
+        return
+
+    result = test.result()
+    total = result["total"]
+    latency = total["latencyMs"]
+    print("\n" + "=" * 60)
+    print(f"Enviados: {total['sent']:,} | OK: {total['ok']:,} | descartados: {total['dropped']:,} | "
+          f"throughput: {total['throughput']:,.1f}/s")
+    print(f"Latencia ms: p50 {latency['p50']} | p95 {latency['p95']} | p99 {latency['p99']} | "
+          f"p99.9 {latency['p99.9']} | max {latency['max']}")
+    for kind, count in sorted(total["errors"].items()):
+        print(f"  {kind}: {count:,}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Resultado guardado en {args.output}")
+    if args.compare:
+        print_comparison(args.compare, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Outbox en disco para lecturas GPS que no se pudieron enviar
+Las lecturas fallidas se agregan a un archivo de segmento append-only
+(registros binarios: largo + timestamp + JSON). Al llegar a `segment_bytes`
+el segmento se cierra y se abre uno nuevo, asi la memoria no crece aunque el
+API este caido por horas.
+
+OutboxDrainer reenvia los segmentos cerrados, del mas viejo al mas nuevo y
+ordenados por timestamp dentro de cada segmento, con concurrencia acotada y
+backoff exponencial mientras el API siga sin responder. El avance se guarda
+en un archivo .offset por segmento: si el proceso se corta se reenvia a lo
+sumo una ventana de lecturas (entrega al-menos-una-vez).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from gps_transport import DEFAULT_API_BASE_URL, AsyncTrackerSender, TransportError
+
+# largo del JSON (uint32) + timestamp de la lectura en microsegundos (int64)
+RECORD_HEADER = struct.Struct("<Iq")
+SEGMENT_SUFFIX = ".spool"
+OFFSET_SUFFIX = ".offset"
+
+
+def reading_timestamp_us(payload: dict) -> int:
+    """Timestamp de la lectura en microsegundos (hora actual si no tiene uno valido)"""
+    try:
+        return int(datetime.fromisoformat(payload["timestamp"]).timestamp() * 1_000_000)
+    except (KeyError, TypeError, ValueError):
+        return int(time.time() * 1_000_000)
+
+
+class ReadingOutbox:
+    def __init__(self, directory: str = "outbox", segment_bytes: int = 16 * 1024 * 1024,
+                 max_segment_age: float = 30.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segment_age = max_segment_age
+        self._lock = threading.Lock()
+        self._active = None
+        self._active_path: Optional[str] = None
+        self._active_size = 0
+        self._active_opened = 0.0
+
+        os.makedirs(directory, exist_ok=True)
+        existing = self._segment_numbers()
+        self._next_number = (existing[-1] + 1) if existing else 1
+
+    def _segment_numbers(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SEGMENT_SUFFIX):
+                try:
+                    numbers.append(int(name[:-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    pass
+        return sorted(numbers)
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"{number:010d}{SEGMENT_SUFFIX}")
+
+    def _open_segment(self):
+        self._active_path = self._segment_path(self._next_number)
+        self._next_number += 1
+        self._active = open(self._active_path, "ab", buffering=64 * 1024)
+        self._active_size = 0
+        self._active_opened = time.monotonic()
+
+    def _close_segment(self):
+        if self._active is not None:
+            self._active.flush()
+            os.fsync(self._active.fileno())
+            self._active.close()
+            self._active = None
+            self._active_path = None
+
+    def append(self, payload: dict):
+        """Guarda una lectura fallida (seguro para usar desde varios hilos)"""
+        data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        record = RECORD_HEADER.pack(len(data), reading_timestamp_us(payload)) + data
+
+        with self._lock:
+            if self._active is None:
+                self._open_segment()
+            self._active.write(record)
+            self._active.flush()
+            self._active_size += len(record)
+            if self._active_size >= self.segment_bytes:
+                self._close_segment()
+
+    def rotate(self, force: bool = False):
+        """Cierra el segmento activo si tiene datos y es viejo (o siempre con `force`)"""
+        with self._lock:
+            if self._active is None:
+                return
+            if force or time.monotonic() - self._active_opened >= self.max_segment_age:
+                self._close_segment()
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+    def closed_segments(self) -> List[str]:
+        """Segmentos listos para reenviar, del mas viejo al mas nuevo"""
+        # Los numeros crecen y un segmento cerrado no se reabre: todo lo anterior al activo (o al
+        # proximo a abrir) esta cerrado, aunque append() abra otro segmento mientras se lista
+        with self._lock:
+            limit = self._next_number - 1 if self._active is not None else self._next_number
+        return [self._segment_path(n) for n in self._segment_numbers() if n < limit]
+
+    @staticmethod
+    def read_segment(path: str) -> List[Tuple[int, dict]]:
+        """Lee los registros (timestamp_us, payload) ordenados por timestamp
+
+        Un registro incompleto al final (corte durante la escritura) se ignora.
+        """
+        records = []
+        with open(path, "rb") as f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                length, timestamp_us = RECORD_HEADER.unpack(header)
+                data = f.read(length)
+                if len(data) < length:
+                    break
+                records.append((timestamp_us, json.loads(data)))
+        records.sort(key=lambda record: record[0])
+        return records
+
+    @staticmethod
+    def read_offset(path: str) -> int:
+        try:
+            with open(path + OFFSET_SUFFIX) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    @staticmethod
+    def write_offset(path: str, offset: int):
+        tmp_path = path + OFFSET_SUFFIX + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(offset))
+        os.replace(tmp_path, path + OFFSET_SUFFIX)
+
+    @staticmethod
+    def remove_segment(path: str):
+        os.remove(path)
+        if os.path.exists(path + OFFSET_SUFFIX):
+            os.remove(path + OFFSET_SUFFIX)
+
+    def pending_bytes(self) -> int:
+        return sum(os.path.getsize(self._segment_path(n)) for n in self._segment_numbers())
+
+
+class OutboxDrainer:
+    """Reenvia las lecturas del outbox cuando el API vuelve a responder"""
+
+    def __init__(self, outbox: ReadingOutbox, api_base_url: str = DEFAULT_API_BASE_URL,
+                 concurrency: int = 20, initial_backoff: float = 1.0, max_backoff: float = 60.0,
+                 poll_interval: float = 5.0):
+        self.outbox = outbox
+        self.api_base_url = api_base_url
+        self.concurrency = concurrency
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+
+        self.replayed = 0
+        self.rejected = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def _replay(self, sender: AsyncTrackerSender, payload: dict) -> bool:
+        """True si la lectura ya no necesita reenviarse (aceptada o rechazada por datos invalidos)"""
+        try:
+            response = await sender.post(payload)
+        except TransportError:
+            return False
+
+        if response.status_code == 200:
+            self.replayed += 1
+            return True
+        if response.status_code < 500:
+            # El API la rechazo por su contenido: reintentar no la va a arreglar
+            self.rejected += 1
+            print(f"Outbox: lectura de {payload.get('deviceId')} rechazada (HTTP {response.status_code})")
+            return True
+        return False
+
+    async def _drain_segment(self, sender: AsyncTrackerSender, path: str):
+        records = self.outbox.read_segment(path)
+        offset = self.outbox.read_offset(path)
+        backoff = self.initial_backoff
+
+        while offset < len(records) and not self._stop.is_set():
+            window = [payload for _, payload in records[offset:offset + self.concurrency]]
+            done = [False] * len(window)
+
+            while not all(done) and not self._stop.is_set():
+                pending = [i for i, ok in enumerate(done) if not ok]
+                results = await asyncio.gather(*(self._replay(sender, window[i]) for i in pending))
+                for i, ok in zip(pending, results):
+                    done[i] = ok
+
+                if not all(done):
+                    # Se espera antes de seguir para no avanzar sobre lecturas mas nuevas
+                    print(f"Outbox: API sin responder, reintentando en {backoff:.0f}s")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+
+            if not all(done):
+                return
+            offset += len(window)
+            self.outbox.write_offset(path, offset)
+            backoff = self.initial_backoff
+
+        if offset >= len(records):
+            self.outbox.remove_segment(path)
+
+    async def drain_once(self) -> int:
+        """Reenvia todos los segmentos cerrados; devuelve cuantos se completaron"""
+        completed = 0
+        async with AsyncTrackerSender(self.api_base_url, self.concurrency) as sender:
+            for path in self.outbox.closed_segments():
+                if self._stop.is_set():
+                    break
+                await self._drain_segment(sender, path)
+                if not os.path.exists(path):
+                    completed += 1
+        return completed
+
+    async def run(self):
+        while not self._stop.is_set():
+            self.outbox.rotate()
+            await self.drain_once()
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> threading.Thread:
+        """Corre el drenado en un hilo de fondo con su propio event loop"""
+        self._thread = threading.Thread(target=lambda: asyncio.run(self.run()), daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 5)
+
+
+def main():
+    """Usar `drain` solo con los emuladores detenidos; mientras corren lo drena su OutboxDrainer"""
+    parser = argparse.ArgumentParser(description="Estado y drenado manual del outbox de lecturas GPS")
+    parser.add_argument("command", choices=["status", "drain"])
+    parser.add_argument("--dir", default="outbox", help="Directorio del outbox")
+    parser.add_argument("--api", default=DEFAULT_API_BASE_URL, help="URL base del API")
+    parser.add_argument("--concurrency", type=int, default=20, help="Reenvios simultaneos")
+    args = parser.parse_args()
+
+    outbox = ReadingOutbox(args.dir)
+
+    if args.command == "status":
+        segments = outbox.closed_segments()
+        print(f"Segmentos pendientes: {len(segments)}")
+        print(f"Bytes pendientes: {outbox.pending_bytes():,}")
+        return
+
+    drainer = OutboxDrainer(outbox, args.api, args.concurrency)
+    try:
+        asyncio.run(drainer.drain_once())
+    except KeyboardInterrupt:
+        print("\nDrenado interrumpido por el usuario")
+    print(f"Reenviadas: {drainer.replayed} | Rechazadas: {drainer.rejected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Carga masiva de datos semilla (granjas, trackers y animales) con psycopg2
+Las filas se copian con COPY a tablas temporales y se insertan/actualizan con
+unas pocas sentencias INSERT ... SELECT / UPDATE ... FROM, todo en una sola
+transaccion: o se carga el lote completo o no se carga nada.
+
+Los animales referencian su granja por id o por nombre y su tracker por id o por
+deviceId; las referencias se resuelven en la base con joins, asi que un mismo lote
+puede crear la granja, los trackers y los animales que los usan.
+
+Uso:
+    python seed_loader.py seed.json          (objeto con listas farms/trackers/animals)
+    python seed_loader.py --synthetic 100000 --farm "Rancho Grande"
+"""
+
+import argparse
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass, fields
+from datetime import date, timedelta
+from operator import attrgetter
+from typing import Callable, Iterable, List, Optional, Sequence
+
+from tracker_api_client import DEFAULT_TRACKER_MODEL
+from tracker_db import add_db_arguments, config_from_args, configure, connection
+
+COPY_NULL = r"\N"
+
+
+@dataclass
+class SeedFarm:
+    name: str
+    address: str = ""
+    user_id: int = 1
+    latitude: float = 0.0
+    longitude: float = 0.0
+
+
+@dataclass
+class SeedTracker:
+    device_id: str
+    name: Optional[str] = None
+    model: str = DEFAULT_TRACKER_MODEL
+    status: str = "Active"
+    battery_level: int = 100
+    is_active: bool = True
+
+
+@dataclass
+class SeedAnimal:
+    name: str
+    tag: str
+    gender: str
+    breed: str
+    birth_date: str
+    weight: float
+    status: str = "Active"
+    # Granja por id o por nombre (farm_id tiene prioridad)
+    farm_id: Optional[int] = None
+    farm_name: Optional[str] = None
+    # Tracker por id o por deviceId (tracker_id tiene prioridad); ninguno = sin tracker
+    tracker_id: Optional[int] = None
+    device_id: Optional[str] = None
+
+
+@dataclass
+class SeedResult:
+    farms_inserted: int = 0
+    trackers_inserted: int = 0
+    trackers_updated: int = 0
+    animals_inserted: int = 0
+    animals_updated: int = 0
+    # Animales a los que se les saco el tracker porque el lote se lo da a otro
+    trackers_released: int = 0
+    seconds: float = 0.0
+
+    def print(self):
+        print(f"Granjas creadas: {self.farms_inserted}")
+        print(f"Trackers creados: {self.trackers_inserted} - actualizados: {self.trackers_updated}")
+        print(f"Animales creados: {self.animals_inserted} - actualizados: {self.animals_updated}")
+        if self.trackers_released:
+            print(f"Trackers liberados de otros animales: {self.trackers_released}")
+        print(f"Tiempo: {self.seconds:.2f}s")
+
+
+STAGE_TABLES = {
+    "_seed_farms": """
+        CREATE TEMP TABLE _seed_farms (
+            name text, address text, user_id int, latitude double precision, longitude double precision
+        ) ON COMMIT DROP""",
+    "_seed_trackers": """
+        CREATE TEMP TABLE _seed_trackers (
+            device_id text, name text, model text, status text, battery_level int, is_active boolean
+        ) ON COMMIT DROP""",
+    "_seed_animals": """
+        CREATE TEMP TABLE _seed_animals (
+            name text, tag text, gender text, breed text, birth_date date, weight numeric(10, 2),
+            status text, farm_id int, farm_name text, tracker_id int, device_id text
+        ) ON COMMIT DROP""",
+}
+
+INSERT_FARMS = """
+    INSERT INTO "Farms" ("Name", "Address", "UserId", "Latitude", "Longitude", "CreatedAt")
+    SELECT s.name, s.address, s.user_id, s.latitude, s.longitude, NOW()
+    FROM _seed_farms s
+    WHERE NOT EXISTS (SELECT 1 FROM "Farms" f WHERE f."Name" = s.name)
+"""
+
+UPSERT_TRACKERS = """
+    INSERT INTO "Trackers" ("DeviceId", "Name", "Model", "Status", "BatteryLevel", "IsActive",
+                            "IsAvailableForAssignment", "LastSeen", "CreatedAt")
+    SELECT s.device_id, COALESCE(s.name, s.device_id), s.model, s.status, s.battery_level, s.is_active,
+           TRUE, NOW(), NOW()
+    FROM _seed_trackers s
+    ON CONFLICT ("DeviceId") {action}
+    RETURNING (xmax = 0) AS inserted
+"""
+
+TRACKER_UPDATE_ACTION = """DO UPDATE SET
+        "Name" = EXCLUDED."Name", "Model" = EXCLUDED."Model", "Status" = EXCLUDED."Status",
+        "BatteryLevel" = EXCLUDED."BatteryLevel", "IsActive" = EXCLUDED."IsActive\""""
+
+# Referencias de granja y tracker resueltas, y el Id del animal si el tag ya existe en esa granja
+# (el tag es unico solo dentro de la granja). Farms."Name" no es unico: se toma la granja de
+# menor Id con ese nombre.
+RESOLVE_ANIMALS = """
+    CREATE TEMP TABLE _seed_resolved ON COMMIT DROP AS
+    SELECT r.*, a.id AS existing_id
+    FROM (
+        SELECT s.*,
+               COALESCE(s.farm_id, f.id) AS resolved_farm_id,
+               COALESCE(s.tracker_id, t."Id") AS resolved_tracker_id
+        FROM _seed_animals s
+        LEFT JOIN (SELECT "Name", MIN("Id") AS id FROM "Farms" GROUP BY "Name") f ON f."Name" = s.farm_name
+        LEFT JOIN "Trackers" t ON t."DeviceId" = s.device_id
+    ) r
+    LEFT JOIN (SELECT "FarmId", "Tag", MIN("Id") AS id FROM "Animals" GROUP BY "FarmId", "Tag") a
+        ON a."FarmId" = r.resolved_farm_id AND a."Tag" = r.tag
+"""
+
+# Una granja puede venir por id en una fila y por nombre en otra: se revisa con la granja resuelta
+DUPLICATE_ANIMALS = """
+    SELECT tag, resolved_farm_id
+    FROM _seed_resolved
+    WHERE resolved_farm_id IS NOT NULL
+    GROUP BY resolved_farm_id, tag
+    HAVING COUNT(*) > 1
+    LIMIT 10
+"""
+
+UNRESOLVED_ANIMALS = """
+    SELECT tag,
+           CASE WHEN resolved_farm_id IS NULL THEN 'granja ' || COALESCE(farm_name, '(sin granja)')
+                ELSE 'tracker ' || device_id END
+    FROM _seed_resolved
+    WHERE resolved_farm_id IS NULL OR (device_id IS NOT NULL AND resolved_tracker_id IS NULL)
+    LIMIT 10
+"""
+
+# Animals.TrackerId es unico (relacion 1 a 1): quien tenga un tracker que el lote
+# le da a otro animal lo pierde antes de escribir
+RELEASE_TRACKERS = """
+    UPDATE "Animals" a
+    SET "TrackerId" = NULL, "UpdatedAt" = NOW()
+    FROM _seed_resolved r
+    WHERE a."TrackerId" = r.resolved_tracker_id
+      AND a."Id" IS DISTINCT FROM r.existing_id
+      AND ({writable})
+"""
+
+UPDATE_ANIMALS = """
+    UPDATE "Animals" a
+    SET "Name" = r.name, "Gender" = r.gender, "Breed" = r.breed, "BirthDate" = r.birth_date,
+        "Weight" = r.weight, "Status" = r.status, "FarmId" = r.resolved_farm_id,
+        "TrackerId" = r.resolved_tracker_id, "UpdatedAt" = NOW()
+    FROM _seed_resolved r
+    WHERE a."Id" = r.existing_id
+"""
+
+INSERT_ANIMALS = """
+    INSERT INTO "Animals" ("Name", "Tag", "Gender", "Breed", "BirthDate", "Weight", "Status",
+                           "FarmId", "TrackerId", "CreatedAt", "UpdatedAt")
+    SELECT r.name, r.tag, r.gender, r.breed, r.birth_date, r.weight, r.status,
+           r.resolved_farm_id, r.resolved_tracker_id, NOW(), NOW()
+    FROM _seed_resolved r
+    WHERE r.existing_id IS NULL
+"""
+
+
+class SeedError(Exception):
+    """El lote tiene filas invalidas o referencias que no existen (no se cargo nada)"""
+
+
+def _copy_rows(cur, table: str, rows: Sequence) -> int:
+    """COPY de dataclasses a la tabla temporal, en el orden de sus campos"""
+    if not rows:
+        return 0
+    names = [f.name for f in fields(rows[0])]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in rows:
+        # getattr directo: asdict() copia en profundidad y es varias veces mas lento
+        writer.writerow([COPY_NULL if value is None else value
+                         for value in (getattr(row, name) for name in names)])
+    buffer.seek(0)
+    columns = ", ".join(names)
+    cur.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", buffer)
+    return len(rows)
+
+
+def _check_duplicates(rows: Iterable, key: Callable[[object], object], label: str):
+    seen = set()
+    for row in rows:
+        value = key(row)
+        if value in seen:
+            raise SeedError(f"{label} repetido en el lote: {value}")
+        seen.add(value)
+
+
+def _animal_key(animal: SeedAnimal) -> str:
+    """Tag y granja: el mismo tag puede estar en otra granja"""
+    farm = f"id {animal.farm_id}" if animal.farm_id is not None else animal.farm_name
+    return f"{animal.tag} (granja {farm})"
+
+
+def load_seed(conn, farms: Sequence[SeedFarm] = (), trackers: Sequence[SeedTracker] = (),
+              animals: Sequence[SeedAnimal] = (), update_existing: bool = False) -> SeedResult:
+    """Carga el lote en una transaccion y devuelve cuantas filas se tocaron
+
+    Las granjas existentes (por nombre) no se modifican. Trackers (por deviceId) y
+    animales (por granja y tag) existentes se actualizan solo con `update_existing`; si no,
+    se dejan como estan. Ante cualquier error se hace rollback y se relanza.
+    """
+    _check_duplicates(farms, attrgetter("name"), "Nombre de granja")
+    _check_duplicates(trackers, attrgetter("device_id"), "DeviceId")
+    _check_duplicates(animals, _animal_key, "Tag")
+
+    result = SeedResult()
+    started = time.monotonic()
+
+    # `with conn` hace commit al salir o rollback si hay una excepcion
+    with conn, conn.cursor() as cur:
+        for ddl in STAGE_TABLES.values():
+            cur.execute(ddl)
+        _copy_rows(cur, "_seed_farms", list(farms))
+        _copy_rows(cur, "_seed_trackers", list(trackers))
+        _copy_rows(cur, "_seed_animals", list(animals))
+
+        cur.execute(INSERT_FARMS)
+        result.farms_inserted = cur.rowcount
+
+        if trackers:
+            cur.execute(UPSERT_TRACKERS.format(action=TRACKER_UPDATE_ACTION if update_existing else "DO NOTHING"))
+            outcomes = [inserted for (inserted,) in cur.fetchall()]
+            result.trackers_inserted = sum(outcomes)
+            result.trackers_updated = len(outcomes) - result.trackers_inserted
+
+        if animals:
+            cur.execute(RESOLVE_ANIMALS)
+            cur.execute(UNRESOLVED_ANIMALS)
+            unresolved = cur.fetchall()
+            if unresolved:
+                detail = ", ".join(f"{tag} ({missing})" for tag, missing in unresolved)
+                raise SeedError(f"Referencias inexistentes: {detail}")
+            cur.execute(DUPLICATE_ANIMALS)
+            duplicated = cur.fetchall()
+            if duplicated:
+                detail = ", ".join(f"{tag} (granja {farm_id})" for tag, farm_id in duplicated)
+                raise SeedError(f"Tag repetido en el lote: {detail}")
+
+            writable = "TRUE" if update_existing else "r.existing_id IS NULL"
+            cur.execute(RELEASE_TRACKERS.format(writable=writable))
+            result.trackers_released = cur.rowcount
+            if update_existing:
+                cur.execute(UPDATE_ANIMALS)
+                result.animals_updated = cur.rowcount
+            cur.execute(INSERT_ANIMALS)
+            result.animals_inserted = cur.rowcount
+
+    result.seconds = time.monotonic() - started
+    return result
+
+
+def read_seed_file(path: str):
+    """Lote desde JSON: {"farms": [...], "trackers": [...], "animals": [...]} con claves snake_case"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return ([SeedFarm(**item) for item in data.get("farms", [])],
+            [SeedTracker(**item) for item in data.get("trackers", [])],
+            [SeedAnimal(**item) for item in data.get("animals", [])])
+
+
+def synthetic_ranch(head_count: int, farm_name: str, prefix: str = "RG"):
+    """Granja con `head_count` animales, cada uno con su collar (para pruebas de volumen)"""
+    breeds = ["Holstein", "Angus", "Brahman", "Hereford"]
+    genders = ["Female", "Male"]
+    first_birth = date(2019, 1, 1)
+    farms = [SeedFarm(farm_name, f"{farm_name} - carga sintetica")]
+    trackers: List[SeedTracker] = []
+    animals: List[SeedAnimal] = []
+    width = max(len(str(head_count)), 3)
+    for i in range(1, head_count + 1):
+        device_id = f"COW_{prefix}_{i:0{width}d}"
+        trackers.append(SeedTracker(device_id, f"Tracker {prefix} {i:0{width}d}"))
+        animals.append(SeedAnimal(
+            name=f"Vaca {prefix} {i:0{width}d}",
+            tag=f"{prefix}{i:0{width}d}",
+            gender=genders[i % len(genders)],
+            breed=breeds[i % len(breeds)],
+            birth_date=(first_birth + timedelta(days=i % 1000)).isoformat(),
+            weight=350.0 + (i % 250),
+            farm_name=farm_name,
+            device_id=device_id,
+        ))
+    return farms, trackers, animals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga masiva de granjas, trackers y animales en una transaccion")
+    parser.add_argument("seed", nargs="?", help="Archivo JSON con farms/trackers/animals")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generar una granja con N animales")
+    parser.add_argument("--farm", default="Rancho Grande", help="Nombre de la granja sintetica")
+    parser.add_argument("--prefix", default="RG", help="Prefijo de tags y deviceId sinteticos")
+    parser.add_argument("--update", action="store_true", help="Actualizar trackers y animales existentes")
+    add_db_arguments(parser)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        farms, trackers, animals = synthetic_ranch(args.synthetic, args.farm, args.prefix)
+    elif args.seed:
+        farms, trackers, animals = read_seed_file(args.seed)
+    else:
+        parser.error("indicar un archivo o --synthetic N")
+
+    config = config_from_args(args)
+    print(f"Cargando {len(farms)} granjas, {len(trackers):,} trackers y {len(animals):,} animales "
+          f"en {config.describe()}...")
+    try:
+        with connection(configure(config)) as conn:
+            result = load_seed(conn, farms, trackers, animals, update_existing=args.update)
+    except SeedError as e:
+        print(f"ERROR: {e}")
+        raise SystemExit(1)
+    result.print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ritmo de envio de los emuladores contra horarios programados
+En lugar de "enviar, dormir 0.5 s, ... dormir 15 s" (donde cada respuesta lenta
+del API estira el intervalo sin que se note), cada envio tiene una hora
+programada fija: origen + periodo * vuelta + separacion * posicion. El pacer
+duerme hasta esa hora, mide cuanto se atraso el envio y que hacer si se atraso:
+
+- catch_up: los envios atrasados salen enseguida, uno tras otro, hasta ponerse
+  al dia (se mantiene la tasa prevista),
+- shed: los envios atrasados mas de `max_lateness` se descartan (se mantiene la
+  cadencia y se pierde carga; quedan contados),
+- drift: el horario se corre hacia adelante lo que se atraso (el comportamiento
+  anterior, pero ahora medido).
+
+La latencia de cada respuesta se mide desde la hora programada, no desde que
+salio el request, asi una degradacion del API se ve en los percentiles.
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+from latency_stats import LatencyHistogram
+from sim_clock import WallClock
+
+CATCH_UP = "catch_up"
+SHED = "shed"
+DRIFT = "drift"
+POLICIES = (CATCH_UP, SHED, DRIFT)
+
+# Atrasos menores a esto no cuentan como envio tarde
+DEFAULT_TOLERANCE = 0.05
+
+
+@dataclass
+class Slot:
+    index: int
+    intended: float
+    started: float
+    shed: bool = False
+
+    @property
+    def lateness(self) -> float:
+        return max(0.0, self.started - self.intended)
+
+
+@dataclass
+class PacerStats:
+    start: float
+    scheduled: int = 0
+    sent: int = 0
+    ok: int = 0
+    late: int = 0
+    shed: int = 0
+    lateness: LatencyHistogram = field(default_factory=LatencyHistogram)
+    # Desde la hora programada hasta la respuesta
+    response: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+
+class SendPacer:
+    """Horario de envios: `sends_per_period` envios separados `spacing` s, cada `period` s"""
+
+    def __init__(self, period: float, sends_per_period: int = 1, spacing: float = 0.0,
+                 clock: Optional[WallClock] = None, policy: str = CATCH_UP,
+                 max_lateness: Optional[float] = None, tolerance: float = DEFAULT_TOLERANCE):
+        if policy not in POLICIES:
+            raise ValueError(f"Politica desconocida: {policy} (opciones: {', '.join(POLICIES)})")
+        self.period = period
+        self.sends_per_period = max(1, sends_per_period)
+        self.spacing = spacing
+        self.clock = clock or WallClock()
+        self.policy = policy
+        # Por defecto se descarta lo que se atraso mas de un hueco entre envios
+        self.max_lateness = max_lateness if max_lateness is not None else period / self.sends_per_period
+        self.tolerance = tolerance
+        self._origin: Optional[float] = None
+        self._next_index = 0
+        self.total: Optional[PacerStats] = None
+        self.window: Optional[PacerStats] = None
+
+    @property
+    def intended_rate(self) -> float:
+        """Envios por segundo previstos"""
+        return self.sends_per_period / self.period
+
+    def intended_time(self, index: int) -> float:
+        turn, position = divmod(index, self.sends_per_period)
+        return self._origin + turn * self.period + position * self.spacing
+
+    def next_slot(self) -> Slot:
+        """Espera hasta la hora programada del proximo envio y lo devuelve
+
+        Con la politica shed, un Slot con `shed=True` indica que ese envio se descarta.
+        """
+        now = self.clock.monotonic()
+        if self._origin is None:
+            self._origin = now
+            self.total = PacerStats(now)
+            self.window = PacerStats(now)
+
+        index = self._next_index
+        self._next_index += 1
+        intended = self.intended_time(index)
+        if now < intended:
+            self.clock.sleep(intended - now)
+            now = self.clock.monotonic()
+
+        slot = Slot(index, intended, now)
+        lateness = slot.lateness
+        for stats in (self.total, self.window):
+            stats.scheduled += 1
+            stats.lateness.record(lateness)
+
+        if lateness > self.tolerance:
+            if self.policy == SHED and lateness > self.max_lateness:
+                slot.shed = True
+                for stats in (self.total, self.window):
+                    stats.shed += 1
+                return slot
+            if self.policy == DRIFT:
+                self._origin += lateness
+            for stats in (self.total, self.window):
+                stats.late += 1
+        return slot
+
+    def done(self, slot: Slot, ok: bool):
+        """Registra el resultado del envio (latencia desde la hora programada)"""
+        response = self.clock.monotonic() - slot.intended
+        for stats in (self.total, self.window):
+            stats.sent += 1
+            stats.ok += 1 if ok else 0
+            stats.response.record(response)
+
+    def seconds_until_next(self) -> float:
+        if self._origin is None:
+            return 0.0
+        return max(0.0, self.intended_time(self._next_index) - self.clock.monotonic())
+
+    def summary(self, stats: Optional[PacerStats] = None) -> str:
+        """Tasa prevista vs real, atrasos, descartes y percentiles de respuesta"""
+        stats = stats or self.window
+        if stats is None:
+            return "sin envios"
+        # La ventana llega hasta el proximo envio programado (o hasta ahora si ya se paso)
+        end = max(self.clock.monotonic(), self.intended_time(self._next_index))
+        elapsed = max(end - stats.start, 1e-9)
+        lateness_max = stats.lateness.max_us / 1_000_000
+        response = stats.response.percentiles((50, 99))
+        return (f"tasa prevista {self.intended_rate:.2f}/s, real {stats.sent / elapsed:.2f}/s | "
+                f"atrasados {stats.late} (max {lateness_max:.2f}s) | descartados {stats.shed} | "
+                f"respuesta p50 {response['p50'] * 1000:.0f} ms, p99 {response['p99'] * 1000:.0f} ms")
+
+    def reset_window(self):
+        """Empieza una nueva ventana de estadisticas (p.ej. por iteracion) en el proximo envio programado"""
+        if self.window is not None:
+            self.window = PacerStats(self.intended_time(self._next_index))
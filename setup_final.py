@@ -1,32 +1,35 @@
 #!/usr/bin/env python3
 """
 Script final para configurar Granja Central usando conexion directa
+Si no se puede conectar muestra el SQL para ejecutarlo a mano
 """
-import os
-import subprocess
-import sys
+import psycopg2
 
-def run_sql_command(sql_command):
-    """Ejecuta un comando SQL via psql"""
+from seed_loader import SeedError, load_seed
+from setup_granja_central_simple import granja_central_seed
+from tracker_db import DbConfig, connection, get_pool
+
+def setup_with_loader():
+    """Carga granja, trackers y animales en una sola transaccion; False si no hay conexion"""
+    config = DbConfig.load()
     try:
-        # Usar variables de entorno para la conexión
-        cmd = [
-            "psql",
-            "-h", "localhost",
-            "-p", "5432",
-            "-U", "postgres",
-            "-d", "postgres",
-            "-c", sql_command
-        ]
+        pool = get_pool(config)
+    except psycopg2.Error as e:
+        print(f"No se pudo conectar a PostgreSQL ({config.describe()}): {e}")
+        return False
 
-        # Configurar variable de entorno para contraseña
-        env = os.environ.copy()
-        env['PGPASSWORD'] = 'root'
+    try:
+        with connection(pool) as conn:
+            result = load_seed(conn, *granja_central_seed())
+    except (SeedError, psycopg2.Error) as e:
+        print(f"Error cargando Granja Central (no se guardo nada): {e}")
+        return False
 
-        result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-        return result.returncode == 0, result.stdout, result.stderr
-    except Exception as e:
-        return False, "", str(e)
+    print("=" * 80)
+    print("GRANJA CENTRAL CONFIGURADA")
+    print("=" * 80)
+    result.print()
+    return True
 
 def show_manual_steps():
     """Muestra los pasos manuales para configurar"""
@@ -93,7 +96,8 @@ SELECT
     f."Name" as farm_name,
     f."Id" as farm_id,
     COUNT(a."Id") as animal_count,
-    STRING_AGG(a."Tag", ', ' ORDER BY a."Tag") as animal_tags
+    MIN(a."Tag") as first_tag,
+    MAX(a."Tag") as last_tag
 FROM "Farms" f
 LEFT JOIN "Animals" a ON f."Id" = a."FarmId"
 WHERE f."Name" = 'Granja Central'
@@ -112,4 +116,5 @@ GROUP BY f."Name", f."Id";
     print("=" * 80)
 
 if __name__ == "__main__":
-    show_manual_steps()
\ No newline at end of file
+    if not setup_with_loader():
+        show_manual_steps()
\ No newline at end of file
@@ -4,8 +4,35 @@
 Script simple para configurar Granja Central usando SQL directo
 """
 
-import psycopg2
-import json
+from farm_audit_report import print_farm_summary
+from seed_loader import SeedAnimal, SeedFarm, SeedTracker, load_seed
+from tracker_db import connection
+
+FARM_NAME = 'Granja Central'
+
+
+def granja_central_seed():
+    """Granja Central con 10 trackers COW_NORTH_FARM_NN y 10 animales GC001-GC010"""
+    breeds = ['Holstein', 'Angus', 'Brahman', 'Hereford']
+    genders = ['Female', 'Male']
+
+    farms = [SeedFarm(FARM_NAME, 'Granja Central - Centro de Operaciones GPS', user_id=1)]
+    trackers = []
+    animals = []
+    for i in range(1, 11):
+        device_id = f"COW_NORTH_FARM_{i:02d}"
+        trackers.append(SeedTracker(device_id, f"Tracker Granja Central {i:02d}"))
+        animals.append(SeedAnimal(
+            name=f"Vaca Central {i:02d}",
+            tag=f"GC{i:03d}",
+            gender=genders[i % len(genders)],
+            breed=breeds[i % len(breeds)],
+            birth_date='2021-01-01',
+            weight=400.0 + (i * 10),
+            farm_name=FARM_NAME,
+            device_id=device_id,
+        ))
+    return farms, trackers, animals
 
 def setup_granja_central_db():
     """Configura la Granja Central directamente en la base de datos"""
@@ -15,102 +42,25 @@ def setup_granja_central_db():
     print("=" * 60)
 
     try:
-        # Conectar a la base de datos
-        conn = psycopg2.connect(
-            host="localhost",
-            port=5432,
-            database="postgres",
-            user="postgres",
-            password="root"
-        )
-
-        cur = conn.cursor()
-
-        print("\n1. Creando Granja Central...")
-
-        # 1. Crear granja (si no existe)
-        create_farm_sql = """
-            INSERT INTO "Farms" ("Name", "Address", "UserId", "CreatedAt")
-            SELECT 'Granja Central', 'Granja Central - Centro de Operaciones GPS', 1, NOW()
-            WHERE NOT EXISTS (SELECT 1 FROM "Farms" WHERE "Name" = 'Granja Central');
-        """
-
-        cur.execute(create_farm_sql)
-        print("✅ Granja Central creada/verificada")
-
-        print("\n2. Creando trackers...")
-
-        # 2. Crear trackers
-        for i in range(1, 11):
-            device_id = f"COW_NORTH_FARM_{i:02d}"
-            tracker_name = f"Tracker Granja Central {i:02d}"
-
-            create_tracker_sql = """
-                INSERT INTO "Trackers" ("DeviceId", "Name", "Status", "FirmwareVersion", "CreatedAt")
-                SELECT %s, %s, 'Active', 'v2.0', NOW()
-                WHERE NOT EXISTS (SELECT 1 FROM "Trackers" WHERE "DeviceId" = %s);
-            """
-
-            cur.execute(create_tracker_sql, (device_id, tracker_name, device_id))
-            print(f"✅ Tracker {device_id} creado/verificado")
-
-        print("\n3. Creando animales...")
-
-        # 3. Crear animales
-        for i in range(1, 11):
-            device_id = f"COW_NORTH_FARM_{i:02d}"
-            animal_name = f"Vaca Central {i:02d}"
-            tag = f"GC{i:03d}"
-
-            breeds = ['Holstein', 'Angus', 'Brahman', 'Hereford']
-            genders = ['Female', 'Male']
-
-            breed = breeds[i % len(breeds)]
-            gender = genders[i % len(genders)]
-            weight = 400.0 + (i * 10)
-
-            create_animal_sql = """
-                INSERT INTO "Animals" ("Name", "Tag", "Gender", "Breed", "BirthDate", "Weight", "Status", "FarmId", "TrackerId", "CreatedAt", "UpdatedAt")
-                SELECT %s, %s, %s, %s, '2021-01-01', %s, 'Active',
-                       (SELECT "Id" FROM "Farms" WHERE "Name" = 'Granja Central'),
-                       (SELECT "Id" FROM "Trackers" WHERE "DeviceId" = %s),
-                       NOW(), NOW()
-                WHERE NOT EXISTS (SELECT 1 FROM "Animals" WHERE "Tag" = %s);
-            """
-
-            cur.execute(create_animal_sql, (animal_name, tag, gender, breed, weight, device_id, tag))
-            print(f"✅ Animal {tag} ({animal_name}) creado/verificado")
-
-        # Commit todas las transacciones
-        conn.commit()
-
-        print("\n4. Verificando configuración...")
-
-        # 4. Verificar resultados
-        verify_sql = """
-            SELECT
-                f."Name" as farm_name,
-                f."Id" as farm_id,
-                COUNT(a."Id") as animal_count,
-                STRING_AGG(a."Tag", ', ' ORDER BY a."Tag") as animal_tags
-            FROM "Farms" f
-            LEFT JOIN "Animals" a ON f."Id" = a."FarmId"
-            WHERE f."Name" = 'Granja Central'
-            GROUP BY f."Name", f."Id";
-        """
-
-        cur.execute(verify_sql)
-        result = cur.fetchone()
-
-        if result:
-            farm_name, farm_id, animal_count, animal_tags = result
-            print(f"📊 Granja: {farm_name} (ID: {farm_id})")
-            print(f"📊 Animales: {animal_count}")
-            print(f"📊 Tags: {animal_tags}")
-
-        # Cerrar conexión
-        cur.close()
-        conn.close()
+        # Conexion del pool compartido (ConnectionStrings del API / variables de entorno)
+        with connection() as conn:
+            print("\n1-3. Creando granja, trackers y animales en una sola transaccion...")
+
+            # Granja, trackers y animales en un solo lote (COPY + INSERT ... SELECT)
+            farms, trackers, animals = granja_central_seed()
+            result = load_seed(conn, farms, trackers, animals)
+            print(f"✅ Granja Central creada/verificada ({result.farms_inserted} nueva)")
+            print(f"✅ {len(trackers)} trackers creados/verificados ({result.trackers_inserted} nuevos)")
+            print(f"✅ {len(animals)} animales creados/verificados ({result.animals_inserted} nuevos)")
+
+            print("\n4. Verificando configuración...")
+
+            # 4. Verificar resultados (totales calculados en SQL, sin listar tags)
+            with conn.cursor() as cur:
+                cur.execute('SELECT MIN("Id") FROM "Farms" WHERE "Name" = %s', (FARM_NAME,))
+                farm_id = cur.fetchone()[0]
+            if farm_id is not None:
+                print_farm_summary(conn, "📊 Granja:", farm_id)
 
         print("\n" + "=" * 60)
         print("🎉 CONFIGURACIÓN COMPLETADA EXITOSAMENTE")
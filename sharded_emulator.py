@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lanzador multi-proceso para flotas GPS grandes
+Reparte los dispositivos en N procesos (un rango de device ids por shard, por
+ejemplo COW_GPS_ER_1..COW_GPS_ER_25000), cada uno con su propio lazo de envio.
+El proceso padre recibe los contadores de cada shard por una cola y muestra un
+resumen combinado en lugar de una linea por lectura.
+
+Modelos:
+  5192   -> AnimalGPSTracker de start_emulator_5192.py (intervalo propio por animal)
+  10cows -> motor vectorizado de gps_fleet_engine.py (todo el shard en cada iteracion);
+            con --herd las vacas de cada shard siguen a sus vecinas (herd_cohesion.py)
+
+Con --geofence (GeoJSON, api:<farmId> o db:<farmId>) los potreros se cargan una
+sola vez en el proceso padre y cada shard recibe el Geofence ya compilado; los
+animales pastan dentro de los poligonos en lugar del circulo alrededor del centro.
+
+Con --seed cada dispositivo usa su propio generador derivado de (semilla,
+deviceId), asi las trayectorias no cambian al variar --workers. Con --speed los
+timestamps y la duracion siguen un reloj simulado (sim_clock.VirtualClock) con
+el mismo inicio en todos los shards.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import queue
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from gps_transport import DEFAULT_API_BASE_URL, AsyncTrackerSender, create_sender
+from latency_stats import LatencyHistogram
+from sim_clock import WallClock, make_clock
+
+CENTER_LAT = -33.0167
+CENTER_LNG = -58.5167
+
+
+def shard_ranges(devices: int, workers: int) -> List[Tuple[int, int]]:
+    """Divide los numeros de dispositivo 1..devices en `workers` rangos contiguos (inicio, cantidad)"""
+    base, extra = divmod(devices, workers)
+    ranges = []
+    start = 1
+    for shard in range(workers):
+        count = base + (1 if shard < extra else 0)
+        if count:
+            ranges.append((start, count))
+        start += count
+    return ranges
+
+
+async def _run_5192_shard(sender: AsyncTrackerSender, start_index: int, count: int, interval: float,
+                          duration: float, seed: Optional[int], clock: WallClock, geofence=None):
+    from device_records import DeviceTable
+    from start_emulator_5192 import AnimalGPSTracker, TrackerLink
+    from tracker_scheduler import TrackerScheduler, schedule_rng
+
+    pending = set()
+
+    async def sleep(seconds):
+        # Con reloj simulado acelerado no adelantarse a los envios pendientes
+        while len(pending) >= sender.concurrency:
+            await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        await clock.sleep_async(seconds)
+
+    scheduler = TrackerScheduler(clock=clock.monotonic, sleep=sleep)
+    devices = DeviceTable(AnimalGPSTracker, TrackerLink(sender.url, clock=clock, geofence=geofence),
+                          capacity=count)
+    for number in range(start_index, start_index + count):
+        animal = AnimalGPSTracker.create(devices, number, CENTER_LAT, CENTER_LNG, seed)
+        scheduler.add(animal, interval or animal.send_interval, rng=schedule_rng(seed, animal.device_id))
+
+    def fire(animal):
+        task = asyncio.ensure_future(sender.send(animal.generate_tracker_data()))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    await scheduler.run(fire, duration)
+    if pending:
+        await asyncio.wait(pending, timeout=sender.timeout)
+
+
+async def _run_10cows_shard(sender: AsyncTrackerSender, start_index: int, count: int, interval: float,
+                            duration: float, seed: Optional[int], clock: WallClock, herd: bool = False,
+                            geofence=None):
+    import numpy as np
+    from gps_fleet_engine import FleetState, build_payloads, step_fleet
+    from herd_cohesion import HerdCohesion
+    from pasture_geofence import PaddockFence
+
+    # Las tiradas que no salen de los streams por dispositivo (ruido de sensores, colocacion en
+    # potreros) usan un generador derivado de (semilla, primer dispositivo del shard)
+    rng = np.random.default_rng(None if seed is None else [seed, start_index])
+    fleet = FleetState.create(count, rng, CENTER_LAT, CENTER_LNG, start_index, seed)
+    steering = HerdCohesion() if herd else None
+    fence = None
+    if geofence is not None:
+        fence = PaddockFence(geofence)
+        fence.place(fleet, rng)
+    end_time = clock.monotonic() + duration
+
+    while clock.monotonic() < end_time:
+        start = clock.monotonic()
+        step_fleet(fleet, rng, steering=steering, fence=fence)
+        await sender.send_many(build_payloads(fleet, rng, clock.timestamp()))
+        await clock.sleep_async(min(interval - (clock.monotonic() - start), end_time - clock.monotonic()))
+
+
+async def _run_shard(shard_id: int, model: str, start_index: int, count: int, api_base_url: str,
+                     concurrency: int, interval: float, duration: float, report_every: float,
+                     batch_size: int, results: "multiprocessing.Queue", seed: Optional[int] = None,
+                     speed: Optional[float] = None, start: Optional[str] = None, herd: bool = False,
+                     geofence=None):
+    clock = make_clock(speed, start)
+    async with create_sender(api_base_url, concurrency, batch_size) as sender:
+        async def report():
+            reported_sent = reported_failed = 0
+            while True:
+                await asyncio.sleep(report_every)
+                histogram, sender.latency = sender.latency, LatencyHistogram()
+                results.put((shard_id, sender.sent - reported_sent, sender.failed - reported_failed,
+                             histogram.to_dict()))
+                reported_sent, reported_failed = sender.sent, sender.failed
+
+        reporter = asyncio.ensure_future(report())
+        try:
+            if model == "5192":
+                await _run_5192_shard(sender, start_index, count, interval, duration, seed, clock, geofence)
+            else:
+                await _run_10cows_shard(sender, start_index, count, interval, duration, seed, clock, herd,
+                                        geofence)
+        finally:
+            reporter.cancel()
+            # Ultimo reporte con lo que quedo pendiente
+            results.put((shard_id, sender.sent, sender.failed, sender.latency.to_dict(), "final"))
+
+
+def shard_worker(shard_id: int, model: str, start_index: int, count: int, api_base_url: str,
+                 concurrency: int, interval: float, duration: float, report_every: float,
+                 batch_size: int, results: "multiprocessing.Queue", seed: Optional[int] = None,
+                 speed: Optional[float] = None, start: Optional[str] = None, herd: bool = False,
+                 geofence=None):
+    """Punto de entrada de cada proceso hijo"""
+    try:
+        asyncio.run(_run_shard(shard_id, model, start_index, count, api_base_url, concurrency,
+                               interval, duration, report_every, batch_size, results, seed, speed, start, herd,
+                               geofence))
+    except KeyboardInterrupt:
+        pass
+
+
+class ShardTotals:
+    def __init__(self, start_index: int, count: int):
+        self.start_index = start_index
+        self.count = count
+        self.sent = 0
+        self.failed = 0
+        self.interval_sent = 0
+        self.interval_failed = 0
+        self.interval_latency = LatencyHistogram()
+        self.latency = LatencyHistogram()
+        self.finished = False
+
+
+def print_summary(shards: List[ShardTotals], elapsed: float, interval_seconds: float):
+    interval_latency = LatencyHistogram()
+    interval_sent = interval_failed = 0
+
+    print(f"\n[{datetime.now().strftime('%H:%M:%S')}] {elapsed:.0f}s transcurridos")
+    print(f"  {'shard':>5} {'dispositivos':>20} {'enviadas':>10} {'fallidas':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for shard_id, shard in enumerate(shards):
+        p = shard.interval_latency.percentiles((50, 99))
+        devices = f"{shard.start_index}-{shard.start_index + shard.count - 1}"
+        print(f"  {shard_id:>5} {devices:>20} {shard.interval_sent:>10} {shard.interval_failed:>9} "
+              f"{p['p50'] * 1000:>8.1f} {p['p99'] * 1000:>8.1f}")
+
+        interval_sent += shard.interval_sent
+        interval_failed += shard.interval_failed
+        interval_latency.merge(shard.interval_latency)
+        shard.interval_sent = shard.interval_failed = 0
+        shard.interval_latency = LatencyHistogram()
+
+    p = interval_latency.percentiles((50, 99))
+    rate = interval_sent / interval_seconds if interval_seconds > 0 else 0.0
+    print(f"  TOTAL: {interval_sent} enviadas ({rate:,.0f}/s), {interval_failed} fallidas, "
+          f"p50 {p['p50'] * 1000:.1f} ms, p99 {p['p99'] * 1000:.1f} ms")
+
+
+def run_sharded(model: str, devices: int, workers: int, api_base_url: str, concurrency: int,
+                interval: float, duration: float, report_every: float, batch_size: int = 0,
+                seed: Optional[int] = None, speed: Optional[float] = None, clock_start: Optional[str] = None,
+                herd: bool = False, geofence=None):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+
+    ranges = shard_ranges(devices, workers)
+    shards = [ShardTotals(start, count) for start, count in ranges]
+    processes = []
+
+    print("=" * 70)
+    print(f"EMULADOR MULTI-PROCESO - modelo {model}")
+    print(f"Dispositivos: {devices} en {len(ranges)} procesos")
+    print(f"API: {api_base_url} | Concurrencia por proceso: {concurrency}")
+    if batch_size:
+        print(f"Modo lote: hasta {batch_size} lecturas por request")
+    if seed is not None:
+        print(f"Semilla: {seed}")
+    if herd and model == "10cows":
+        print("Cohesion de rebaño: cada vaca sigue a sus vecinas")
+    if geofence is not None:
+        print(f"Geofence: {geofence.describe()}")
+    if speed is not None or clock_start is not None:
+        # Todos los shards arrancan el reloj simulado en el mismo instante
+        clock_start = clock_start or datetime.now(timezone.utc).isoformat()
+        print(f"Reloj simulado desde {clock_start} a velocidad {'maxima' if speed == 0 else f'{speed or 1:g}x'}")
+    print("=" * 70)
+
+    for shard_id, (start, count) in enumerate(ranges):
+        process = context.Process(
+            target=shard_worker,
+            args=(shard_id, model, start, count, api_base_url, concurrency, interval, duration,
+                  report_every, batch_size, results, seed, speed, clock_start, herd, geofence),
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+
+    start_time = time.monotonic()
+    last_summary = start_time
+
+    try:
+        while not all(shard.finished for shard in shards):
+            try:
+                message = results.get(timeout=report_every)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    break
+                continue
+
+            shard = shards[message[0]]
+            histogram = LatencyHistogram.from_dict(message[3])
+            if len(message) == 5:
+                # Reporte final: totales acumulados y latencias no reportadas aun
+                shard.interval_sent += message[1] - shard.sent
+                shard.interval_failed += message[2] - shard.failed
+                shard.sent, shard.failed = message[1], message[2]
+                shard.finished = True
+            else:
+                shard.interval_sent += message[1]
+                shard.interval_failed += message[2]
+                shard.sent += message[1]
+                shard.failed += message[2]
+            shard.interval_latency.merge(histogram)
+            shard.latency.merge(histogram)
+
+            now = time.monotonic()
+            if now - last_summary >= report_every:
+                print_summary(shards, now - start_time, now - last_summary)
+                last_summary = now
+
+    except KeyboardInterrupt:
+        print("\n\nEmulador detenido por el usuario")
+
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+
+    total_latency = LatencyHistogram()
+    for shard in shards:
+        total_latency.merge(shard.latency)
+    elapsed = time.monotonic() - start_time
+    total_sent = sum(shard.sent for shard in shards)
+    p = total_latency.percentiles((50, 99))
+
+    print("\n" + "=" * 70)
+    print("RESUMEN FINAL")
+    print(f"Enviadas: {total_sent} | Fallidas: {sum(shard.failed for shard in shards)}")
+    print(f"Throughput promedio: {total_sent / elapsed:,.0f} lecturas/s")
+    print(f"Latencia p50: {p['p50'] * 1000:.1f} ms | p99: {p['p99'] * 1000:.1f} ms")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulador GPS repartido en varios procesos")
+    parser.add_argument("--model", choices=["5192", "10cows"], default="5192")
+    parser.add_argument("--devices", type=int, default=10000, help="Cantidad total de dispositivos")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="Cantidad de procesos")
+    parser.add_argument("--api", default=DEFAULT_API_BASE_URL, help="URL base del API")
+    parser.add_argument("--concurrency", type=int, default=100, help="Envios simultaneos por proceso")
+    parser.add_argument("--interval", type=float, default=0,
+                        help="Segundos entre envios de cada dispositivo (0 = intervalo propio del modelo)")
+    parser.add_argument("--duration", type=float, default=60 * 60,
+                        help="Duracion en segundos (simulados si se usa --speed)")
+    parser.add_argument("--report-every", type=float, default=5.0, help="Segundos entre resumenes")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="Lecturas por lote a /tracker-data/batch (0 = una lectura por request)")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla para trayectorias reproducibles")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="Reloj simulado: multiplicador sobre la hora real (0 = lo mas rapido posible)")
+    parser.add_argument("--start", default=None, help="Fecha/hora ISO de inicio del reloj simulado")
+    parser.add_argument("--herd", action="store_true",
+                        help="Modelo 10cows: las vacas siguen a sus vecinas (cohesion de rebaño)")
+    parser.add_argument("--geofence", default=None,
+                        help="Potreros reales: archivo GeoJSON, api:<farmId> o db:<farmId>")
+    args = parser.parse_args()
+
+    geofence = None
+    if args.geofence:
+        from pasture_geofence import load_geofence
+        geofence = load_geofence(args.geofence, args.api)
+
+    interval = args.interval or (20.0 if args.model == "10cows" else 0)
+    run_sharded(args.model, args.devices, args.workers, args.api, args.concurrency, interval,
+                args.duration, args.report_every, args.batch_size, args.seed, args.speed, args.start, args.herd,
+                geofence)
+
+
+if __name__ == "__main__":
+    main()
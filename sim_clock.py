@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Relojes para los emuladores GPS
+Los emuladores toman la hora de las lecturas y sus esperas de un reloj en lugar
+de llamar directo a datetime.now() / time.sleep():
+
+- WallClock: hora real (comportamiento original).
+- VirtualClock: hora simulada desde `start`, acelerada por un multiplicador
+  (speed=60 -> una hora simulada por minuto real) o lo mas rapido posible
+  (speed=0: cada espera avanza el reloj sin dormir). Sirve para generar semanas
+  de LocationHistories en minutos con timestamps realistas.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+
+class WallClock:
+    """Hora real del sistema"""
+
+    speed = 1.0
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def timestamp(self) -> str:
+        """Timestamp ISO 8601 (UTC) para el payload tracker-data"""
+        return self.now().isoformat()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    async def sleep_async(self, seconds: float):
+        await asyncio.sleep(max(0.0, seconds))
+
+
+class VirtualClock(WallClock):
+    """Hora simulada: `speed` veces mas rapida que la real, o sin esperas si speed=0"""
+
+    def __init__(self, start: Optional[datetime] = None, speed: float = 0.0):
+        if start is not None and start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        self.start = start or datetime.now(timezone.utc)
+        self.speed = speed
+        self._origin = time.monotonic()
+        # Segundos simulados acumulados por las esperas (solo con speed=0)
+        self._elapsed = 0.0
+        # Esperas async pendientes con speed=0: heap de (vencimiento, orden, future)
+        self._sleepers: List[Tuple[float, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._advancing = False
+
+    def elapsed(self) -> float:
+        """Segundos simulados desde `start`"""
+        if self.speed > 0:
+            return (time.monotonic() - self._origin) * self.speed
+        return self._elapsed
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self.elapsed())
+
+    def monotonic(self) -> float:
+        return self.elapsed()
+
+    def sleep(self, seconds: float):
+        if seconds <= 0:
+            return
+        if self.speed > 0:
+            time.sleep(seconds / self.speed)
+        else:
+            self._elapsed += seconds
+
+    async def sleep_async(self, seconds: float):
+        if self.speed > 0:
+            await asyncio.sleep(max(0.0, seconds) / self.speed)
+            return
+
+        # Las tareas que esperan a la vez se despiertan en orden de vencimiento: el reloj
+        # salta al vencimiento mas cercano, no la suma de todas las esperas
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._sleepers, self._advancing = loop, [], False
+        future = loop.create_future()
+        heapq.heappush(self._sleepers, (self._elapsed + max(0.0, seconds), next(self._order), future))
+        if not self._advancing:
+            self._advancing = True
+            loop.call_soon(self._advance)
+        await future
+
+    def _advance(self):
+        """Avanza hasta el vencimiento mas cercano y despierta a todas las esperas que vencen ahi
+
+        Se vuelve a programar con call_soon despues de los despertados, asi las tareas
+        que vuelven a dormir entran al heap antes del proximo salto.
+        """
+        while self._sleepers and self._sleepers[0][2].done():
+            heapq.heappop(self._sleepers)  # espera cancelada
+        if not self._sleepers:
+            self._advancing = False
+            return
+        deadline = self._sleepers[0][0]
+        self._elapsed = max(self._elapsed, deadline)
+        while self._sleepers and self._sleepers[0][0] <= deadline:
+            _, _, future = heapq.heappop(self._sleepers)
+            if not future.done():
+                future.set_result(None)
+        self._loop.call_soon(self._advance)
+
+
+def make_clock(speed: Optional[float] = None, start: Optional[str] = None) -> WallClock:
+    """Reloj para las opciones --speed/--start (sin ninguna de las dos: hora real)"""
+    if speed is None and start is None:
+        return WallClock()
+    return VirtualClock(datetime.fromisoformat(start) if start else None,
+                        1.0 if speed is None else speed)
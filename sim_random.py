@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Numeros aleatorios reproducibles por dispositivo
+Cada dispositivo tiene su propio generador derivado de (semilla, deviceId), asi
+la trayectoria de una vaca es la misma sin importar cuantos dispositivos haya,
+en que orden se simulen ni en que proceso/shard le toque correr.
+
+- device_rng: generador por dispositivo para los emuladores objeto-por-vaca.
+  Con semilla es un DeviceStream: la version escalar de stream_block (clave de
+  64 bits + contador, unos 100 bytes en vez de los ~2.5 KB de un random.Random).
+  Sin semilla todos comparten un unico random.Random (no hay nada que reproducir).
+- device_keys / stream_uniforms: version vectorizada (NumPy) basada en contador:
+  el numero `draw` del paso `tick` de cada dispositivo es un hash de
+  (clave del dispositivo, tick, draw), sin estado compartido entre dispositivos.
+"""
+
+import hashlib
+import random
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+def device_seed(seed: int, device_id: str) -> int:
+    """Semilla de 64 bits estable (no depende de PYTHONHASHSEED) para un dispositivo"""
+    digest = hashlib.blake2b(f"{seed}:{device_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+# Generador compartido de las corridas sin semilla: un random.Random ocupa ~2.5 KB de estado
+SHARED_RNG = random.Random()
+
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+# Dentro de DeviceStream el nombre `random` es el metodo, no el modulo
+_Random = random.Random
+
+
+def _splitmix64_int(x: int) -> int:
+    z = (x + 0x9E3779B97F4A7C15) & _MASK_64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return z ^ (z >> 31)
+
+
+class DeviceStream:
+    """Generador por contador de un dispositivo, con la parte de la API de random.Random que usan los emuladores
+
+    El numero n es el mismo que stream_block(clave, n // DRAWS_PER_TICK, n % DRAWS_PER_TICK, 1).
+    """
+
+    __slots__ = ("key", "counter")
+
+    def __init__(self, key: int, counter: int = 0):
+        self.key = key
+        self.counter = counter
+
+    def _next64(self) -> int:
+        value = _splitmix64_int(self.key ^ _splitmix64_int(self.counter & _MASK_64))
+        self.counter += 1
+        return value
+
+    def random(self) -> float:
+        return (self._next64() >> 11) * (1.0 / (1 << 53))
+
+    def getrandbits(self, k: int) -> int:
+        value, bits = 0, 0
+        while bits < k:
+            value = (value << 64) | self._next64()
+            bits += 64
+        return value >> (bits - k)
+
+    def getstate(self):
+        return self.key, self.counter
+
+    def setstate(self, state):
+        self.key, self.counter = state
+
+    # Los metodos de random.Random escritos en Python solo necesitan random() y getrandbits()
+    uniform = _Random.uniform
+    randrange = _Random.randrange
+    randint = _Random.randint
+    choice = _Random.choice
+    _randbelow = _Random._randbelow
+
+
+def device_rng(seed: Optional[int], device_id: str):
+    """Generador propio del dispositivo; sin semilla, el generador compartido del modulo"""
+    if seed is None:
+        return SHARED_RNG
+    return DeviceStream(device_seed(seed, device_id))
+
+
+def device_keys(seed: int, device_ids: Iterable[str]) -> np.ndarray:
+    """Claves uint64 de cada dispositivo para stream_uniforms"""
+    return np.array([device_seed(seed, device_id) for device_id in device_ids], dtype=np.uint64)
+
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+# Cantidad maxima de numeros por dispositivo y por paso
+DRAWS_PER_TICK = 64
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    z = x + _GOLDEN_GAMMA
+    z = (z ^ (z >> np.uint64(30))) * _MIX_1
+    z = (z ^ (z >> np.uint64(27))) * _MIX_2
+    return z ^ (z >> np.uint64(31))
+
+
+def stream_block(keys: np.ndarray, tick: int, first_draw: int, count: int) -> np.ndarray:
+    """Uniformes en [0, 1) de los numeros first_draw..first_draw+count-1 del paso `tick`
+
+    Devuelve un array (count, dispositivos); todos los numeros de un paso se
+    calculan en una sola pasada vectorizada.
+    """
+    base = tick * DRAWS_PER_TICK + first_draw
+    counters = np.array([(base + i) & 0xFFFFFFFFFFFFFFFF for i in range(count)], dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        z = _splitmix64(keys[None, :] ^ _splitmix64(counters)[:, None])
+    return (z >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def stream_uniforms(keys: np.ndarray, tick: int, draw: int) -> np.ndarray:
+    """Uniformes en [0, 1), uno por dispositivo, para el numero `draw` del paso `tick`"""
+    return stream_block(keys, tick, draw, 1)[0]
@@ -6,15 +6,51 @@ Emula movimiento realista en Granja Norte
 """
 
 import requests
-import time
-import random
 import math
-from datetime import datetime, timezone
+
+import numpy as np
+
+from device_records import Column, DeviceRecord, DeviceTable
+from send_pacer import CATCH_UP, SendPacer
+from sim_clock import WallClock
+from sim_random import device_rng
+
+class NorthFarmCow(DeviceRecord):
+    """Vaca de Granja Norte: vista con __slots__ sobre una fila de DeviceTable"""
+    __slots__ = ()
+
+    current_lat = Column(np.float64)
+    current_lng = Column(np.float64)
+    speed = Column(np.float64)
+    activity_level = Column(np.int8)
+    temperature = Column(np.float64)
+    battery_level = Column(np.int8)
+    # Potrero del geofence en el que pasta (-1 sin geofence)
+    paddock = Column(np.int16)
+
+    @property
+    def name(self):
+        return f"Vaca Granja Norte {self.number:02d}"
+
+    @property
+    def tag(self):
+        return f"ER{self.number:03d}"
+
 
 class Simple10CowsEmulator:
-    def __init__(self):
+    def __init__(self, api_base_url="http://localhost:5192", sender=None, outbox=None, seed=None, clock=None,
+                 geofence=None):
         # Configuración del API
-        self.api_url = "http://localhost:5192/api/tracking/tracker-data"
+        self.api_url = f"{api_base_url}/api/tracking/tracker-data"
+
+        # Transporte opcional con pool de conexiones (gps_transport.BackgroundSender)
+        self.sender = sender
+
+        # Outbox opcional en disco para lecturas que el API no recibió (reading_outbox.ReadingOutbox)
+        self.outbox = outbox
+
+        # Reloj de las lecturas y esperas (sim_clock.VirtualClock para simular mas rapido)
+        self.clock = clock or WallClock()
 
         # Ubicación base: Entre Ríos, Argentina (misma zona que GPS-ER-001)
         self.base_lat = -33.0167
@@ -23,28 +59,38 @@ class Simple10CowsEmulator:
         # Radio de movimiento (~1km)
         self.movement_radius = 0.009  # aprox 1km en grados
 
-        # Inicializar vacas
+        # Potreros reales opcionales (pasture_geofence.Geofence): reemplazan al circulo
+        self.geofence = geofence
+
+        # Inicializar vacas (el estado de todas vive en una tabla de arrays)
+        self.devices = DeviceTable(NorthFarmCow)
         self.cows = []
         for i in range(1, 11):
             # Distribuir las vacas en un círculo alrededor del punto base
             angle = (i - 1) * (360 / 10)  # distribución uniforme
-            radius = random.uniform(0.002, 0.008)  # distancia variable del centro
+            device_id = f"COW_NORTH_FARM_{i:02d}"
+            rng = device_rng(seed, device_id)  # generador propio de cada collar
+            radius = rng.uniform(0.002, 0.008)  # distancia variable del centro
 
             # Calcular offset de posición inicial
             lat_offset = radius * math.cos(math.radians(angle))
             lng_offset = radius * math.sin(math.radians(angle))
-
-            cow = {
-                'device_id': f"COW_NORTH_FARM_{i:02d}",
-                'name': f"Vaca Granja Norte {i:02d}",
-                'tag': f"ER{i:03d}",
-                'current_lat': self.base_lat + lat_offset,
-                'current_lng': self.base_lng + lng_offset,
-                'speed': random.uniform(0.0, 2.0),
-                'activity': random.randint(1, 10),
-                'temperature': random.uniform(36.0, 40.0),
-                'battery': random.randint(85, 100)
-            }
+            lat, lng, paddock = self.base_lat + lat_offset, self.base_lng + lng_offset, -1
+            if geofence is not None:
+                lat, lng, paddock = geofence.random_point(rng)
+
+            cow = self.devices.add(
+                device_id,
+                rng=rng,
+                number=i,
+                paddock=paddock,
+                current_lat=lat,
+                current_lng=lng,
+                speed=rng.uniform(0.0, 2.0),
+                activity_level=rng.randint(1, 10),
+                temperature=rng.uniform(36.0, 40.0),
+                battery_level=rng.randint(85, 100)
+            )
             self.cows.append(cow)
 
         print("=" * 60)
@@ -54,6 +100,8 @@ class Simple10CowsEmulator:
         print(f"Animales: ER001 - ER010")
         print(f"Device IDs: COW_NORTH_FARM_01 - COW_NORTH_FARM_10")
         print(f"Actualizacion: cada 20 segundos")
+        if geofence is not None:
+            print(f"Geofence: {geofence.describe()}")
         print("=" * 60)
 
     def update_cow_position(self, cow):
@@ -61,99 +109,137 @@ class Simple10CowsEmulator:
         # Movimiento pequeño y aleatorio
         max_movement = 0.0002  # ~20 metros por ciclo
 
-        lat_change = random.uniform(-max_movement, max_movement)
-        lng_change = random.uniform(-max_movement, max_movement)
+        lat_change = cow.rng.uniform(-max_movement, max_movement)
+        lng_change = cow.rng.uniform(-max_movement, max_movement)
 
-        new_lat = cow['current_lat'] + lat_change
-        new_lng = cow['current_lng'] + lng_change
+        new_lat = cow.current_lat + lat_change
+        new_lng = cow.current_lng + lng_change
 
         # Mantener dentro del área permitida
-        distance_from_center = math.sqrt(
-            (new_lat - self.base_lat) ** 2 +
-            (new_lng - self.base_lng) ** 2
-        )
-
-        if distance_from_center <= self.movement_radius:
-            cow['current_lat'] = new_lat
-            cow['current_lng'] = new_lng
+        if self.geofence is not None:
+            allowed = self.geofence.contains_point(new_lat, new_lng, cow.paddock)
+            center_lat = float(self.geofence.anchor_lat[cow.paddock])
+            center_lng = float(self.geofence.anchor_lng[cow.paddock])
+        else:
+            distance_from_center = math.sqrt(
+                (new_lat - self.base_lat) ** 2 +
+                (new_lng - self.base_lng) ** 2
+            )
+            allowed = distance_from_center <= self.movement_radius
+            center_lat, center_lng = self.base_lat, self.base_lng
+
+        if allowed:
+            cow.current_lat = new_lat
+            cow.current_lng = new_lng
         else:
-            # Si se aleja mucho, mover hacia el centro
-            direction_lat = (self.base_lat - cow['current_lat']) * 0.1
-            direction_lng = (self.base_lng - cow['current_lng']) * 0.1
-            cow['current_lat'] += direction_lat
-            cow['current_lng'] += direction_lng
+            # Si se aleja mucho, mover hacia el centro (en un potrero no convexo, solo si sigue adentro)
+            new_lat = cow.current_lat + (center_lat - cow.current_lat) * 0.1
+            new_lng = cow.current_lng + (center_lng - cow.current_lng) * 0.1
+            if self.geofence is None or self.geofence.contains_point(new_lat, new_lng, cow.paddock):
+                cow.current_lat = new_lat
+                cow.current_lng = new_lng
 
         # Actualizar otros valores
-        cow['speed'] = random.uniform(0.0, 3.0)
-        cow['activity'] = random.randint(1, 10)
-        cow['temperature'] = random.uniform(36.0, 40.0)
-        cow['battery'] = max(10, cow['battery'] - random.choice([0, 0, 1]))
+        cow.speed = cow.rng.uniform(0.0, 3.0)
+        cow.activity_level = cow.rng.randint(1, 10)
+        cow.temperature = cow.rng.uniform(36.0, 40.0)
+        cow.battery_level = max(10, cow.battery_level - cow.rng.choice([0, 0, 1]))
+
+    def build_cow_data(self, cow):
+        """Arma el payload tracker-data de una vaca"""
+        return {
+            "deviceId": cow.device_id,
+            "latitude": round(cow.current_lat, 6),
+            "longitude": round(cow.current_lng, 6),
+            "altitude": round(cow.rng.uniform(15.0, 30.0), 1),
+            "speed": round(cow.speed, 1),
+            "activityLevel": cow.activity_level,
+            "temperature": round(cow.temperature, 1),
+            "batteryLevel": cow.battery_level,
+            "signalStrength": cow.rng.randint(70, 95),
+            "timestamp": self.clock.timestamp()
+        }
+
+    def generate_readings(self):
+        """Mueve todas las vacas un paso y devuelve sus payloads"""
+        readings = []
+        for cow in self.cows:
+            self.update_cow_position(cow)
+            readings.append(self.build_cow_data(cow))
+        return readings
 
     def send_cow_data(self, cow):
         """Envía datos GPS de una vaca al API"""
+        data = self.build_cow_data(cow)
         try:
-            data = {
-                "deviceId": cow['device_id'],
-                "latitude": round(cow['current_lat'], 6),
-                "longitude": round(cow['current_lng'], 6),
-                "altitude": round(random.uniform(15.0, 30.0), 1),
-                "speed": round(cow['speed'], 1),
-                "activityLevel": cow['activity'],
-                "temperature": round(cow['temperature'], 1),
-                "batteryLevel": cow['battery'],
-                "signalStrength": random.randint(70, 95),
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            }
-
-            response = requests.post(
-                self.api_url,
-                json=data,
-                headers={"Content-Type": "application/json"},
-                timeout=10
-            )
+            if self.sender is not None:
+                response = self.sender.post(data)
+            else:
+                response = requests.post(
+                    self.api_url,
+                    json=data,
+                    headers={"Content-Type": "application/json"},
+                    timeout=10
+                )
 
             if response.status_code == 200:
-                print(f"OK   {cow['tag']} ({cow['device_id']}) - Lat: {cow['current_lat']:.6f}, Lng: {cow['current_lng']:.6f}")
+                print(f"OK   {cow.tag} ({cow.device_id}) - Lat: {cow.current_lat:.6f}, Lng: {cow.current_lng:.6f}")
                 return True
             else:
-                print(f"ERROR {cow['tag']} - HTTP {response.status_code}: {response.text}")
+                print(f"ERROR {cow.tag} - HTTP {response.status_code}: {response.text}")
+                if response.status_code >= 500 and self.outbox is not None:
+                    self.outbox.append(data)
                 return False
 
         except Exception as e:
-            print(f"ERROR {cow['tag']} - Exception: {str(e)}")
+            print(f"ERROR {cow.tag} - Exception: {str(e)}")
+            if self.outbox is not None:
+                self.outbox.append(data)
             return False
 
-    def run(self):
-        """Ejecuta el emulador"""
+    def run(self, policy=CATCH_UP):
+        """Ejecuta el emulador
+
+        Cada envio tiene una hora programada (vaca k de la iteracion n en n * 20 s + k * 0.5 s):
+        una respuesta lenta del API ya no estira el ciclo; `policy` (send_pacer) decide si
+        los envios atrasados se ponen al dia, se descartan o corren el horario.
+        """
+        pacer = SendPacer(20, len(self.cows), spacing=0.5, clock=self.clock, policy=policy)
         iteration = 0
 
         try:
             while True:
                 iteration += 1
-                print(f"\n--- ITERACION {iteration} - {datetime.now().strftime('%H:%M:%S')} ---")
+                print(f"\n--- ITERACION {iteration} - {self.clock.now().astimezone().strftime('%Y-%m-%d %H:%M:%S')} ---")
 
                 successful_sends = 0
 
                 # Procesar cada vaca
                 for cow in self.cows:
+                    # Esperar la hora programada de esta vaca
+                    slot = pacer.next_slot()
+
                     # Actualizar posición
                     self.update_cow_position(cow)
 
+                    if slot.shed:
+                        print(f"SKIP {cow.tag} - {slot.lateness:.1f}s atrasado, lectura descartada")
+                        continue
+
                     # Enviar datos
-                    if self.send_cow_data(cow):
+                    ok = self.send_cow_data(cow)
+                    pacer.done(slot, ok)
+                    if ok:
                         successful_sends += 1
 
-                    # Pequeña pausa entre vacas
-                    time.sleep(0.5)
-
                 print(f"\nResumen: {successful_sends}/{len(self.cows)} vacas enviaron datos exitosamente")
-                print("Proxima actualizacion en 20 segundos...")
-
-                # Esperar 20 segundos
-                time.sleep(15)  # 15 + (10 * 0.5) = ~20 segundos total
+                print(f"Ritmo: {pacer.summary()}")
+                print(f"Proxima actualizacion en {pacer.seconds_until_next():.1f} segundos...")
+                pacer.reset_window()
 
         except KeyboardInterrupt:
             print(f"\n\nEmulador detenido por el usuario despues de {iteration} iteraciones")
+            print(f"Ritmo (total): {pacer.summary(pacer.total)}")
             print("Datos GPS finalizados.")
         except Exception as e:
             print(f"\nError inesperado: {e}")
@@ -6,66 +6,186 @@ Emula 15 vacas GPS pastando en Entre Rios, Argentina
 """
 
 import requests
+import asyncio
 import json
 import time
-import random
 import math
-import threading
-from datetime import datetime, timezone
-
-class AnimalGPSTracker:
-    def __init__(self, animal_number: int, center_lat: float, center_lng: float, api_url: str):
+from dataclasses import dataclass, field
+from typing import Dict
+
+import numpy as np
+
+from device_records import Column, DeviceRecord, DeviceTable
+from gps_transport import AsyncTrackerSender
+from sim_clock import WallClock
+from sim_random import device_rng
+from tracker_scheduler import TrackerScheduler, schedule_rng
+
+@dataclass
+class SendStats:
+    """Contadores de envios de todos los collares (se informan cada tanto, no por envio)"""
+    sent: int = 0
+    grazing: int = 0
+    resting: int = 0
+    http_errors: Dict[int, int] = field(default_factory=dict)
+    connection_errors: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def failed(self) -> int:
+        return sum(self.http_errors.values()) + sum(self.connection_errors.values())
+
+    def record_ok(self, resting: bool):
+        self.sent += 1
+        if resting:
+            self.resting += 1
+        else:
+            self.grazing += 1
+
+    def record_http_error(self, status: int):
+        self.http_errors[status] = self.http_errors.get(status, 0) + 1
+
+    def record_connection_error(self, error: Exception):
+        kind = error.__class__.__name__
+        self.connection_errors[kind] = self.connection_errors.get(kind, 0) + 1
+
+    def describe_errors(self) -> str:
+        errors = [f"HTTP {status}: {count}" for status, count in sorted(self.http_errors.items())]
+        errors += [f"{kind}: {count}" for kind, count in sorted(self.connection_errors.items())]
+        return ", ".join(errors) or "sin errores"
+
+
+@dataclass
+class TrackerLink:
+    """Configuracion comun a todos los collares de un emulador (una sola copia, no una por animal)"""
+    api_url: str
+    sender: object = None  # gps_transport.BackgroundSender compartido (opcional)
+    outbox: object = None  # reading_outbox.ReadingOutbox compartido (opcional)
+    clock: WallClock = field(default_factory=WallClock)  # sim_clock: hora real o simulada
+    # Area de pastoreo individual (aproximadamente 500m x 500m por animal)
+    grazing_radius: float = 0.005  # ~500 metros en grados
+    # Potreros reales opcionales (pasture_geofence.Geofence): reemplazan al circulo de pastoreo
+    geofence: object = None
+    stats: SendStats = field(default_factory=SendStats)
+
+
+class AnimalGPSTracker(DeviceRecord):
+    """Collar de una vaca: vista con __slots__ sobre una fila de DeviceTable (ver device_records)"""
+    __slots__ = ()
+
+    center_lat = Column(np.float64)
+    center_lng = Column(np.float64)
+    current_lat = Column(np.float64)
+    current_lng = Column(np.float64)
+    # Estados de comportamiento individuales
+    is_resting = Column(np.bool_)
+    rest_cycles = Column(np.int16)
+    max_rest_cycles = Column(np.int8)
+    # Configuracion de simulacion
+    send_interval = Column(np.int16)
+    is_active = Column(np.bool_)
+    # Potrero del geofence en el que pasta (-1 sin geofence)
+    paddock = Column(np.int16)
+
+    @classmethod
+    def create(cls, devices: DeviceTable, animal_number: int, center_lat: float, center_lng: float,
+               seed=None) -> "AnimalGPSTracker":
+        """Agrega el collar `animal_number` a `devices` con su estado inicial"""
         # Configuracion del dispositivo - cada animal tiene su propio device_id
-        self.animal_number = animal_number
-        self.device_id = f"COW_GPS_ER_{animal_number:02d}"  # COW_GPS_ER_01, COW_GPS_ER_02, etc.
-        self.tag = f"GPS-ER-{animal_number:03d}"  # GPS-ER-001, GPS-ER-002, etc.
-        self.api_url = api_url
+        device_id = f"COW_GPS_ER_{animal_number:02d}"  # COW_GPS_ER_01, COW_GPS_ER_02, etc.
+        rng = device_rng(seed, device_id)  # generador propio: no depende de los demas animales
 
         # Coordenadas del centro de Entre Rios con pequeña variacion para cada animal
-        self.center_lat = center_lat + random.uniform(-0.002, 0.002)  # ~200m variacion
-        self.center_lng = center_lng + random.uniform(-0.002, 0.002)
-
-        # Area de pastoreo individual (aproximadamente 500m x 500m por animal)
-        self.grazing_radius = 0.005  # ~500 metros en grados
+        center_lat = center_lat + rng.uniform(-0.002, 0.002)  # ~200m variacion
+        center_lng = center_lng + rng.uniform(-0.002, 0.002)
 
         # Estado inicial del animal (posicion aleatoria dentro de su area)
-        angle = random.uniform(0, 2 * math.pi)
-        distance = random.uniform(0, self.grazing_radius * 0.5)
-        self.current_lat = self.center_lat + distance * math.cos(angle)
-        self.current_lng = self.center_lng + distance * math.sin(angle)
+        angle = rng.uniform(0, 2 * math.pi)
+        distance = rng.uniform(0, devices.shared.grazing_radius * 0.5)
+        current_lat = center_lat + distance * math.cos(angle)
+        current_lng = center_lng + distance * math.sin(angle)
+
+        # Con geofence el centro es un punto al azar dentro de los potreros
+        paddock = -1
+        geofence = devices.shared.geofence
+        if geofence is not None:
+            center_lat, center_lng, paddock = geofence.random_point(rng)
+            current_lat, current_lng = center_lat, center_lng
+
+        return devices.add(
+            device_id,
+            rng=rng,
+            number=animal_number,
+            paddock=paddock,
+            center_lat=center_lat,
+            center_lng=center_lng,
+            current_lat=current_lat,
+            current_lng=current_lng,
+            is_resting=rng.choice([True, False]),
+            rest_cycles=0,
+            max_rest_cycles=rng.randint(2, 6),
+            send_interval=rng.randint(15, 25),  # Intervalo variable entre animales
+            is_active=True
+        )
+
+    @property
+    def animal_number(self):
+        return self.number
+
+    @property
+    def tag(self):
+        return f"GPS-ER-{self.number:03d}"  # GPS-ER-001, GPS-ER-002, etc.
+
+    @property
+    def api_url(self):
+        return self.table.shared.api_url
+
+    @property
+    def sender(self):
+        return self.table.shared.sender
+
+    @property
+    def outbox(self):
+        return self.table.shared.outbox
+
+    @property
+    def clock(self):
+        return self.table.shared.clock
+
+    @property
+    def grazing_radius(self):
+        return self.table.shared.grazing_radius
 
-        # Estados de comportamiento individuales
-        self.is_resting = random.choice([True, False])
-        self.rest_cycles = 0
-        self.max_rest_cycles = random.randint(2, 6)
+    @property
+    def geofence(self):
+        return self.table.shared.geofence
 
-        # Configuracion de simulacion
-        self.send_interval = random.randint(15, 25)  # Intervalo variable entre animales
-        self.is_active = True
+    @property
+    def stats(self) -> SendStats:
+        return self.table.shared.stats
 
     def generate_realistic_movement(self):
         """Genera movimiento realista individual para cada vaca"""
         if self.is_resting:
             # Durante el descanso, movimiento muy limitado
-            lat_change = random.uniform(-0.0001, 0.0001)  # ~10 metros
-            lng_change = random.uniform(-0.0001, 0.0001)
+            lat_change = self.rng.uniform(-0.0001, 0.0001)  # ~10 metros
+            lng_change = self.rng.uniform(-0.0001, 0.0001)
             speed = 0.0
-            activity = random.randint(1, 3)  # Baja actividad
+            activity = self.rng.randint(1, 3)  # Baja actividad
             self.rest_cycles += 1
 
             if self.rest_cycles >= self.max_rest_cycles:
                 self.is_resting = False
                 self.rest_cycles = 0
-                self.max_rest_cycles = random.randint(2, 6)
+                self.max_rest_cycles = self.rng.randint(2, 6)
         else:
             # Movimiento normal de pastoreo
-            lat_change = random.uniform(-0.002, 0.002)  # ~200 metros
-            lng_change = random.uniform(-0.002, 0.002)
-            speed = random.uniform(0.2, 1.8)  # m/s realista para pastoreo
-            activity = random.randint(4, 9)  # Actividad media-alta
+            lat_change = self.rng.uniform(-0.002, 0.002)  # ~200 metros
+            lng_change = self.rng.uniform(-0.002, 0.002)
+            speed = self.rng.uniform(0.2, 1.8)  # m/s realista para pastoreo
+            activity = self.rng.randint(4, 9)  # Actividad media-alta
 
             # Chance de empezar a descansar (diferente por animal)
-            if random.random() < 0.15:  # 15% chance
+            if self.rng.random() < 0.15:  # 15% chance
                 self.is_resting = True
                 self.rest_cycles = 0
 
@@ -73,21 +193,27 @@ class AnimalGPSTracker:
         new_lat = self.current_lat + lat_change
         new_lng = self.current_lng + lng_change
 
-        # Verificar que este dentro del area de pastoreo
-        distance_from_center = math.sqrt(
-            (new_lat - self.center_lat) ** 2 +
-            (new_lng - self.center_lng) ** 2
-        )
+        # Verificar que este dentro del area de pastoreo (o de su potrero)
+        geofence = self.geofence
+        if geofence is not None:
+            allowed = geofence.contains_point(new_lat, new_lng, self.paddock)
+        else:
+            distance_from_center = math.sqrt(
+                (new_lat - self.center_lat) ** 2 +
+                (new_lng - self.center_lng) ** 2
+            )
+            allowed = distance_from_center <= self.grazing_radius
 
-        if distance_from_center <= self.grazing_radius:
+        if allowed:
             self.current_lat = new_lat
             self.current_lng = new_lng
         else:
-            # Si se sale del area, mover hacia el centro
-            direction_lat = (self.center_lat - self.current_lat) * 0.2
-            direction_lng = (self.center_lng - self.current_lng) * 0.2
-            self.current_lat += direction_lat
-            self.current_lng += direction_lng
+            # Si se sale del area, mover hacia el centro (en un potrero no convexo, solo si sigue adentro)
+            new_lat = self.current_lat + (self.center_lat - self.current_lat) * 0.2
+            new_lng = self.current_lng + (self.center_lng - self.current_lng) * 0.2
+            if geofence is None or geofence.contains_point(new_lat, new_lng, self.paddock):
+                self.current_lat = new_lat
+                self.current_lng = new_lng
 
         return speed, activity
 
@@ -99,51 +225,83 @@ class AnimalGPSTracker:
             "deviceId": self.device_id,
             "latitude": round(self.current_lat, 6),
             "longitude": round(self.current_lng, 6),
-            "altitude": round(random.uniform(15.0, 25.0), 1),  # Entre Rios es bastante plano
+            "altitude": round(self.rng.uniform(15.0, 25.0), 1),  # Entre Rios es bastante plano
             "speed": round(speed, 1),
             "activityLevel": activity,
-            "temperature": round(random.uniform(36.5, 39.5), 1),  # Temperatura corporal normal
-            "batteryLevel": random.randint(75, 100),
-            "signalStrength": random.randint(70, 95),
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "temperature": round(self.rng.uniform(36.5, 39.5), 1),  # Temperatura corporal normal
+            "batteryLevel": self.rng.randint(75, 100),
+            "signalStrength": self.rng.randint(70, 95),
+            "timestamp": self.clock.timestamp()
         }
 
     def send_data(self, data):
         """Envia datos al API"""
         try:
-            response = requests.post(
-                self.api_url,
-                json=data,
-                headers={"Content-Type": "application/json"},
-                timeout=5
-            )
-
-            if response.status_code == 200:
-                status = "Descansando" if self.is_resting else "Pastando"
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] {self.tag} - {status}")
-                print(f"   Ubicacion: {data['latitude']}, {data['longitude']} | Vel: {data['speed']} m/s")
-                return True
+            if self.sender is not None:
+                response = self.sender.post(data)
             else:
-                print(f"Error HTTP {response.status_code} para {self.tag}")
-                return False
+                response = requests.post(
+                    self.api_url,
+                    json=data,
+                    headers={"Content-Type": "application/json"},
+                    timeout=5
+                )
+            return self.report_response(response, data)
 
         except requests.exceptions.RequestException as e:
-            print(f"Error conexion {self.tag}: {e}")
+            self.stats.record_connection_error(e)
+            if self.outbox is not None:
+                self.outbox.append(data)
+            return False
+
+    async def send_data_async(self, data, sender):
+        """Envia datos al API usando un gps_transport.AsyncTrackerSender"""
+        try:
+            response = await sender.post(data)
+            return self.report_response(response, data)
+
+        except requests.exceptions.RequestException as e:
+            self.stats.record_connection_error(e)
+            if self.outbox is not None:
+                self.outbox.append(data)
+            return False
+
+    def report_response(self, response, data):
+        """Suma el resultado de un envio a los contadores compartidos (sin imprimir por envio)"""
+        if response.status_code == 200:
+            self.stats.record_ok(self.is_resting)
+            return True
+        else:
+            self.stats.record_http_error(response.status_code)
+            if response.status_code >= 500 and self.outbox is not None:
+                self.outbox.append(data)
             return False
 
 class EntreRiosGPSEmulator:
-    def __init__(self, api_base_url: str = "http://localhost:5192"):
+    def __init__(self, api_base_url: str = "http://localhost:5192", sender=None,
+                 num_animals: int = 15, concurrency: int = 100, outbox=None, seed=None, clock=None,
+                 geofence=None, report_every: float = 10.0):
+        self.api_base_url = api_base_url
         self.api_url = f"{api_base_url}/api/tracking/tracker-data"
+        self.sender = sender
+        self.concurrency = concurrency
+        self.outbox = outbox
+        self.seed = seed
+        self.clock = clock or WallClock()
+        self.report_every = report_every
 
         # Coordenadas del centro de Entre Rios (Gualeguaychu)
         self.center_lat = -33.0167
         self.center_lng = -58.5167
 
-        # Crear 15 animales GPS
-        self.animals = []
-        for i in range(1, 16):  # 1 a 15
-            animal = AnimalGPSTracker(i, self.center_lat, self.center_lng, self.api_url)
-            self.animals.append(animal)
+        # Crear los animales GPS (15 por defecto) sobre una tabla compartida
+        self.devices = DeviceTable(AnimalGPSTracker,
+                                   TrackerLink(self.api_url, sender, outbox, self.clock, geofence=geofence),
+                                   capacity=num_animals)
+        self.animals = [AnimalGPSTracker.create(self.devices, i, self.center_lat, self.center_lng, seed)
+                        for i in range(1, num_animals + 1)]
+
+        self.stats = self.devices.shared.stats
 
         # Configuracion de la simulacion
         self.total_duration = 60 * 60  # 60 minutos
@@ -151,79 +309,92 @@ class EntreRiosGPSEmulator:
 
         print("Iniciando Emulador GPS - Entre Rios...")
         print("=" * 70)
-        print("GPS EMULADOR - 15 VACAS GPS ENTRE RIOS, ARGENTINA")
+        print(f"GPS EMULADOR - {num_animals} VACAS GPS ENTRE RIOS, ARGENTINA")
         print("=" * 70)
         print("Granja: Entre Rios - Vaca GPS")
-        print(f"Animales: 15 vacas GPS (GPS-ER-001 a GPS-ER-015)")
+        print(f"Animales: {num_animals} vacas GPS ({self.animals[0].tag} a {self.animals[-1].tag})")
         print(f"Ubicacion: Gualeguaychu, Entre Rios ({self.center_lat}, {self.center_lng})")
-        print(f"Area total: ~1.5km x 1.5km")
+        if geofence is not None:
+            print(f"Geofence: {geofence.describe()}")
+        else:
+            print(f"Area total: ~1.5km x 1.5km")
         print(f"Duracion: {self.total_duration // 60} minutos")
         print(f"API: {api_base_url}")
         print("=" * 70)
-        for animal in self.animals:
+        for animal in self.animals[:20]:
             print(f"  {animal.tag} -> Device: {animal.device_id}")
+        if len(self.animals) > 20:
+            print(f"  ... y {len(self.animals) - 20} mas")
         print("=" * 70)
         print()
 
-    def run_animal_simulation(self, animal, stop_event):
-        """Ejecuta la simulacion para un animal individual"""
-        cycle_count = 0
-        try:
-            while not stop_event.is_set():
-                cycle_count += 1
-
-                # Generar y enviar datos del animal
-                tracker_data = animal.generate_tracker_data()
-                success = animal.send_data(tracker_data)
-
-                if not success:
-                    print(f"   Falló envío para {animal.tag}")
-
-                # Esperar con intervalo individual del animal
-                time.sleep(animal.send_interval)
-
-        except Exception as e:
-            print(f"Error en {animal.tag}: {e}")
-
-        print(f"\n{animal.tag} completó {cycle_count} ciclos")
+    def generate_readings(self):
+        """Genera una lectura por animal (para run_fleet de gps_transport)"""
+        return [animal.generate_tracker_data() for animal in self.animals]
+
+    async def report(self):
+        """Resumen de envios cada `report_every` segundos reales"""
+        last_sent = last_failed = 0
+        last_time = time.monotonic()
+        while True:
+            await asyncio.sleep(self.report_every)
+            now = time.monotonic()
+            stats = self.stats
+            sent, failed = stats.sent - last_sent, stats.failed - last_failed
+            print(f"[{self.clock.now().astimezone().strftime('%H:%M:%S')}] {sent / (now - last_time):,.1f} envios/s | "
+                  f"total {stats.sent:,} (pastando {stats.grazing:,}, descansando {stats.resting:,}) | "
+                  f"fallidos +{failed:,} ({stats.describe_errors()})")
+            last_sent, last_failed, last_time = stats.sent, stats.failed, now
+
+    async def run_scheduled(self):
+        """Dispara el envio de cada animal con su propio intervalo desde un solo event loop"""
+        pending = set()
+
+        async def sleep(seconds):
+            # Con un reloj simulado acelerado no adelantarse a los envios que siguen pendientes
+            while len(pending) >= self.concurrency:
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            await self.clock.sleep_async(seconds)
+
+        scheduler = TrackerScheduler(clock=self.clock.monotonic, sleep=sleep)
+        for animal in self.animals:
+            scheduler.add(animal, animal.send_interval, rng=schedule_rng(self.seed, animal.device_id))
+
+        async with AsyncTrackerSender(self.api_base_url, self.concurrency) as sender:
+            def fire(animal):
+                task = asyncio.ensure_future(animal.send_data_async(animal.generate_tracker_data(), sender))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+            reporter = asyncio.ensure_future(self.report())
+            try:
+                await scheduler.run(fire, self.total_duration)
+            finally:
+                reporter.cancel()
+                if pending:
+                    await asyncio.wait(pending, timeout=5)
+
+                self.cycle_count = scheduler.fired
+                print(f"\nEnvios disparados: {scheduler.fired} | Salteados por atraso: {scheduler.skipped}")
+                print(f"Atraso promedio: {scheduler.average_lateness * 1000:.1f} ms | "
+                      f"maximo: {scheduler.max_lateness * 1000:.1f} ms")
+                print(f"Enviados: {self.stats.sent:,} | Fallidos: {self.stats.failed:,} "
+                      f"({self.stats.describe_errors()})")
 
     def run(self):
-        """Ejecuta el emulador para todos los animales en paralelo"""
-        print("Iniciando simulación GPS para 15 vacas...")
+        """Ejecuta el emulador para todos los animales en un solo hilo"""
+        print(f"Iniciando simulación GPS para {len(self.animals)} vacas...")
         print("Presiona Ctrl+C para detener\n")
+        print(f"Simulación por {self.total_duration // 60} minutos...")
 
         start_time = time.time()
-        stop_event = threading.Event()
-        threads = []
 
         try:
-            # Crear un hilo para cada animal
-            for animal in self.animals:
-                thread = threading.Thread(
-                    target=self.run_animal_simulation,
-                    args=(animal, stop_event),
-                    daemon=True
-                )
-                thread.start()
-                threads.append(thread)
-                time.sleep(0.5)  # Escalonar el inicio de los animales
-
-            print(f"Todos los animales iniciados. Simulación por {self.total_duration // 60} minutos...")
-
-            # Esperar hasta que termine el tiempo o se interrumpa
-            time.sleep(self.total_duration)
-
+            asyncio.run(self.run_scheduled())
         except KeyboardInterrupt:
             print(f"\n\nEmulador detenido por el usuario después de {(time.time() - start_time):.0f} segundos")
 
-        # Detener todos los hilos
-        stop_event.set()
-
-        # Esperar a que terminen todos los hilos
-        for thread in threads:
-            thread.join(timeout=5)
-
-        print(f"\nSimulación GPS completada para las 15 vacas de Entre Rios")
+        print(f"\nSimulación GPS completada para las {len(self.animals)} vacas de Entre Rios")
         print("Datos GPS finalizados.")
 
 if __name__ == "__main__":
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita los endpoints de ingesta del API
+Acepta POST /api/tracking/tracker-data (una lectura) y
+POST /api/tracking/tracker-data/batch (array de lecturas) sin base de datos,
+para probar los emuladores y medir el costo del lado cliente.
+Con --error-rate una fraccion de los requests responde 500 (para probar
+reintentos, el outbox y el desglose de errores de la prueba de carga).
+Como el API, el batch rechaza con 413 los lotes de mas de MAX_BATCH_SIZE
+lecturas; con --item-error-rate una fraccion de las lecturas de cada lote no
+se guarda y el lote responde 207 con failedItems (indice, deviceId, error).
+
+Tambien hace de LiveTrackingHub en /tracking-hub (negotiate + WebSocket con
+el protocolo JSON de SignalR, sin validar el token): cada lectura aceptada se
+difunde como LocationUpdate al grupo animal_{id} y AnimalLocationUpdate al
+grupo farm_{id}, para probar hub_load_client.py sin el API. Los animales se
+numeran en el orden en que aparece cada deviceId y se reparten entre
+--hub-farms granjas (animal 1 -> granja 1, animal 2 -> granja 2, ...).
+
+Para alert_scenarios.py aplica a cada lectura las reglas de AlertService
+(OutOfBounds fuera del limite de --boundary, Immobility con 20 lecturas o mas
+de las ultimas 2 horas dentro de 10 m, LowActivity y HighActivity contra el
+promedio de 24 h; una alerta sin resolver por animal y tipo de las ultimas
+24 h, como HasSimilarAlertAsync) y expone GET /api/Alerts,
+PUT /api/Alerts/{id}/resolve y GET /api/Trackers. --alert-delay-ms demora la
+creacion de cada alerta, como un procesamiento en segundo plano.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Set, Tuple
+
+from aiohttp import WSMsgType, web
+
+from alert_scenarios import ALERT_MESSAGES, ALERT_SEVERITY, ALERTS_PATH, SIMILAR_ALERT_S, TRACKERS_PATH, AlertRuleModel
+from gps_transport import DEFAULT_API_BASE_URL, MAX_BATCH_SIZE, MULTI_STATUS, TRACKER_DATA_BATCH_PATH, TRACKER_DATA_PATH
+from hub_load_client import (CLOSE, COMPLETION, HUB_PATH, INVOCATION, PING, PING_INTERVAL,
+                             encode_message, parse_messages)
+
+# Metodos del hub que agregan o quitan la conexion de un grupo (ver Hubs/LiveTrackingHub.cs)
+HUB_GROUP_METHODS = {
+    "JoinFarmGroup": ("farm", True), "LeaveFarmGroup": ("farm", False),
+    "JoinAnimalGroup": ("animal", True), "LeaveAnimalGroup": ("animal", False),
+}
+
+
+class HubConnection:
+    """Suscriptor del hub: los mensajes se encolan y los escribe una tarea propia (como SignalR)"""
+
+    def __init__(self, ws: web.WebSocketResponse):
+        self.ws = ws
+        self.groups: Set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def writer(self):
+        while not self.ws.closed:
+            try:
+                text = await asyncio.wait_for(self.queue.get(), PING_INTERVAL)
+            except asyncio.TimeoutError:
+                text = encode_message({"type": PING})
+            try:
+                await self.ws.send_str(text)
+            except ConnectionError:
+                return
+
+
+class StubTrackingHub:
+    def __init__(self, farms: int = 1):
+        self.farms = max(1, farms)
+        self.groups: Dict[str, Set[HubConnection]] = {}
+        self.animal_ids: Dict[str, int] = {}
+        self.connections = 0
+        self.deliveries = 0
+
+    def animal(self, device_id: str) -> Tuple[int, int]:
+        """(animalId, farmId) del dispositivo, numerado en orden de aparicion"""
+        animal_id = self.animal_ids.setdefault(device_id, len(self.animal_ids) + 1)
+        return animal_id, (animal_id - 1) % self.farms + 1
+
+    def publish(self, reading: dict):
+        """Difunde una lectura como lo hace TrackingService despues de guardarla"""
+        device_id = reading.get("deviceId")
+        if not device_id or not self.groups:
+            return
+        animal_id, farm_id = self.animal(device_id)
+        location = {name: reading.get(name) for name in
+                    ("latitude", "longitude", "altitude", "speed", "activityLevel", "temperature", "timestamp")}
+        for group, method in ((f"animal_{animal_id}", "LocationUpdate"), (f"farm_{farm_id}", "AnimalLocationUpdate")):
+            members = self.groups.get(group)
+            if not members:
+                continue
+            text = encode_message({"type": INVOCATION, "target": method, "arguments": [animal_id, location]})
+            for member in members:
+                member.queue.put_nowait(text)
+            self.deliveries += len(members)
+
+    async def negotiate(self, request: web.Request) -> web.Response:
+        token = uuid.uuid4().hex
+        return web.json_response({
+            "negotiateVersion": 1, "connectionId": token, "connectionToken": token,
+            "availableTransports": [{"transport": "WebSockets", "transferFormats": ["Text"]}],
+        })
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        handshake = await ws.receive()
+        if handshake.type != WSMsgType.TEXT or parse_messages(handshake.data)[0].get("protocol") != "json":
+            await ws.send_str(encode_message({"error": "Solo se soporta el protocolo json"}))
+            await ws.close()
+            return ws
+        await ws.send_str(encode_message({}))
+
+        connection = HubConnection(ws)
+        writer = asyncio.ensure_future(connection.writer())
+        self.connections += 1
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    break
+                for message in parse_messages(msg.data):
+                    if message.get("type") == CLOSE:
+                        return ws
+                    if message.get("type") == INVOCATION:
+                        self._invoke(connection, message)
+        finally:
+            self.connections -= 1
+            for group in connection.groups:
+                self.groups.get(group, set()).discard(connection)
+            writer.cancel()
+        return ws
+
+    def _invoke(self, connection: HubConnection, message: dict):
+        target = message.get("target")
+        reply = {"type": COMPLETION, "invocationId": message.get("invocationId")}
+        if target in HUB_GROUP_METHODS and message.get("arguments"):
+            prefix, join = HUB_GROUP_METHODS[target]
+            group = f"{prefix}_{message['arguments'][0]}"
+            if join:
+                connection.groups.add(group)
+                self.groups.setdefault(group, set()).add(connection)
+            else:
+                connection.groups.discard(group)
+                self.groups.get(group, set()).discard(connection)
+        else:
+            reply["error"] = f"Unknown hub method '{target}'"
+        if reply["invocationId"] is not None:
+            connection.queue.put_nowait(encode_message(reply))
+
+
+class StubAlertRules:
+    """Reglas de AlertService por lectura (AlertRuleModel) con el filtro de HasSimilarAlertAsync:
+    no se crea otra alerta si el animal tiene una sin resolver del mismo tipo de las ultimas 24 h"""
+
+    def __init__(self, delay_ms: float = 0.0, boundary=None):
+        self.delay = delay_ms / 1000
+        self.rules = AlertRuleModel(boundary)
+        self.alerts: Dict[int, dict] = {}
+        # (animal, tipo) -> hora de creacion de la alerta sin resolver
+        self.open: Dict[Tuple[int, str], float] = {}
+        self.created = 0
+
+    def check(self, animal_id: int, farm_id: int, reading: dict):
+        if reading.get("latitude") is None or reading.get("longitude") is None:
+            return
+        for kind in self.rules.check(animal_id, reading, now=time.time()):
+            self._create(animal_id, farm_id, kind)
+
+    def _create(self, animal_id: int, farm_id: int, kind: str):
+        now = time.time()
+        if now - self.open.get((animal_id, kind), -SIMILAR_ALERT_S) < SIMILAR_ALERT_S:
+            return
+        self.open[(animal_id, kind)] = now
+        self.created += 1
+        name = f"Animal {animal_id}"
+        alert = {"id": self.created, "type": kind, "severity": ALERT_SEVERITY[kind],
+                 "message": f"{name} {ALERT_MESSAGES[kind]}",
+                 "animalId": animal_id, "farmId": farm_id, "animalName": name,
+                 "isRead": False, "isResolved": False,
+                 "createdAt": datetime.now(timezone.utc).isoformat(), "resolvedAt": None}
+        if self.delay:
+            asyncio.get_running_loop().call_later(self.delay, self.alerts.__setitem__, alert["id"], alert)
+        else:
+            self.alerts[alert["id"]] = alert
+
+    def listed(self, is_resolved=None) -> List[dict]:
+        alerts = [a for a in self.alerts.values() if is_resolved is None or a["isResolved"] == is_resolved]
+        return sorted(alerts, key=lambda a: a["createdAt"], reverse=True)
+
+    async def list_alerts(self, request: web.Request) -> web.Response:
+        value = request.query.get("isResolved")
+        return web.json_response(self.listed(None if value is None else value.lower() == "true"))
+
+    async def farm_alerts(self, request: web.Request) -> web.Response:
+        farm_id = int(request.match_info["farm_id"])
+        return web.json_response([a for a in self.listed(False) if a["farmId"] == farm_id])
+
+    async def resolve(self, request: web.Request) -> web.Response:
+        alert = self.alerts.get(int(request.match_info["alert_id"]))
+        if alert is not None and not alert["isResolved"]:
+            alert["isResolved"] = True
+            alert["resolvedAt"] = datetime.now(timezone.utc).isoformat()
+            self.open.pop((alert["animalId"], alert["type"]), None)
+        return web.Response(status=204)
+
+
+class StubTrackingServer:
+    def __init__(self, delay_ms: float = 0.0, error_rate: float = 0.0, hub_farms: int = 1,
+                 alert_delay_ms: float = 0.0, boundary=None, item_error_rate: float = 0.0):
+        self.delay = delay_ms / 1000
+        self.error_rate = error_rate
+        self.item_error_rate = item_error_rate
+        self.hub = StubTrackingHub(hub_farms)
+        self.alert_rules = StubAlertRules(alert_delay_ms, boundary)
+        self.requests = 0
+        self.readings = 0
+        self.errors = 0
+        self.item_errors = 0
+
+    async def _accept(self, readings: list, batch: bool = False) -> web.Response:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"success": False, "message": "Simulated failure"}, status=500)
+        self.requests += 1
+        failed_items = []
+        for index, reading in enumerate(readings):
+            if batch and self.item_error_rate and random.random() < self.item_error_rate:
+                failed_items.append({"index": index, "deviceId": reading.get("deviceId"),
+                                     "error": "Simulated item failure"})
+                continue
+            self.readings += 1
+            self.alert_rules.check(*self.hub.animal(reading["deviceId"]), reading)
+            self.hub.publish(reading)
+        self.item_errors += len(failed_items)
+        result = {"success": not failed_items, "processed": len(readings) - len(failed_items),
+                  "failed": len(failed_items), "failedItems": failed_items}
+        if not failed_items:
+            return web.json_response(result)
+        # Como el API: si no se guardo ninguna lectura el lote responde 500
+        return web.json_response(result, status=MULTI_STATUS if result["processed"] else 500)
+
+    async def tracker_data(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        if not data.get("deviceId"):
+            return web.json_response({"success": False, "message": "DeviceId is required"}, status=400)
+        return await self._accept([data])
+
+    async def tracker_data_batch(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        if not isinstance(data, list) or not data:
+            return web.json_response({"success": False, "message": "Expected a non-empty array"}, status=400)
+        if len(data) > MAX_BATCH_SIZE:
+            return web.json_response({"success": False, "maxBatchSize": MAX_BATCH_SIZE,
+                                      "message": f"Batch has {len(data)} readings, the maximum is {MAX_BATCH_SIZE}"},
+                                     status=413)
+        # Como la validacion de modelo del API: un deviceId faltante rechaza el lote entero
+        if not all(isinstance(reading, dict) and reading.get("deviceId") for reading in data):
+            return web.json_response({"success": False, "message": "DeviceId is required"}, status=400)
+        return await self._accept(data, batch=True)
+
+    async def trackers(self, request: web.Request) -> web.Response:
+        return web.json_response([{"id": animal_id, "deviceId": device_id, "batteryLevel": 100, "isActive": True,
+                                   "animalId": animal_id, "animalName": f"Animal {animal_id}"}
+                                  for device_id, animal_id in self.hub.animal_ids.items()])
+
+    async def report(self, every: float):
+        last_requests = last_readings = last_deliveries = 0
+        last_time = time.monotonic()
+        while True:
+            await asyncio.sleep(every)
+            now = time.monotonic()
+            elapsed = now - last_time
+            requests = self.requests - last_requests
+            readings = self.readings - last_readings
+            deliveries = self.hub.deliveries - last_deliveries
+            if requests or self.hub.connections:
+                errors = f" | errores simulados: {self.errors}" if self.errors else ""
+                if self.item_errors:
+                    errors += f" | lecturas fallidas simuladas: {self.item_errors}"
+                hub = (f" | hub: {self.hub.connections} conexiones, {deliveries / elapsed:,.0f} entregas/s"
+                       if self.hub.connections else "")
+                alerts = f" | alertas: {self.alert_rules.created}" if self.alert_rules.created else ""
+                print(f"{requests / elapsed:,.0f} requests/s | {readings / elapsed:,.0f} lecturas/s | "
+                      f"total lecturas: {self.readings}{errors}{hub}{alerts}")
+            last_requests, last_readings, last_time = self.requests, self.readings, now
+            last_deliveries = self.hub.deliveries
+
+    def create_app(self, report_every: float = 5.0) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post(TRACKER_DATA_PATH, self.tracker_data)
+        app.router.add_post(TRACKER_DATA_BATCH_PATH, self.tracker_data_batch)
+        app.router.add_post(f"{HUB_PATH}/negotiate", self.hub.negotiate)
+        app.router.add_get(HUB_PATH, self.hub.websocket)
+        app.router.add_get(ALERTS_PATH, self.alert_rules.list_alerts)
+        app.router.add_get(f"{ALERTS_PATH}/farm/{{farm_id}}", self.alert_rules.farm_alerts)
+        app.router.add_put(f"{ALERTS_PATH}/{{alert_id}}/resolve", self.alert_rules.resolve)
+        app.router.add_get(TRACKERS_PATH, self.trackers)
+
+        async def start_reporter(app):
+            app["reporter"] = asyncio.ensure_future(self.report(report_every))
+
+        async def stop_reporter(app):
+            app["reporter"].cancel()
+
+        app.on_startup.append(start_reporter)
+        app.on_cleanup.append(stop_reporter)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local de ingesta GPS para pruebas")
+    parser.add_argument("--port", type=int, default=5192)
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Demora artificial por request")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraccion de requests que responden 500 (0-1)")
+    parser.add_argument("--item-error-rate", type=float, default=0.0,
+                        help="Fraccion de lecturas de cada lote que no se guardan (responde 207, 0-1)")
+    parser.add_argument("--hub-farms", type=int, default=1,
+                        help="Granjas entre las que se reparten los animales del hub local")
+    parser.add_argument("--alert-delay-ms", type=float, default=0.0,
+                        help="Demora entre la lectura y la alerta visible en /api/Alerts")
+    parser.add_argument("--boundary", default=None,
+                        help="Limite de la granja para OutOfBounds: GeoJSON, db:<farmId> o api:<farmId> "
+                             "(sin limite no hay OutOfBounds, como una granja sin FarmBoundaries)")
+    parser.add_argument("--api", default=DEFAULT_API_BASE_URL, help="API para --boundary api:<farmId>")
+    parser.add_argument("--report-every", type=float, default=5.0, help="Segundos entre reportes")
+    args = parser.parse_args()
+
+    boundary = None
+    if args.boundary:
+        from pasture_geofence import load_geofence
+        boundary = load_geofence(args.boundary, args.api, farm_boundary=True)
+    server = StubTrackingServer(args.delay_ms, args.error_rate, args.hub_farms, args.alert_delay_ms,
+                                boundary=boundary, item_error_rate=args.item_error_rate)
+    print(f"Servidor stub escuchando en http://localhost:{args.port}")
+    web.run_app(server.create_app(args.report_every), port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
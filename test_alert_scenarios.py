@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reglas de AlertService en AlertRuleModel y emparejado de alertas con episodios
+    python -m pytest -q test_alert_scenarios.py
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+from alert_scenarios import AlertRuleModel, AlertWatcher, Episode, ScenarioInjector
+from pasture_geofence import Geofence, Paddock
+
+START = 1_700_000_000.0
+
+
+def reading(seconds, lat=-33.0, lng=-58.5, activity=50):
+    timestamp = datetime.fromtimestamp(START + seconds, timezone.utc).isoformat()
+    return {"deviceId": "COW_01", "timestamp": timestamp, "latitude": lat, "longitude": lng,
+            "activityLevel": activity}
+
+
+def square(lat, lng, half):
+    ring = np.array([(lat - half, lng - half), (lat - half, lng + half), (lat + half, lng + half),
+                     (lat + half, lng - half), (lat - half, lng - half)])
+    return Geofence([Paddock("Granja", [ring])])
+
+
+def test_out_of_bounds_only_outside_the_boundary():
+    rules = AlertRuleModel(square(-33.0, -58.5, 0.01))
+    assert "OutOfBounds" not in rules.check("a", reading(0))
+    assert "OutOfBounds" in rules.check("a", reading(60, lat=-32.95))
+    assert "OutOfBounds" not in AlertRuleModel().check("a", reading(0, lat=-32.95))
+
+
+def test_immobility_needs_every_reading_of_the_last_two_hours():
+    rules = AlertRuleModel()
+    first = None
+    for i in range(400):
+        # 100 lecturas moviendose y despues quieta, una por minuto
+        lat = -33.0 + (0.001 * i if i < 100 else 0.1)
+        if "Immobility" in rules.check("a", reading(i * 60, lat=lat)) and first is None:
+            first = i
+    # La ventana de 2 horas tiene que quedar sin ninguna lectura en movimiento
+    assert first == 100 + 120
+
+
+def test_immobility_needs_twenty_readings():
+    rules = AlertRuleModel()
+    # Una lectura cada 10 minutos: en 2 horas nunca hay 20
+    assert not any("Immobility" in rules.check("a", reading(i * 600)) for i in range(50))
+
+
+def test_activity_against_the_daily_average():
+    rules = AlertRuleModel()
+    # Sin promedio todavia (primera lectura en 0) no hay regla de actividad
+    assert rules.check("a", reading(0, activity=0)) == []
+    rules = AlertRuleModel()
+    # Moviendose, para que Immobility no se cumpla
+    for i in range(30):
+        assert rules.check("a", reading(i * 60, lat=-33.0 + 0.001 * i, activity=30)) == []
+    assert rules.check("a", reading(1800, lat=-32.9, activity=0)) == ["LowActivity"]
+    assert rules.check("a", reading(1860, lat=-32.8, activity=90)) == ["HighActivity"]
+    # 19 es menor que 20 pero no que el 30% del promedio (~31 -> ~9)
+    assert rules.check("a", reading(1920, lat=-32.7, activity=19)) == []
+
+
+def test_old_activity_leaves_the_average():
+    rules = AlertRuleModel()
+    for i in range(10):
+        rules.check("a", reading(i * 60, activity=100))
+    # Un dia despues el promedio es solo de la lectura nueva: 100 ya no es el doble
+    assert rules.check("a", reading(2 * 86400, activity=100)) == []
+
+
+def injector_with(kind, length=3):
+    injector = ScenarioInjector(1.0, [kind], onset=1, seed=1, interval=60.0)
+    injector.episodes = [Episode("COW_01", kind, start=2, length=length)]
+    injector.by_device = {"COW_01": injector.episodes[0]}
+    return injector
+
+
+def test_triggered_at_is_the_first_altered_reading():
+    injector = injector_with("low_activity")
+    injector.apply([reading(0)])
+    episode = injector.episodes[0]
+    assert episode.triggered_at is None and episode.condition_at is None
+    injector.apply([reading(60)])
+    assert episode.triggered_at is not None
+    assert episode.condition_at == episode.triggered_at
+    assert not episode.preempted
+
+
+def test_condition_met_before_the_episode_is_preempted():
+    injector = injector_with("low_activity")
+    injector.apply([reading(0, activity=50)])
+    # Iteracion 2 es la del episodio: antes, el animal ya cumple la condicion por su cuenta
+    injector.episodes[0].start = 3
+    injector.apply([reading(60, activity=0)])
+    assert injector.episodes[0].preempted
+
+
+def watcher_for(injector):
+    watcher = AlertWatcher("http://stub", injector)
+    watcher.device_of_animal = {7: "COW_01"}
+    watcher.start = START
+    return watcher
+
+
+def alert(alert_id, kind="LowActivity", created=START):
+    return {"id": alert_id, "type": kind, "animalId": 7,
+            "createdAt": datetime.fromtimestamp(created, timezone.utc).isoformat()}
+
+
+def test_alert_before_the_episode_starts_does_not_mask_it():
+    injector = injector_with("low_activity")
+    watcher = watcher_for(injector)
+    watcher._match(alert(1), START)
+    episode = injector.episodes[0]
+    assert watcher.unmatched == {"LowActivity": 1}
+    assert not episode.masked
+
+    injector.apply([reading(0)])
+    injector.apply([reading(60)])
+    watcher._match(alert(2), START + 61)
+    assert episode.alert_id == 2
+
+
+def test_only_recent_baseline_alerts_mask():
+    injector = injector_with("low_activity")
+    watcher = watcher_for(injector)
+    watcher._mask(alert(1, created=START - 2 * 86400))
+    assert not injector.episodes[0].masked
+    watcher._mask(alert(2, created=START - 3600))
+    assert injector.episodes[0].masked
+
+
+def test_alert_of_another_type_is_not_matched():
+    injector = injector_with("low_activity")
+    injector.apply([reading(0)])
+    injector.apply([reading(60)])
+    watcher = watcher_for(injector)
+    watcher._match(alert(1, kind="HighActivity"), START + 61)
+    assert injector.episodes[0].seen_at is None
+    assert watcher.unmatched == {"HighActivity": 1}
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Paridad del motor vectorizado contra el camino por vaca de MultiCowGPSEmulator
+    python -m pytest -q test_gps_fleet_engine.py
+"""
+
+import pytest
+
+from gps_fleet_engine import check_parity
+
+
+@pytest.mark.parametrize("seed", [1, 7, 2024])
+def test_fleet_matches_per_cow_path(seed):
+    # Mismas tiradas en los dos caminos: las posiciones tienen que coincidir exactamente
+    assert check_parity(count=200, ticks=30, seed=seed) == 0.0
+
+
+def test_parity_covers_more_cows_than_the_emulator():
+    # Con mas vacas que las 10 del emulador se repiten copias independientes
+    assert check_parity(count=37, ticks=10, seed=3) == 0.0
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Respuestas del endpoint batch en BatchingSender: que lecturas cuentan como fallidas y van al outbox
+    python -m pytest -q test_gps_transport.py
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from gps_transport import MULTI_STATUS, BatchingSender, SenderResponse
+
+
+class FakeBatchingSender(BatchingSender):
+    """Responde cada lote con `respond(payloads)` sin red"""
+
+    def __init__(self, respond, batch_size=4):
+        super().__init__("http://stub", batch_size=batch_size, max_delay=0.01)
+        self.respond = respond
+        self.outbox = []
+
+    async def _post_batch(self, payloads):
+        self.batches += 1
+        return self.respond(payloads)
+
+
+def readings(count):
+    return [{"deviceId": f"COW_{i:02d}", "latitude": -31.0, "longitude": -60.0} for i in range(count)]
+
+
+def multi_status(*indexes):
+    items = [{"index": index, "deviceId": f"COW_{index:02d}", "error": "db"} for index in indexes]
+    return SenderResponse(MULTI_STATUS, json.dumps({"failedItems": items}), 0.01)
+
+
+def send_each(sender, payloads):
+    async def run():
+        return await asyncio.gather(*(sender.send(payload) for payload in payloads))
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("path", ["send", "send_many"])
+def test_multi_status_outboxes_only_failed_items(path):
+    sender = FakeBatchingSender(lambda payloads: multi_status(1, 3))
+    payloads = readings(4)
+    if path == "send":
+        assert send_each(sender, payloads) == [True, False, True, False]
+    else:
+        assert asyncio.run(sender.send_many(payloads)) == 2
+    assert sender.outbox == [payloads[1], payloads[3]]
+
+
+@pytest.mark.parametrize("body", ["", "not json", '{"success": false}', '{"failedItems": [{"id": 1}]}'])
+@pytest.mark.parametrize("path", ["send", "send_many"])
+def test_unreadable_multi_status_counts_the_whole_batch_as_failed(path, body):
+    # Sin failedItems legibles no se sabe que se guardo: los dos caminos reintentan todo el lote
+    sender = FakeBatchingSender(lambda payloads: SenderResponse(MULTI_STATUS, body, 0.01))
+    payloads = readings(4)
+    if path == "send":
+        assert send_each(sender, payloads) == [False] * 4
+    else:
+        assert asyncio.run(sender.send_many(payloads)) == 0
+    assert sender.outbox == payloads
+    assert sender.failed == 4
+
+
+@pytest.mark.parametrize("status, outboxed", [(500, True), (400, False), (413, False)])
+def test_whole_batch_status(status, outboxed):
+    sender = FakeBatchingSender(lambda payloads: SenderResponse(status, "", 0.01))
+    payloads = readings(4)
+    assert asyncio.run(sender.send_many(payloads)) == 0
+    assert sender.outbox == (payloads if outboxed else [])
+
+
+def test_batch_size_is_capped():
+    assert FakeBatchingSender(lambda payloads: None, batch_size=50_000).batch_size == 1000
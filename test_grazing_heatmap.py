@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Actualizaciones incrementales de grazing_heatmap: journal y filas que se hacen visibles tarde
+    python -m pytest -q test_grazing_heatmap.py
+"""
+
+import os
+
+import numpy as np
+
+import grazing_heatmap as heatmap
+from grazing_heatmap import JOURNAL_FILE, GridMeta, HeatmapStore, add_new_ids
+from trajectory_analytics import Pass
+
+BOUNDS = (-33.02, -33.00, -58.53, -58.51)
+
+
+def readings(ids, seed=1):
+    rng = np.random.default_rng(seed)
+    ids = np.asarray(ids, dtype=np.int64)
+    return Pass(ids, 1_700_000_000_000_000 + ids * 1_000_000,
+                rng.uniform(BOUNDS[0], BOUNDS[1], len(ids)), rng.uniform(BOUNDS[2], BOUNDS[3], len(ids)))
+
+
+def subset(data, keep):
+    return Pass(data.animal[keep], data.timestamp_us[keep], data.lat[keep], data.lng[keep])
+
+
+def test_replayed_journal_does_not_count_twice(tmp_path, monkeypatch):
+    data = readings(range(1, 501))
+    full = HeatmapStore.create(str(tmp_path / "full"), GridMeta.for_bounds(*BOUNDS))
+    full.begin()
+    full.add(data)
+    full.commit(500)
+
+    # Corte despues de escribir el journal y antes de aplicarlo
+    store = HeatmapStore.create(str(tmp_path / "cut"), GridMeta.for_bounds(*BOUNDS))
+    store.begin()
+    store.add(data)
+    with monkeypatch.context() as patch:
+        patch.setattr(HeatmapStore, "_replay_journal", lambda self: None)
+        store.commit(500)
+    assert os.path.exists(tmp_path / "cut" / JOURNAL_FILE)
+
+    for _ in range(2):
+        reopened = HeatmapStore.open(str(tmp_path / "cut"))
+        assert not os.path.exists(tmp_path / "cut" / JOURNAL_FILE)
+        assert reopened.meta.watermark == 500
+        assert reopened.meta.readings == 500
+        assert np.array_equal(np.asarray(reopened.grid), np.asarray(full.grid))
+
+
+def test_late_rows_below_the_watermark_are_counted_once(tmp_path):
+    data = readings(range(1, 1001))
+    late = np.isin(data.animal, [400, 401, 950])
+
+    store = HeatmapStore.create(str(tmp_path / "a"), GridMeta.for_bounds(*BOUNDS))
+    store.begin()
+    # Primer update: MAX("Id") = 1000 pero tres transacciones todavia no terminaron
+    add_new_ids(store, subset(data, ~late), 1000)
+    store.commit(1000)
+
+    store = HeatmapStore.open(str(tmp_path / "a"))
+    store.begin()
+    # Segundo update: el margen bajo la marca de agua se vuelve a leer entero
+    add_new_ids(store, data, 1000)
+    store.commit(1000)
+
+    full = HeatmapStore.create(str(tmp_path / "b"), GridMeta.for_bounds(*BOUNDS))
+    full.begin()
+    full.add(data)
+    full.commit(1000)
+    assert store.meta.readings == 1000
+    assert np.array_equal(np.asarray(store.grid), np.asarray(full.grid))
+
+
+def test_recent_ids_keep_only_the_margin(tmp_path, monkeypatch):
+    monkeypatch.setattr(heatmap, "LATE_ID_MARGIN", 100)
+    store = HeatmapStore.create(str(tmp_path / "a"), GridMeta.for_bounds(*BOUNDS))
+    store.begin()
+    add_new_ids(store, readings(range(1, 1001)), 1000)
+    store.commit(1000)
+    assert HeatmapStore.open(str(tmp_path / "a")).recent_ids.tolist() == list(range(901, 1001))
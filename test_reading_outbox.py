@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Segmentos del outbox: solo se listan los cerrados y se leen en orden de timestamp
+    python -m pytest -q test_reading_outbox.py
+"""
+
+from reading_outbox import ReadingOutbox
+
+
+def payload(device, second):
+    return {"deviceId": device, "timestamp": f"2026-01-01T00:00:{second:02d}+00:00"}
+
+
+def test_active_segment_is_never_listed(tmp_path):
+    outbox = ReadingOutbox(str(tmp_path))
+    outbox.append(payload("COW_01", 1))
+    assert outbox.closed_segments() == []
+
+    outbox.rotate(force=True)
+    closed = outbox.closed_segments()
+    assert len(closed) == 1
+    # Un append abre el segmento siguiente: el listado no cambia hasta rotarlo
+    outbox.append(payload("COW_02", 2))
+    assert outbox.closed_segments() == closed
+    outbox.close()
+    assert len(outbox.closed_segments()) == 2
+
+
+def test_segment_is_read_in_timestamp_order(tmp_path):
+    outbox = ReadingOutbox(str(tmp_path))
+    for second in (30, 10, 20):
+        outbox.append(payload("COW_01", second))
+    outbox.close()
+    [path] = outbox.closed_segments()
+    assert [p["timestamp"][-8:-6] for _, p in ReadingOutbox.read_segment(path)] == ["10", "20", "30"]
+
+
+def test_truncated_record_is_ignored(tmp_path):
+    outbox = ReadingOutbox(str(tmp_path))
+    outbox.append(payload("COW_01", 1))
+    outbox.append(payload("COW_01", 2))
+    outbox.close()
+    [path] = outbox.closed_segments()
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 3)
+    assert [p["timestamp"] for _, p in ReadingOutbox.read_segment(path)] == [payload("COW_01", 1)["timestamp"]]
+
+
+def test_reopened_outbox_continues_the_numbering(tmp_path):
+    outbox = ReadingOutbox(str(tmp_path))
+    outbox.append(payload("COW_01", 1))
+    outbox.close()
+    reopened = ReadingOutbox(str(tmp_path))
+    reopened.append(payload("COW_01", 2))
+    assert reopened.closed_segments() == outbox.closed_segments()
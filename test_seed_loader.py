@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tags por granja en seed_loader (sin base: la conexion solo registra las sentencias)
+    python -m pytest -q test_seed_loader.py
+"""
+
+import pytest
+
+from seed_loader import RESOLVE_ANIMALS, SeedAnimal, SeedError, load_seed
+
+
+class RecordingCursor:
+    rowcount = 0
+
+    def __init__(self, statements):
+        self.statements = statements
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.statements.append(sql)
+
+    def copy_expert(self, sql, buffer):
+        self.statements.append(buffer.getvalue())
+
+    def fetchall(self):
+        return []
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return RecordingCursor(self.statements)
+
+
+def animal(tag, farm_id=None, farm_name=None):
+    return SeedAnimal(f"Vaca {tag}", tag, "Female", "Angus", "2020-01-01", 400.0,
+                      farm_id=farm_id, farm_name=farm_name)
+
+
+def test_same_tag_in_two_farms_is_loaded():
+    conn = RecordingConnection()
+    load_seed(conn, animals=[animal("ER001", farm_id=7), animal("ER001", farm_name="Granja Norte")],
+              update_existing=True)
+    copied = [line.split(",") for s in conn.statements if "ER001" in s for line in s.splitlines()]
+    assert [(row[1], row[7], row[8]) for row in copied] == [("ER001", "7", r"\N"), ("ER001", r"\N", "Granja Norte")]
+    assert RESOLVE_ANIMALS in conn.statements
+
+
+def test_same_tag_in_one_farm_is_rejected():
+    with pytest.raises(SeedError, match="ER001"):
+        load_seed(None, animals=[animal("ER001", farm_id=7), animal("ER001", farm_id=7)])
+
+
+def test_existing_animals_are_matched_within_their_farm():
+    # Un animal con el mismo tag en otra granja no es "el mismo animal"
+    assert 'a."FarmId" = r.resolved_farm_id AND a."Tag" = r.tag' in RESOLVE_ANIMALS
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+VirtualClock sin esperas (speed=0): las tareas despiertan en orden de vencimiento
+    python -m pytest -q test_sim_clock.py
+"""
+
+import asyncio
+
+from sim_clock import VirtualClock
+
+
+async def sleepers(clock, plan):
+    log = []
+
+    async def sleeper(name, seconds, times):
+        for _ in range(times):
+            await clock.sleep_async(seconds)
+            log.append((name, clock.elapsed()))
+
+    await asyncio.gather(*(sleeper(*item) for item in plan))
+    return log
+
+
+def test_concurrent_sleepers_wake_in_deadline_order():
+    clock = VirtualClock(speed=0)
+    log = asyncio.run(sleepers(clock, [("a", 1, 5), ("b", 2.5, 2), ("c", 10, 1)]))
+    assert [t for _, t in log] == sorted(t for _, t in log)
+    assert log == [("a", 1.0), ("a", 2.0), ("b", 2.5), ("a", 3.0), ("a", 4.0), ("b", 5.0), ("a", 5.0),
+                   ("c", 10.0)]
+    # El reloj avanza hasta el ultimo vencimiento, no la suma de las esperas
+    assert clock.elapsed() == 10.0
+
+
+def test_cancelled_sleeper_does_not_move_the_clock():
+    clock = VirtualClock(speed=0)
+
+    async def main():
+        task = asyncio.ensure_future(clock.sleep_async(100))
+        await asyncio.sleep(0)
+        task.cancel()
+        await clock.sleep_async(1)
+
+    asyncio.run(main())
+    assert clock.elapsed() == 1.0
+
+
+def test_clock_survives_a_new_event_loop():
+    clock = VirtualClock(speed=0)
+    asyncio.run(sleepers(clock, [("a", 2, 1)]))
+    asyncio.run(sleepers(clock, [("a", 3, 1)]))
+    assert clock.elapsed() == 5.0
+
+
+def test_blocking_sleep_adds_simulated_time():
+    clock = VirtualClock(speed=0)
+    clock.sleep(5)
+    clock.sleep(-1)
+    assert clock.elapsed() == 5.0
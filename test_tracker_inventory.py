@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tags por granja en InventorySnapshot y en el plan de bulk_provision_trackers
+    python -m pytest -q test_tracker_inventory.py
+"""
+
+from bulk_provision_trackers import ManifestRow, build_plan
+from tracker_inventory import InventorySnapshot
+
+
+def inventory():
+    animals = [{"id": 1, "tag": "ER001", "farmId": 7}, {"id": 2, "tag": "ER001", "farmId": 8},
+               {"id": 3, "tag": "GC001", "farmId": 8, "trackerId": 10}]
+    return InventorySnapshot(animals, [{"id": 10, "deviceId": "COW_NORTH_FARM_01"}])
+
+
+def test_tag_is_resolved_within_its_farm():
+    snapshot = inventory()
+    assert snapshot.animal_by_tag("ER001", 7)["id"] == 1
+    assert snapshot.animal_by_tag("ER001", 8)["id"] == 2
+    assert [a["id"] for a in snapshot.animals_by_tag("ER001")] == [1, 2]
+
+
+def test_ambiguous_tag_without_farm_is_not_resolved():
+    snapshot = inventory()
+    assert snapshot.animal_by_tag("ER001") is None
+    assert snapshot.animal_by_tag("GC001")["id"] == 3
+
+
+def test_farm_animals_by_prefix():
+    snapshot = inventory()
+    assert [a["id"] for a in snapshot.farm_animals(8, "ER")] == [2]
+    assert snapshot.farm_animals(99, "ER") == []
+
+
+def test_manifest_rows_with_ambiguous_tags_need_a_farm():
+    plan = build_plan([ManifestRow("COW_A", "ER001"), ManifestRow("COW_B", "ER001", farm_id=8),
+                       ManifestRow("COW_C", "ER001", farm_id=8)], inventory())
+    assert [task.animal["id"] for task in plan.tasks] == [2]
+    reasons = [reason for _, reason in plan.rejected]
+    assert any("indicar farmId" in reason for reason in reasons)
+    assert "animal repetido en el manifiesto" in reasons
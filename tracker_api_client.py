@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cliente HTTP compartido para los scripts de administracion (Animals/Trackers/Farms)
+Una sola requests.Session keep-alive con pool de conexiones, reintentos con
+backoff y timeout por defecto, en lugar de una conexion TCP nueva por llamada.
+
+Los scripts ya tienen el animal completo en la lista de GET /Animals, asi que
+update_animal() arma el body del PUT desde ese dict sin volver a pedirlo.
+"""
+
+from typing import Any, Dict, List, Optional, TypedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_API_BASE_URL = "http://localhost:5192/api"
+DEFAULT_TRACKER_MODEL = "GPS Tracker v1.0"
+
+# Campos que acepta PUT /Animals/{id}
+ANIMAL_UPDATE_FIELDS = ("name", "tag", "birthDate", "gender", "breed",
+                        "weight", "status", "farmId", "trackerId")
+
+
+class Animal(TypedDict, total=False):
+    id: int
+    name: str
+    tag: str
+    birthDate: str
+    gender: str
+    breed: str
+    weight: float
+    status: str
+    farmId: int
+    trackerId: Optional[int]
+
+
+class Tracker(TypedDict, total=False):
+    id: int
+    deviceId: str
+    model: str
+    batteryLevel: int
+    isActive: bool
+
+
+class Farm(TypedDict, total=False):
+    id: int
+    name: str
+
+
+class TrackerApiClient:
+    """Cliente del API con una Session keep-alive compartida por todas las llamadas"""
+
+    def __init__(self, base_url: str = DEFAULT_API_BASE_URL, timeout: float = 10.0,
+                 retries: int = 3, backoff: float = 0.3, pool_size: int = 10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+        # Los errores de conexion se reintentan siempre (el request no llego a salir);
+        # los 502/503/504 solo en metodos idempotentes, nunca en POST
+        retry = Retry(total=retries, backoff_factor=backoff,
+                      status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET", "PUT", "DELETE", "HEAD"}),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Hace la llamada y levanta requests.HTTPError si el status no es 2xx"""
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.request(method, f"{self.base_url}/{path.lstrip('/')}", **kwargs)
+        response.raise_for_status()
+        return response
+
+    def _json(self, method: str, path: str, **kwargs) -> Any:
+        response = self.request(method, path, **kwargs)
+        return response.json() if response.content else None
+
+    # --- Animals ---
+
+    def get_animals(self, farm_id: Optional[int] = None) -> List[Animal]:
+        """Todos los animales, opcionalmente filtrados por granja"""
+        animals = self._json("GET", "Animals")
+        if farm_id is not None:
+            animals = [a for a in animals if a["farmId"] == farm_id]
+        return animals
+
+    def get_farm_animals(self, farm_id: int) -> List[Animal]:
+        """Animales de una granja via /farms/{id}/animals"""
+        return self._json("GET", f"farms/{farm_id}/animals")
+
+    def get_animal(self, animal_id: int) -> Animal:
+        return self._json("GET", f"Animals/{animal_id}")
+
+    def create_animal(self, animal: Animal) -> Animal:
+        return self._json("POST", "Animals", json=animal)
+
+    def update_animal(self, animal: Animal, **changes) -> None:
+        """PUT /Animals/{id} desde el dict ya obtenido, con `changes` aplicados
+
+        Si el PUT sale bien los cambios tambien quedan en `animal`, asi el dict
+        local sigue reflejando el estado del API.
+        """
+        body = {field: animal.get(field) for field in ANIMAL_UPDATE_FIELDS}
+        body.update(changes)
+        self.request("PUT", f"Animals/{animal['id']}", json=body)
+        animal.update(changes)
+
+    def set_animal_tracker(self, animal: Animal, tracker_id: Optional[int]) -> None:
+        """Asocia (o libera con None) el tracker de un animal"""
+        self.update_animal(animal, trackerId=tracker_id)
+
+    # --- Trackers ---
+
+    def get_trackers(self) -> List[Tracker]:
+        return self._json("GET", "Trackers")
+
+    def get_trackers_by_device_id(self) -> Dict[str, Tracker]:
+        """Indice deviceId -> tracker con una sola consulta"""
+        return {t["deviceId"]: t for t in self.get_trackers()}
+
+    def create_tracker(self, device_id: str, model: str = DEFAULT_TRACKER_MODEL,
+                       battery_level: int = 100, is_active: bool = True) -> Tracker:
+        return self._json("POST", "Trackers", json={
+            "deviceId": device_id,
+            "model": model,
+            "batteryLevel": battery_level,
+            "isActive": is_active
+        })
+
+    # --- Farms ---
+
+    def get_farms(self) -> List[Farm]:
+        return self._json("GET", "Farms")
+
+    def get_farm(self, farm_id: int) -> Farm:
+        return self._json("GET", f"Farms/{farm_id}")
+
+    def get_pastures(self, farm_id: int) -> List[Dict[str, Any]]:
+        """Potreros de una granja (areaCoordinates: [{lat, lng}], puede venir vacio)"""
+        return self._json("GET", "Pasture", params={"farmId": farm_id})
+
+    # --- Tracking ---
+
+    def send_tracker_data(self, payload: Dict[str, Any]) -> requests.Response:
+        """POST /tracking/tracker-data (el API crea el tracker si no existe)"""
+        return self.request("POST", "tracking/tracker-data", json=payload)
+
+
+def describe_error(error: Exception) -> str:
+    """Mensaje del error incluyendo el body de la respuesta si el API devolvio uno"""
+    response = getattr(error, "response", None)
+    if response is not None and response.text:
+        return f"{error} - Response: {response.text}"
+    return str(error)
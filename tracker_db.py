@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conexion compartida a PostgreSQL para los scripts que van directo a la base
+La configuracion sale de la misma cadena `ConnectionStrings:DefaultConnection`
+que usa el API, en este orden:
+
+1. variable de entorno `ConnectionStrings__DefaultConnection` (convencion de ASP.NET),
+2. appsettings.{ASPNETCORE_ENVIRONMENT}.json y luego appsettings.json,
+
+y despues las variables PGHOST, PGPORT, PGDATABASE, PGUSER y PGPASSWORD pisan
+campos sueltos. Todas las conexiones salen de un ThreadedConnectionPool chico
+que bloquea (en lugar de fallar) cuando todas estan en uso, asi varios jobs en
+paralelo comparten unas pocas conexiones.
+
+Uso:
+    from tracker_db import connection
+    with connection() as conn:          # commit al salir, rollback si hay excepcion
+        with conn.cursor() as cur:
+            execute_prepared(cur, "animal_by_tag", 'SELECT "Id" FROM "Animals" WHERE "Tag" = $1', (tag,))
+"""
+
+import argparse
+import atexit
+import json
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional, Sequence
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+APPSETTINGS_DIR = os.path.dirname(os.path.abspath(__file__))
+CONNECTION_NAME = "DefaultConnection"
+DEFAULT_MIN_CONNECTIONS = 1
+DEFAULT_MAX_CONNECTIONS = 8
+
+# Claves de una cadena Npgsql -> campo de DbConfig
+NPGSQL_KEYS = {
+    "host": "host", "server": "host",
+    "port": "port",
+    "database": "database", "initial catalog": "database",
+    "username": "user", "user id": "user", "userid": "user", "user": "user",
+    "password": "password", "pwd": "password",
+}
+
+PG_ENV = {"PGHOST": "host", "PGPORT": "port", "PGDATABASE": "database", "PGUSER": "user", "PGPASSWORD": "password"}
+
+
+@dataclass
+class DbConfig:
+    host: str = "localhost"
+    port: int = 5432
+    database: str = "CattleTrackingDB"
+    user: str = "postgres"
+    password: str = ""
+
+    @classmethod
+    def from_connection_string(cls, text: str) -> "DbConfig":
+        """Desde una cadena Npgsql: 'Host=...;Database=...;Username=...;Password=...;Port=...'"""
+        config = cls()
+        for part in text.split(";"):
+            if "=" not in part:
+                continue
+            key, value = part.split("=", 1)
+            field_name = NPGSQL_KEYS.get(key.strip().lower())
+            if field_name is not None:
+                setattr(config, field_name, int(value) if field_name == "port" else value.strip())
+        return config
+
+    @classmethod
+    def load(cls, name: str = CONNECTION_NAME, settings_dir: str = APPSETTINGS_DIR) -> "DbConfig":
+        """Configuracion efectiva segun variables de entorno y appsettings (ver docstring del modulo)"""
+        text = os.environ.get(f"ConnectionStrings__{name}")
+        if text is None:
+            environment = os.environ.get("ASPNETCORE_ENVIRONMENT")
+            candidates = [f"appsettings.{environment}.json"] if environment else []
+            for file_name in candidates + ["appsettings.json"]:
+                text = _connection_string(os.path.join(settings_dir, file_name), name)
+                if text is not None:
+                    break
+        config = cls.from_connection_string(text) if text else cls()
+
+        for variable, field_name in PG_ENV.items():
+            value = os.environ.get(variable)
+            if value:
+                setattr(config, field_name, int(value) if field_name == "port" else value)
+        return config
+
+    def connect_kwargs(self) -> dict:
+        return dict(host=self.host, port=self.port, dbname=self.database, user=self.user, password=self.password)
+
+    def describe(self) -> str:
+        """Destino sin la contrasena (para logs)"""
+        return f"{self.user}@{self.host}:{self.port}/{self.database}"
+
+
+def _connection_string(path: str, name: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            return json.load(f).get("ConnectionStrings", {}).get(name)
+    except (OSError, ValueError):
+        return None
+
+
+def add_db_arguments(parser: argparse.ArgumentParser):
+    """--host/--port/--database/--user/--password opcionales que pisan la configuracion"""
+    group = parser.add_argument_group("base de datos (por defecto la ConnectionString del API)")
+    group.add_argument("--host", default=None)
+    group.add_argument("--port", type=int, default=None)
+    group.add_argument("--database", default=None)
+    group.add_argument("--user", default=None)
+    group.add_argument("--password", default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> DbConfig:
+    config = DbConfig.load()
+    for field_name in ("host", "port", "database", "user", "password"):
+        value = getattr(args, field_name, None)
+        if value is not None:
+            setattr(config, field_name, value)
+    return config
+
+
+class BlockingConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """ThreadedConnectionPool que espera una conexion libre en lugar de lanzar PoolError"""
+
+    def __init__(self, minconn: int, maxconn: int, *args, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        self._slots.acquire()
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._slots.release()
+
+
+# Sentencias preparadas por conexion (PREPARE vive en la sesion del servidor)
+_prepared: "weakref.WeakKeyDictionary[object, set]" = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+_pool: Optional[BlockingConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(config: Optional[DbConfig] = None, minconn: int = DEFAULT_MIN_CONNECTIONS,
+             maxconn: int = DEFAULT_MAX_CONNECTIONS) -> BlockingConnectionPool:
+    """Pool del proceso; se crea en la primera llamada (las siguientes ignoran los parametros)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BlockingConnectionPool(minconn, maxconn, **(config or DbConfig.load()).connect_kwargs())
+        return _pool
+
+
+def configure(config: DbConfig, maxconn: int = DEFAULT_MAX_CONNECTIONS) -> BlockingConnectionPool:
+    """Fija la configuracion del pool (p.ej. desde argumentos de linea de comandos)"""
+    close_pool()
+    return get_pool(config, maxconn=maxconn)
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+
+
+atexit.register(close_pool)
+
+
+@contextmanager
+def connection(pool: Optional[BlockingConnectionPool] = None) -> Iterator[psycopg2.extensions.connection]:
+    """Conexion prestada del pool: commit al salir, rollback si hay excepcion, y se devuelve"""
+    pool = pool or get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+def execute_prepared(cur, name: str, sql: str, params: Sequence = ()):
+    """Ejecuta `sql` (con parametros $1, $2, ...) como sentencia preparada de la conexion
+
+    El PREPARE se hace una sola vez por conexion y nombre; las siguientes llamadas
+    solo envian EXECUTE con los valores, sin re-parsear ni re-planificar.
+    """
+    with _prepared_lock:
+        prepared = _prepared.setdefault(cur.connection, set())
+    if name not in prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        prepared.add(name)
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", tuple(params))
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Muestra la configuracion de base y prueba la conexion")
+    add_db_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args)
+    print(f"Destino: {config.describe()}")
+    try:
+        with connection(configure(config)) as conn, conn.cursor() as cur:
+            cur.execute("SELECT version()")
+            print(cur.fetchone()[0])
+    except psycopg2.Error as e:
+        print(f"ERROR: {e}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
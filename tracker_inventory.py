@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Snapshot en memoria de animales y trackers con indices hash
+Se arma una sola vez (desde el API o directo desde la base) y responde en O(1)
+por id de animal, tag, granja, id de tracker, deviceId y animal que tiene cada
+tracker; los prefijos de tag se buscan con bisect sobre los tags ordenados.
+Los tags solo son unicos dentro de una granja: el indice por tag guarda todos
+los animales con ese tag y el indice (granja, tag) el de cada granja.
+
+Con `cache_path` el snapshot se guarda en disco (JSON) y se reutiliza mientras
+tenga menos de `ttl` segundos, para no re-descargar todo en cada corrida.
+"""
+
+import argparse
+import bisect
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tracker_api_client import DEFAULT_API_BASE_URL, Animal, Tracker, TrackerApiClient
+
+DEFAULT_CACHE_TTL = 300.0
+
+# Columnas de la base con el mismo nombre que usa el JSON del API
+ANIMAL_COLUMNS = ("Id", "Name", "Tag", "BirthDate", "Gender", "Breed", "Weight", "Status", "FarmId", "TrackerId")
+TRACKER_COLUMNS = ("Id", "DeviceId", "Model", "BatteryLevel", "IsActive")
+
+
+def _camel(column: str) -> str:
+    return column[0].lower() + column[1:]
+
+
+def tag_of(animal: Animal) -> str:
+    """Tag del animal ('' si no tiene; en el modelo es nullable)"""
+    return animal.get("tag") or ""
+
+
+class InventorySnapshot:
+    """Animales y trackers con indices por todas las claves que usan los scripts"""
+
+    def __init__(self, animals: Iterable[Animal], trackers: Iterable[Tracker],
+                 fetched_at: Optional[float] = None):
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self.animals: Dict[int, Animal] = {}
+        self.trackers: Dict[int, Tracker] = {}
+        self.by_tag: Dict[str, List[Animal]] = {}
+        self.by_farm_tag: Dict[Tuple[int, str], Animal] = {}
+        self.by_farm: Dict[int, List[Animal]] = {}
+        self.by_device: Dict[str, Tracker] = {}
+        self.holder: Dict[int, Animal] = {}
+        # Indices ordenados para prefijos; se rearman perezosamente tras agregar
+        self._sorted_tags: Optional[List[str]] = None
+        self._sorted_devices: Optional[List[str]] = None
+        self._farm_tags: Optional[Dict[int, List[str]]] = None
+
+        for tracker in trackers:
+            self.add_tracker(tracker)
+        for animal in animals:
+            self.add_animal(animal)
+
+    # --- construccion ---
+
+    @classmethod
+    def from_api(cls, client: TrackerApiClient) -> "InventorySnapshot":
+        return cls(client.get_animals(), client.get_trackers())
+
+    @classmethod
+    def from_db(cls, conn) -> "InventorySnapshot":
+        """Lee Animals y Trackers con una conexion psycopg2"""
+        with conn.cursor() as cur:
+            cur.execute('SELECT {} FROM "Animals"'.format(", ".join(f'"{c}"' for c in ANIMAL_COLUMNS)))
+            animals = [_row(ANIMAL_COLUMNS, row) for row in cur]
+            cur.execute('SELECT {} FROM "Trackers"'.format(", ".join(f'"{c}"' for c in TRACKER_COLUMNS)))
+            trackers = [_row(TRACKER_COLUMNS, row) for row in cur]
+        return cls(animals, trackers)
+
+    @classmethod
+    def load(cls, client: Optional[TrackerApiClient] = None, cache_path: Optional[str] = None,
+             ttl: float = DEFAULT_CACHE_TTL, refresh: bool = False) -> "InventorySnapshot":
+        """Snapshot desde el cache si esta fresco; si no, desde el API (y se guarda)"""
+        if cache_path and not refresh:
+            cached = cls.read_cache(cache_path, ttl)
+            if cached is not None:
+                return cached
+
+        if client is None:
+            with TrackerApiClient() as own_client:
+                snapshot = cls.from_api(own_client)
+        else:
+            snapshot = cls.from_api(client)
+
+        if cache_path:
+            snapshot.save(cache_path)
+        return snapshot
+
+    @classmethod
+    def read_cache(cls, path: str, ttl: float = DEFAULT_CACHE_TTL) -> Optional["InventorySnapshot"]:
+        """Snapshot guardado, o None si no existe, esta corrupto o vencio"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - data.get("fetchedAt", 0) > ttl:
+            return None
+        return cls(data["animals"], data["trackers"], data["fetchedAt"])
+
+    def save(self, path: str):
+        """Escribe el snapshot de forma atomica (archivo temporal + rename)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetchedAt": self.fetched_at,
+                       "animals": list(self.animals.values()),
+                       "trackers": list(self.trackers.values())}, f, default=str)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def invalidate(path: str):
+        """Borra el cache (llamar despues de modificar animales o trackers)"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    # --- indices ---
+
+    def add_animal(self, animal: Animal):
+        self.animals[animal["id"]] = animal
+        tag = tag_of(animal)
+        if tag:
+            self.by_tag.setdefault(tag, []).append(animal)
+            self.by_farm_tag[(animal["farmId"], tag)] = animal
+        self.by_farm.setdefault(animal["farmId"], []).append(animal)
+        if animal.get("trackerId") is not None:
+            self.holder[animal["trackerId"]] = animal
+        self._sorted_tags = None
+        self._farm_tags = None
+
+    def add_tracker(self, tracker: Tracker):
+        self.trackers[tracker["id"]] = tracker
+        self.by_device[tracker["deviceId"]] = tracker
+        self._sorted_devices = None
+
+    def _sort_farms(self) -> Dict[int, List[str]]:
+        if self._farm_tags is None:
+            self._farm_tags = {}
+            for farm_id, animals in self.by_farm.items():
+                animals.sort(key=tag_of)
+                self._farm_tags[farm_id] = [tag_of(a) for a in animals]
+        return self._farm_tags
+
+    def set_tracker(self, animal: Animal, tracker_id: Optional[int]):
+        """Refleja en los indices una asignacion ya aplicada en el API"""
+        old = animal.get("trackerId")
+        if old is not None and self.holder.get(old) is animal:
+            del self.holder[old]
+        animal["trackerId"] = tracker_id
+        if tracker_id is not None:
+            self.holder[tracker_id] = animal
+
+    def assign(self, client: TrackerApiClient, animal: Animal, tracker_id: Optional[int]):
+        """PUT del trackerId (sin GET previo) y actualizacion de los indices"""
+        previous = animal.get("trackerId")
+        client.set_animal_tracker(animal, tracker_id)
+        animal["trackerId"] = previous
+        self.set_tracker(animal, tracker_id)
+
+    # --- consultas ---
+
+    def animal(self, animal_id: int) -> Optional[Animal]:
+        return self.animals.get(animal_id)
+
+    def animals_by_tag(self, tag: str) -> List[Animal]:
+        """Animales con ese tag en todas las granjas"""
+        return list(self.by_tag.get(tag, []))
+
+    def animal_by_tag(self, tag: str, farm_id: Optional[int] = None) -> Optional[Animal]:
+        """Animal con ese tag en la granja; sin granja, solo si el tag no se repite en otra"""
+        if farm_id is not None:
+            return self.by_farm_tag.get((farm_id, tag))
+        animals = self.by_tag.get(tag, [])
+        return animals[0] if len(animals) == 1 else None
+
+    def tracker(self, tracker_id: Optional[int]) -> Optional[Tracker]:
+        return self.trackers.get(tracker_id) if tracker_id is not None else None
+
+    def tracker_by_device(self, device_id: str) -> Optional[Tracker]:
+        return self.by_device.get(device_id)
+
+    def holder_of(self, tracker_id: Optional[int]) -> Optional[Animal]:
+        """Animal que tiene asignado el tracker"""
+        return self.holder.get(tracker_id) if tracker_id is not None else None
+
+    def device_of(self, animal: Animal) -> Optional[str]:
+        """deviceId del tracker asignado al animal"""
+        tracker = self.tracker(animal.get("trackerId"))
+        return tracker["deviceId"] if tracker else None
+
+    def tags_with_prefix(self, prefix: str) -> List[str]:
+        """Tags que empiezan con `prefix`, ordenados (bisect, sin recorrer todos)"""
+        if self._sorted_tags is None:
+            self._sorted_tags = sorted(self.by_tag)
+        return _prefix_slice(self._sorted_tags, self._sorted_tags, prefix)
+
+    def animals_with_prefix(self, prefix: str) -> List[Animal]:
+        return [animal for tag in self.tags_with_prefix(prefix) for animal in self.by_tag[tag]]
+
+    def farm_animals(self, farm_id: int, tag_prefix: str = "") -> List[Animal]:
+        """Animales de la granja ordenados por tag, opcionalmente con un prefijo"""
+        farm_tags = self._sort_farms()
+        animals = self.by_farm.get(farm_id, [])
+        if not tag_prefix:
+            return list(animals)
+        return _prefix_slice(farm_tags.get(farm_id, []), animals, tag_prefix)
+
+    def trackers_with_prefix(self, prefix: str) -> Dict[str, Tracker]:
+        """deviceId -> tracker para los deviceId que empiezan con `prefix`"""
+        if self._sorted_devices is None:
+            self._sorted_devices = sorted(self.by_device)
+        return {d: self.by_device[d] for d in _prefix_slice(self._sorted_devices, self._sorted_devices, prefix)}
+
+
+def _prefix_slice(keys: List[str], values: list, prefix: str) -> list:
+    """values[i] cuyos keys[i] (ordenados) empiezan con `prefix`"""
+    start = bisect.bisect_left(keys, prefix)
+    end = bisect.bisect_left(keys, prefix + "\U0010ffff")
+    return values[start:end]
+
+
+def _value(column: str, value):
+    if value is None:
+        return None
+    if column == "Weight":
+        return float(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _row(columns, row) -> dict:
+    return {_camel(c): _value(c, v) for c, v in zip(columns, row)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Descarga (o lee del cache) el inventario de animales y trackers")
+    parser.add_argument("--api", default=DEFAULT_API_BASE_URL)
+    parser.add_argument("--cache", default="inventory_cache.json")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_CACHE_TTL)
+    parser.add_argument("--refresh", action="store_true", help="Ignorar el cache")
+    args = parser.parse_args()
+
+    with TrackerApiClient(args.api) as client:
+        snapshot = InventorySnapshot.load(client, args.cache, args.ttl, args.refresh)
+
+    print(f"Snapshot de hace {snapshot.age:.0f}s: {len(snapshot.animals)} animales, {len(snapshot.trackers)} trackers")
+    for farm_id in sorted(snapshot.by_farm):
+        animals = snapshot.by_farm[farm_id]
+        with_tracker = sum(1 for a in animals if a.get("trackerId") is not None)
+        print(f"  Granja {farm_id}: {len(animals)} animales, {with_tracker} con tracker")
+    free = sum(1 for tracker_id in snapshot.trackers if tracker_id not in snapshot.holder)
+    print(f"  Trackers sin animal: {free}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reconciliador declarativo de asignaciones animal -> tracker
+En lugar de liberar y reasignar animal por animal, se declara el estado deseado
+(granja + prefijo de tag -> patron de deviceId), se leen /Animals y /Trackers una
+sola vez y se calcula el plan minimo:
+
+1. crear los trackers que faltan (opcional),
+2. fase 1: liberar los trackers que tienen otros animales, o mover directamente
+   al animal que los tiene si su tracker deseado esta libre,
+3. fase 2: asignar el resto.
+
+Dentro de cada fase ninguna operacion depende de otra, asi que se aplican en
+paralelo sobre la misma sesion keep-alive. Los animales que ya estan bien no se tocan.
+
+Patrones: {n} es el numero al final del tag (GPS-ER-007 -> 7) y {i} la posicion
+1-based del animal en la regla, ordenando por tag.
+"""
+
+import argparse
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from tracker_api_client import DEFAULT_API_BASE_URL, Animal, TrackerApiClient, describe_error
+from tracker_inventory import InventorySnapshot
+
+TAG_NUMBER = re.compile(r"(\d+)$")
+
+
+@dataclass
+class AssignmentRule:
+    """Animales de `farm_id` cuyo tag empieza con `tag_prefix` -> deviceId segun `device_pattern`"""
+    farm_id: int
+    tag_prefix: str
+    device_pattern: str
+    # Solo los primeros `limit` animales (ordenados por tag)
+    limit: Optional[int] = None
+    # Crear los trackers del patron que todavia no existen
+    create_missing: bool = False
+    # No tocar animales que ya tienen un tracker que ninguna otra regla reclama
+    keep_assigned: bool = False
+
+    @classmethod
+    def parse(cls, text: str, **options) -> "AssignmentRule":
+        """Regla desde 'FARM:PREFIJO:PATRON' (formato de --rule)"""
+        farm_id, tag_prefix, device_pattern = text.split(":", 2)
+        return cls(int(farm_id), tag_prefix, device_pattern, **options)
+
+    def select(self, inventory: InventorySnapshot) -> List[Animal]:
+        selected = inventory.farm_animals(self.farm_id, self.tag_prefix)
+        return selected[:self.limit] if self.limit is not None else selected
+
+    def device_id(self, animal: Animal, position: int) -> Optional[str]:
+        match = TAG_NUMBER.search(animal.get("tag") or "")
+        if match is None and "{n" in self.device_pattern:
+            return None
+        return self.device_pattern.format(n=int(match.group(1)) if match else 0, i=position)
+
+
+@dataclass
+class Operation:
+    """PUT de trackerId para un animal; device_id None = liberar"""
+    animal: Animal
+    device_id: Optional[str]
+    current_device_id: Optional[str] = None
+
+    def describe(self) -> str:
+        current = self.current_device_id or "-"
+        target = self.device_id or "(liberado)"
+        return f"{self.animal['tag']} (Animal {self.animal['id']}): {current} -> {target}"
+
+
+@dataclass
+class ReconcilePlan:
+    creates: List[str] = field(default_factory=list)
+    phase1: List[Operation] = field(default_factory=list)
+    phase2: List[Operation] = field(default_factory=list)
+    unchanged: int = 0
+    # (tag, motivo) de animales que no se pueden reconciliar
+    skipped: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def operations(self) -> int:
+        return len(self.creates) + len(self.phase1) + len(self.phase2)
+
+    def print(self):
+        print(f"Trackers a crear: {len(self.creates)}")
+        for device_id in self.creates:
+            print(f"  + {device_id}")
+        print(f"Fase 1 (liberar / mover a tracker libre): {len(self.phase1)}")
+        for op in self.phase1:
+            print(f"  {op.describe()}")
+        print(f"Fase 2 (asignar): {len(self.phase2)}")
+        for op in self.phase2:
+            print(f"  {op.describe()}")
+        print(f"Sin cambios: {self.unchanged}")
+        for tag, reason in self.skipped:
+            print(f"  OMITIDO {tag}: {reason}")
+
+
+@dataclass
+class ReconcileResult:
+    created: int = 0
+    assigned: int = 0
+    released: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def build_plan(rules: Sequence[AssignmentRule], inventory: InventorySnapshot) -> ReconcilePlan:
+    """Calcula el plan minimo para llevar las asignaciones al estado deseado"""
+    plan = ReconcilePlan()
+
+    def holder_of_device(device_id: str) -> Optional[Animal]:
+        tracker = inventory.tracker_by_device(device_id)
+        return inventory.holder_of(tracker["id"]) if tracker else None
+
+    # Estado deseado: animal id -> deviceId (cada tracker para un solo animal)
+    desired: Dict[int, str] = {}
+    wanted_by: Dict[str, int] = {}
+    keep_candidates: List[Tuple[Animal, str]] = []
+    creatable = set()
+
+    for rule in rules:
+        for position, animal in enumerate(rule.select(inventory), 1):
+            device_id = rule.device_id(animal, position)
+            if device_id is None:
+                plan.skipped.append((animal["tag"], "el tag no termina en numero"))
+                continue
+            if animal["id"] in desired or device_id in wanted_by:
+                plan.skipped.append((animal["tag"], f"{device_id} ya reclamado por otra regla"))
+                continue
+            if inventory.tracker_by_device(device_id) is None:
+                if not rule.create_missing:
+                    plan.skipped.append((animal["tag"], f"tracker {device_id} no existe"))
+                    continue
+                creatable.add(device_id)
+            desired[animal["id"]] = device_id
+            wanted_by[device_id] = animal["id"]
+            if rule.keep_assigned:
+                keep_candidates.append((animal, device_id))
+
+    # keep_assigned: el animal conserva su tracker actual si nadie mas lo quiere
+    for animal, device_id in keep_candidates:
+        current = inventory.device_of(animal)
+        if current is not None and current != device_id and wanted_by.get(current, animal["id"]) == animal["id"]:
+            del desired[animal["id"]]
+            del wanted_by[device_id]
+            creatable.discard(device_id)
+            wanted_by.setdefault(current, animal["id"])
+
+    plan.creates = sorted(creatable)
+
+    for animal_id, device_id in desired.items():
+        animal = inventory.animal(animal_id)
+        current = inventory.device_of(animal)
+        if current == device_id:
+            plan.unchanged += 1
+            continue
+
+        op = Operation(animal, device_id, current)
+        holder = holder_of_device(device_id)
+        # Si el tracker deseado esta libre el PUT va en la fase 1 (y libera el actual)
+        if holder is None:
+            plan.phase1.append(op)
+        else:
+            plan.phase2.append(op)
+
+    # Quien tiene un tracker reclamado por otro animal y no se mueve en la fase 1 lo libera
+    moved = {op.animal["id"] for op in plan.phase1}
+    for device_id, animal_id in wanted_by.items():
+        holder = holder_of_device(device_id)
+        if holder is None or holder["id"] == animal_id or holder["id"] in moved:
+            continue
+        plan.phase1.append(Operation(holder, None, device_id))
+
+    return plan
+
+
+def apply_plan(client: TrackerApiClient, plan: ReconcilePlan, inventory: InventorySnapshot,
+               workers: int = 8) -> ReconcileResult:
+    """Aplica el plan (creaciones, fase 1 y fase 2, cada una en paralelo) y actualiza el inventario"""
+    result = ReconcileResult()
+    lock = threading.Lock()
+
+    def create(device_id: str):
+        try:
+            tracker = client.create_tracker(device_id)
+        except Exception as e:
+            with lock:
+                result.errors.append(f"crear {device_id}: {describe_error(e)}")
+            return
+        with lock:
+            inventory.add_tracker(tracker)
+            result.created += 1
+
+    def put(op: Operation):
+        tracker_id = None
+        if op.device_id is not None:
+            tracker = inventory.tracker_by_device(op.device_id)
+            if tracker is None:
+                with lock:
+                    result.errors.append(f"{op.describe()}: tracker sin crear")
+                return
+            tracker_id = tracker["id"]
+        try:
+            inventory.assign(client, op.animal, tracker_id)
+        except Exception as e:
+            with lock:
+                result.errors.append(f"{op.describe()}: {describe_error(e)}")
+            return
+        with lock:
+            if tracker_id is None:
+                result.released += 1
+            else:
+                result.assigned += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(create, plan.creates))
+        list(pool.map(put, plan.phase1))
+        list(pool.map(put, plan.phase2))
+
+    return result
+
+
+def reconcile(rules: Sequence[AssignmentRule], api_base_url: str = DEFAULT_API_BASE_URL,
+              dry_run: bool = False, workers: int = 8) -> Tuple[ReconcilePlan, ReconcileResult]:
+    """Lee el estado una vez, imprime el plan y lo aplica (salvo dry_run)"""
+    with TrackerApiClient(api_base_url, pool_size=workers) as client:
+        inventory = InventorySnapshot.from_api(client)
+        print(f"Animales: {len(inventory.animals)} - Trackers: {len(inventory.trackers)}")
+
+        plan = build_plan(rules, inventory)
+        plan.print()
+
+        result = ReconcileResult()
+        if dry_run or plan.operations == 0:
+            return plan, result
+
+        result = apply_plan(client, plan, inventory, workers)
+        print(f"\nTrackers creados: {result.created}")
+        print(f"Trackers liberados: {result.released}")
+        print(f"Asignaciones realizadas: {result.assigned}")
+        for error in result.errors:
+            print(f"  ERROR {error}")
+        return plan, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcilia las asignaciones de trackers contra un estado deseado")
+    parser.add_argument("--api", default=DEFAULT_API_BASE_URL)
+    parser.add_argument("--rule", action="append", default=[],
+                        help="FARM:PREFIJO:PATRON, p.ej. '7:GPS-ER-:COW_GPS_ER_{n:02d}' (repetible)")
+    parser.add_argument("--limit", type=int, default=None, help="Maximo de animales por regla")
+    parser.add_argument("--create-missing", action="store_true", help="Crear los trackers que no existen")
+    parser.add_argument("--keep-assigned", action="store_true",
+                        help="No tocar animales que ya tienen un tracker que nadie mas reclama")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar el plan")
+    args = parser.parse_args()
+
+    options = dict(limit=args.limit, create_missing=args.create_missing, keep_assigned=args.keep_assigned)
+    rules = [AssignmentRule.parse(text, **options) for text in args.rule or ["7:GPS-ER-:COW_GPS_ER_{n:02d}"]]
+
+    print("RECONCILIACION DE TRACKERS")
+    print("=" * 60)
+    _, result = reconcile(rules, args.api, args.dry_run, args.workers)
+    if result.errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
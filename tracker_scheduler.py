@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planificador de envios para miles de trackers desde un solo event loop
+Cada tracker tiene su propio intervalo; un heap ordenado por proximo vencimiento
+reemplaza el modelo de un hilo por animal.
+
+- Correccion de deriva: el proximo envio se calcula desde el horario nominal
+  anterior, no desde el momento en que se disparo, asi los retrasos no se acumulan.
+- Jitter: desplazamiento aleatorio alrededor del horario nominal (no acumulativo).
+  Las tiradas salen del generador de cada item (sim_random.device_rng) o del
+  `rng` del planificador, asi una corrida con semilla se repite igual.
+- Si un tracker se atrasa mas de un intervalo completo se saltean los envios perdidos
+  en lugar de dispararlos todos juntos.
+- `clock`/`sleep` se pueden reemplazar por los de sim_clock.VirtualClock para
+  correr en tiempo simulado.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+from sim_random import SHARED_RNG, device_rng
+
+
+def schedule_rng(seed: Optional[int], device_id: str):
+    """Generador del horario de un tracker, aparte del de su trayectoria (el jitter no le corre los numeros)"""
+    return device_rng(seed, f"{device_id}/schedule")
+
+
+class TrackerScheduler:
+    def __init__(self, jitter: float = 0.05, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep, rng=None):
+        """`jitter` es la fraccion del intervalo usada como desplazamiento aleatorio maximo
+
+        `rng` es el generador de los items agregados sin uno propio (por defecto el
+        compartido de las corridas sin semilla).
+        """
+        self.jitter = jitter
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = SHARED_RNG if rng is None else rng
+        # (vencimiento, secuencia, horario nominal, intervalo, item, generador)
+        self._heap: List[tuple] = []
+        self._sequence = itertools.count()
+
+        self.fired = 0
+        self.skipped = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _push(self, nominal: float, interval: float, item: Any, rng):
+        offset = rng.uniform(-self.jitter, self.jitter) * interval
+        heapq.heappush(self._heap, (nominal + offset, next(self._sequence), nominal, interval, item, rng))
+
+    def add(self, item: Any, interval: float, first_delay: Optional[float] = None, rng=None):
+        """Agrega un tracker; por defecto el primer envio cae al azar dentro de su intervalo
+
+        Con `rng` (generador propio del tracker) sus envios no dependen de cuantos
+        trackers comparten el planificador ni del orden en que vencen.
+        """
+        rng = self.rng if rng is None else rng
+        if first_delay is None:
+            first_delay = rng.uniform(0, interval)
+        self._push(self.clock() + first_delay, interval, item, rng)
+
+    def next_due(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[Any]:
+        """Devuelve los items vencidos y los reprograma para su proximo envio"""
+        if now is None:
+            now = self.clock()
+
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_time, _, nominal, interval, item, rng = heapq.heappop(self._heap)
+
+            lateness = now - due_time
+            self.total_lateness += lateness
+            self.max_lateness = max(self.max_lateness, lateness)
+            self.fired += 1
+            due.append(item)
+
+            next_nominal = nominal + interval
+            if next_nominal <= now:
+                missed = int((now - next_nominal) // interval) + 1
+                self.skipped += missed
+                next_nominal += missed * interval
+            self._push(next_nominal, interval, item, rng)
+
+        return due
+
+    @property
+    def average_lateness(self) -> float:
+        return self.total_lateness / self.fired if self.fired else 0.0
+
+    async def run(self, fire: Callable[[Any], None], duration: Optional[float] = None):
+        """Dispara `fire(item)` para cada vencimiento hasta que pase `duration` segundos"""
+        end_time = None if duration is None else self.clock() + duration
+
+        while self._heap:
+            now = self.clock()
+            if end_time is not None and now >= end_time:
+                break
+
+            wake_at = self.next_due()
+            if end_time is not None:
+                wake_at = min(wake_at, end_time)
+            if wake_at > now:
+                await self.sleep(wake_at - now)
+                continue
+
+            for item in self.pop_due(now):
+                fire(item)
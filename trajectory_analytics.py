@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Analitica de trayectorias por animal sobre el historial GPS
+Calcula por animal y por dia la distancia recorrida, el tiempo descansando,
+pastoreando y caminando, y la velocidad maxima, a partir de "LocationHistories"
+(o de una traza grabada con trajectory_trace.py).
+
+Las lecturas se procesan por pasadas: cada pasada trae un rango de animales
+completos (hasta `pass_rows` filas) ordenados por (AnimalId, Timestamp), asi la
+memoria depende del tamaño de la pasada y no de la tabla; con 50M filas son
+unas pocas pasadas de ~30 bytes por fila. Desde la base los datos llegan con
+COPY ... TO STDOUT en formato binario, que se convierte a arrays NumPy sin
+armar una tupla de Python por fila.
+
+Dentro de cada pasada todo es vectorizado: haversine entre lecturas
+consecutivas, clasificacion de cada tramo por velocidad y agregacion por
+(animal, dia) con np.add.reduceat / np.maximum.reduceat sobre los limites de
+grupo (las filas ya vienen ordenadas). Los tramos con un hueco mayor a
+`max_gap` no cuentan, y los que implican una velocidad imposible se cuentan
+como saltos del GPS.
+
+Uso:
+    python trajectory_analytics.py db --since 2025-10-01 --csv resumen.csv
+    python trajectory_analytics.py trace corrida.trace --daily-csv por_dia.csv
+    python trajectory_analytics.py benchmark --rows 50000000
+"""
+
+import argparse
+import csv
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from gps_fleet_engine import haversine_km
+from history_copy_generator import COPY_BINARY_HEADER, PG_EPOCH_US, TABLE
+from tracker_db import add_db_arguments, config_from_args, configure, connection
+
+DEFAULT_PASS_ROWS = 5_000_000
+DAY_US = 86_400 * 1_000_000
+
+# Filas de COPY binario de (AnimalId int4, Timestamp, Latitude float8, Longitude float8)
+COPY_ROW_DTYPE = np.dtype([
+    ("field_count", ">i2"),
+    ("animal_len", ">i4"), ("animal", ">i4"),
+    ("timestamp_len", ">i4"), ("timestamp", ">i8"),
+    ("lat_len", ">i4"), ("lat", ">f8"),
+    ("lng_len", ">i4"), ("lng", ">f8"),
+])
+# Bytes acumulados antes de convertir a arrays (COPY escribe una fila por llamada)
+COPY_PARSE_BYTES = 4 * 1024 * 1024
+
+# Una fila por (animal, dia)
+DAY_DTYPE = np.dtype([
+    ("animal", "<i8"), ("day", "<i8"), ("fixes", "<i8"), ("distance_km", "<f8"),
+    ("resting_s", "<f8"), ("grazing_s", "<f8"), ("walking_s", "<f8"), ("gap_s", "<f8"),
+    ("max_speed_kmh", "<f8"), ("glitches", "<i8"), ("first_us", "<i8"), ("last_us", "<i8"),
+])
+# Columnas que se suman al agrupar (el resto: max, min o primero)
+_SUM_FIELDS = ("fixes", "distance_km", "resting_s", "grazing_s", "walking_s", "gap_s", "glitches")
+
+
+@dataclass
+class ActivityThresholds:
+    # Limites de velocidad del tramo (km/h), como los perfiles rest/graze/walk del emulador
+    rest_max_kmh: float = 0.1
+    graze_max_kmh: float = 0.5
+    # Tramos mas largos que esto son huecos sin datos (no suman distancia ni tiempo)
+    max_gap_seconds: float = 600.0
+    # Por encima de esto el tramo es un salto del GPS, no movimiento
+    max_plausible_kmh: float = 60.0
+    # Desfase de la hora local para cortar los dias (Argentina: -3)
+    utc_offset_hours: float = 0.0
+
+
+@dataclass
+class Pass:
+    """Lecturas de un rango de animales completos (una entrada por fila)"""
+    animal: np.ndarray
+    timestamp_us: np.ndarray
+    lat: np.ndarray
+    lng: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.timestamp_us)
+
+
+def plan_passes(keys: Sequence[int], counts: Sequence[int], pass_rows: int) -> List[Tuple[int, int, int]]:
+    """Rangos contiguos de claves (primera, ultima, filas) de hasta `pass_rows` filas
+
+    Un animal nunca se parte entre pasadas; si solo el ya supera `pass_rows`, va solo.
+    """
+    passes = []
+    first = last = None
+    rows = 0
+    for key, count in zip(keys, counts):
+        if first is not None and rows + count > pass_rows:
+            passes.append((first, last, rows))
+            first, rows = None, 0
+        if first is None:
+            first = key
+        last = key
+        rows += count
+    if first is not None:
+        passes.append((first, last, rows))
+    return passes
+
+
+def _group_reduce(ufunc, values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    return ufunc.reduceat(values, starts) if len(values) else values[:0]
+
+
+def daily_metrics(data: Pass, thresholds: Optional[ActivityThresholds] = None) -> np.ndarray:
+    """Metricas por (animal, dia) de una pasada (array estructurado DAY_DTYPE)"""
+    t = thresholds or ActivityThresholds()
+    n = len(data)
+    if n == 0:
+        return np.empty(0, DAY_DTYPE)
+
+    animal, ts, lat, lng = data.animal, data.timestamp_us, data.lat, data.lng
+    if np.any((animal[1:] < animal[:-1]) | ((animal[1:] == animal[:-1]) & (ts[1:] < ts[:-1]))):
+        order = np.lexsort((ts, animal))
+        animal, ts, lat, lng = animal[order], ts[order], lat[order], lng[order]
+
+    day = (ts + int(t.utc_offset_hours * 3600 * 1_000_000)) // DAY_US
+    same_animal = animal[1:] == animal[:-1]
+    starts = np.flatnonzero(np.concatenate(([True], ~same_animal | (day[1:] != day[:-1]))))
+
+    # Tramo i: de la lectura i a la i+1 (se asigna al dia de la lectura i)
+    dt = np.diff(ts) / 1_000_000
+    distance = haversine_km(lat[:-1], lng[:-1], lat[1:], lng[1:])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed = np.where(dt > 0, distance / dt * 3600, 0.0)
+    counted = same_animal & (dt > 0) & (dt <= t.max_gap_seconds)
+    glitch = counted & (speed > t.max_plausible_kmh)
+    counted &= ~glitch
+    gap = same_animal & (dt > t.max_gap_seconds)
+
+    seconds = np.where(counted, dt, 0.0)
+    resting = speed < t.rest_max_kmh
+    walking = speed >= t.graze_max_kmh
+
+    def per_row(values) -> np.ndarray:
+        # La ultima lectura no empieza ningun tramo
+        return np.append(values, 0)
+
+    result = np.empty(len(starts), DAY_DTYPE)
+    result["animal"] = animal[starts]
+    result["day"] = day[starts]
+    result["fixes"] = np.diff(np.append(starts, n))
+    result["distance_km"] = _group_reduce(np.add, per_row(np.where(counted, distance, 0.0)), starts)
+    result["resting_s"] = _group_reduce(np.add, per_row(np.where(resting, seconds, 0.0)), starts)
+    result["walking_s"] = _group_reduce(np.add, per_row(np.where(walking, seconds, 0.0)), starts)
+    result["grazing_s"] = (_group_reduce(np.add, per_row(seconds), starts)
+                           - result["resting_s"] - result["walking_s"])
+    result["gap_s"] = _group_reduce(np.add, per_row(np.where(gap, dt, 0.0)), starts)
+    result["max_speed_kmh"] = _group_reduce(np.maximum, per_row(np.where(counted, speed, 0.0)), starts)
+    result["glitches"] = _group_reduce(np.add, per_row(glitch.astype(np.int64)), starts)
+    result["first_us"] = ts[starts]
+    result["last_us"] = ts[np.append(starts[1:], n) - 1]
+    return result
+
+
+def animal_summary(days: np.ndarray) -> np.ndarray:
+    """Totales por animal a partir de las filas por dia ("day" pasa a ser la cantidad de dias)"""
+    if not len(days):
+        return days
+    days = days[np.lexsort((days["day"], days["animal"]))]
+    starts = np.flatnonzero(np.concatenate(([True], days["animal"][1:] != days["animal"][:-1])))
+    result = np.empty(len(starts), DAY_DTYPE)
+    result["animal"] = days["animal"][starts]
+    result["day"] = np.diff(np.append(starts, len(days)))
+    for name in _SUM_FIELDS:
+        result[name] = np.add.reduceat(days[name], starts)
+    result["max_speed_kmh"] = np.maximum.reduceat(days["max_speed_kmh"], starts)
+    result["first_us"] = np.minimum.reduceat(days["first_us"], starts)
+    result["last_us"] = np.maximum.reduceat(days["last_us"], starts)
+    return result
+
+
+def analyze(passes: Iterator[Pass], thresholds: Optional[ActivityThresholds] = None,
+            progress: Optional[Callable[[int, float], None]] = None) -> np.ndarray:
+    """Filas por (animal, dia) de todas las pasadas"""
+    results = []
+    for data in passes:
+        start = time.perf_counter()
+        results.append(daily_metrics(data, thresholds))
+        if progress is not None:
+            progress(len(data), time.perf_counter() - start)
+    return np.concatenate(results) if results else np.empty(0, DAY_DTYPE)
+
+
+# --- Fuente: PostgreSQL ---
+
+class CopyBinarySink:
+    """Objeto tipo archivo para cursor.copy_expert(COPY ... TO STDOUT (FORMAT binary))
+
+    Acumula los bytes y los convierte por bloques con np.frombuffer. Con
+    `consume` cada bloque se entrega al llegar (como Pass) en lugar de guardarse.
+    """
+
+    def __init__(self, consume: Optional[Callable[[Pass], None]] = None):
+        self._buffer = bytearray()
+        self._header_done = False
+        self._chunks: List[np.ndarray] = []
+        self._consume = consume
+
+    def write(self, data) -> int:
+        self._buffer += data
+        if len(self._buffer) >= COPY_PARSE_BYTES:
+            self._parse()
+        return len(data)
+
+    def _parse(self):
+        if not self._header_done:
+            fixed = len(COPY_BINARY_HEADER)
+            if len(self._buffer) < fixed:
+                return
+            if bytes(self._buffer[:11]) != COPY_BINARY_HEADER[:11]:
+                raise ValueError("El stream no es COPY binario")
+            extension = int.from_bytes(self._buffer[fixed - 4:fixed], "big")
+            del self._buffer[:fixed + extension]
+            self._header_done = True
+        rows = len(self._buffer) // COPY_ROW_DTYPE.itemsize
+        if rows:
+            size = rows * COPY_ROW_DTYPE.itemsize
+            block = np.frombuffer(bytes(self._buffer[:size]), dtype=COPY_ROW_DTYPE)
+            if np.any(block["field_count"] != 4) or np.any(block["lat_len"] != 8) or np.any(block["lng_len"] != 8):
+                raise ValueError("Fila COPY inesperada (campos nulos o tipos distintos)")
+            if self._consume is not None:
+                self._consume(_copy_rows_to_pass(block))
+            else:
+                self._chunks.append(block)
+            del self._buffer[:size]
+
+    def result(self) -> Pass:
+        self._parse()
+        if self._buffer not in (bytearray(), bytearray(b"\xff\xff")):
+            raise ValueError("Quedaron bytes sin procesar al final del COPY")
+        return _copy_rows_to_pass(np.concatenate(self._chunks) if self._chunks else np.empty(0, COPY_ROW_DTYPE))
+
+
+def _copy_rows_to_pass(rows: np.ndarray) -> Pass:
+    return Pass(rows["animal"].astype(np.int64), rows["timestamp"].astype(np.int64) + PG_EPOCH_US,
+                rows["lat"].astype(np.float64), rows["lng"].astype(np.float64))
+
+
+def _time_filter(since: Optional[str], until: Optional[str]) -> Tuple[str, tuple]:
+    clauses, params = ['"AnimalId" IS NOT NULL'], ()
+    if since:
+        clauses.append('"Timestamp" >= %s')
+        params += (since,)
+    if until:
+        clauses.append('"Timestamp" < %s')
+        params += (until,)
+    return " AND ".join(clauses), params
+
+
+def db_passes(pass_rows: int = DEFAULT_PASS_ROWS, since: Optional[str] = None, until: Optional[str] = None,
+              animal_ids: Optional[Sequence[int]] = None) -> Tuple[List[Tuple[int, int, int]], Callable]:
+    """Plan de pasadas por rango de AnimalId y la funcion que trae cada una"""
+    where, params = _time_filter(since, until)
+    if animal_ids:
+        where += ' AND "AnimalId" = ANY(%s)'
+        params += (list(animal_ids),)
+
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(f'SELECT "AnimalId", COUNT(*) FROM {TABLE} WHERE {where} '
+                    f'GROUP BY "AnimalId" ORDER BY "AnimalId"', params)
+        counts = cur.fetchall()
+    plan = plan_passes([row[0] for row in counts], [row[1] for row in counts], pass_rows)
+
+    def fetch(first: int, last: int) -> Pass:
+        with connection() as conn, conn.cursor() as cur:
+            query = cur.mogrify(
+                f'SELECT "AnimalId", "Timestamp", "Latitude", "Longitude" FROM {TABLE} '
+                f'WHERE {where} AND "AnimalId" BETWEEN %s AND %s ORDER BY "AnimalId", "Timestamp"',
+                params + (first, last)).decode("utf-8")
+            sink = CopyBinarySink()
+            cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT binary)", sink, size=1024 * 1024)
+        return sink.result()
+
+    return plan, fetch
+
+
+def db_animal_labels(animal_ids: Sequence[int]) -> Dict[int, str]:
+    """Tag (o nombre) de cada animal para la tabla"""
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute('SELECT "Id", COALESCE("Tag", "Name") FROM "Animals" WHERE "Id" = ANY(%s)',
+                    ([int(i) for i in animal_ids],))
+        return dict(cur.fetchall())
+
+
+# --- Fuente: traza grabada ---
+
+def trace_passes(path: str, pass_rows: int = DEFAULT_PASS_ROWS) -> Tuple[List[Tuple[int, int, int]], Callable,
+                                                                            List[str]]:
+    """Plan de pasadas por rango de dispositivo de una traza (una lectura completa del archivo por pasada)"""
+    from trajectory_trace import read_trace
+
+    counts = np.zeros(0, dtype=np.int64)
+    device_ids: List[str] = []
+    for block in read_trace(path):
+        device_ids = block.device_ids
+        block_counts = np.bincount(block.devices, minlength=len(device_ids))
+        counts = np.pad(counts, (0, len(block_counts) - len(counts))) + block_counts
+    present = np.flatnonzero(counts)
+    plan = plan_passes(present.tolist(), counts[present].tolist(), pass_rows)
+
+    def fetch(first: int, last: int) -> Pass:
+        parts = []
+        for block in read_trace(path):
+            selected = (block.devices >= first) & (block.devices <= last)
+            if selected.any():
+                parts.append((block.devices[selected].astype(np.int64), block.timestamps[selected],
+                              block.columns["latitude"][selected], block.columns["longitude"][selected]))
+        if not parts:
+            return Pass(*(np.empty(0, dtype) for dtype in (np.int64, np.int64, np.float64, np.float64)))
+        return Pass(*(np.concatenate(column) for column in zip(*parts)))
+
+    return plan, fetch, device_ids
+
+
+# --- Fuente: datos sinteticos (benchmark) ---
+
+def synthetic_pass(first_animal: int, animals: int, fixes: int, rng: np.random.Generator,
+                   interval: float = 20.0, start_us: int = 1_735_689_600_000_000) -> Pass:
+    """Caminatas al azar ya ordenadas por (animal, timestamp), mezcla de descanso/pastoreo/caminata"""
+    speed_kmh = np.choose(rng.choice(3, size=(animals, fixes), p=(0.1, 0.6, 0.3)),
+                          [rng.uniform(0, 0.1, (animals, fixes)), rng.uniform(0, 0.5, (animals, fixes)),
+                           rng.uniform(0.5, 2.5, (animals, fixes))])
+    heading = rng.uniform(0, 2 * np.pi, (animals, fixes))
+    step_deg = speed_kmh * interval / 3600 / 111.32
+    lat = -33.0167 + np.cumsum(step_deg * np.cos(heading), axis=1)
+    lng = -58.5167 + np.cumsum(step_deg * np.sin(heading) / np.cos(np.radians(33.0167)), axis=1)
+    ts = start_us + (np.arange(fixes, dtype=np.int64) * int(interval * 1_000_000))[None, :] \
+        + rng.integers(0, 1_000_000, (animals, 1))
+    animal = np.repeat(np.arange(first_animal, first_animal + animals, dtype=np.int64), fixes)
+    return Pass(animal, ts.ravel(), lat.ravel(), lng.ravel())
+
+
+# --- Salida ---
+
+SUMMARY_HEADERS = ["animal", "dias", "lecturas", "km", "km_por_dia", "descanso_h", "pastoreo_h",
+                   "caminata_h", "huecos_h", "vel_max_kmh", "saltos_gps", "desde", "hasta"]
+DAILY_HEADERS = ["animal", "dia", "lecturas", "km", "descanso_h", "pastoreo_h", "caminata_h",
+                 "huecos_h", "vel_max_kmh", "saltos_gps"]
+
+
+def _iso(timestamp_us: int) -> str:
+    return str(np.datetime64(int(timestamp_us), "us").astype("datetime64[s]"))
+
+
+def summary_rows(summary: np.ndarray, labels: Dict[int, str]) -> List[list]:
+    rows = []
+    for row in summary.tolist():
+        animal, days, fixes, km, rest, graze, walk, gap, vmax, glitches, first_us, last_us = row
+        rows.append([labels.get(animal, animal), days, fixes, round(km, 3), round(km / max(days, 1), 3),
+                     round(rest / 3600, 2), round(graze / 3600, 2), round(walk / 3600, 2), round(gap / 3600, 2),
+                     round(vmax, 2), glitches, _iso(first_us), _iso(last_us)])
+    return rows
+
+
+def daily_rows(days: np.ndarray, labels: Dict[int, str]) -> List[list]:
+    rows = []
+    for row in np.sort(days, order=["animal", "day"]).tolist():
+        animal, day, fixes, km, rest, graze, walk, gap, vmax, glitches, _, _ = row
+        rows.append([labels.get(animal, animal), str(np.datetime64(day, "D")), fixes, round(km, 3),
+                     round(rest / 3600, 2), round(graze / 3600, 2), round(walk / 3600, 2), round(gap / 3600, 2),
+                     round(vmax, 2), glitches])
+    return rows
+
+
+def write_csv(path: str, headers: List[str], rows: List[list]):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        writer.writerows(rows)
+
+
+def print_summary(summary: np.ndarray, labels: Dict[int, str], limit: int = 20):
+    rows = summary_rows(summary, labels)
+    print(f"{'Animal':<16} {'dias':>4} {'lecturas':>10} {'km':>9} {'km/dia':>7} {'descanso h':>10} "
+          f"{'pastoreo h':>10} {'caminata h':>10} {'vmax km/h':>9}")
+    for row in rows[:limit]:
+        print(f"{str(row[0]):<16} {row[1]:>4} {row[2]:>10,} {row[3]:>9.2f} {row[4]:>7.2f} {row[5]:>10.1f} "
+              f"{row[6]:>10.1f} {row[7]:>10.1f} {row[9]:>9.2f}")
+    if len(rows) > limit:
+        print(f"... y {len(rows) - limit} animales mas (ver --csv)")
+
+
+class Progress:
+    def __init__(self, total_rows: int):
+        self.total_rows = total_rows
+        self.rows = 0
+        self.compute = 0.0
+        self.start = time.monotonic()
+
+    def __call__(self, rows: int, compute_seconds: float):
+        self.rows += rows
+        self.compute += compute_seconds
+        elapsed = time.monotonic() - self.start
+        print(f"  {self.rows:,}/{self.total_rows:,} filas ({self.rows / max(elapsed, 1e-9):,.0f}/s en total, "
+              f"calculo {self.rows / max(self.compute, 1e-9):,.0f}/s)", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distancia, pastoreo/descanso y velocidad maxima por animal")
+    parser.add_argument("--pass-rows", type=int, default=DEFAULT_PASS_ROWS, help="Filas maximas por pasada")
+    parser.add_argument("--max-gap", type=float, default=ActivityThresholds.max_gap_seconds,
+                        help="Segundos sin lecturas a partir de los cuales el tramo es un hueco")
+    parser.add_argument("--utc-offset", type=float, default=0.0,
+                        help="Horas de desfase para cortar los dias (Argentina: -3)")
+    parser.add_argument("--csv", default=None, help="CSV con el resumen por animal")
+    parser.add_argument("--daily-csv", default=None, help="CSV con una fila por animal y dia")
+    parser.add_argument("--limit", type=int, default=20, help="Animales a mostrar en pantalla")
+    subparsers = parser.add_subparsers(dest="source", required=True)
+
+    db = subparsers.add_parser("db", help="Lee LocationHistories de PostgreSQL")
+    db.add_argument("--since", default=None, help="Fecha/hora ISO desde (inclusive)")
+    db.add_argument("--until", default=None, help="Fecha/hora ISO hasta (exclusive)")
+    db.add_argument("--animal", type=int, action="append", help="Solo estos AnimalId (repetible)")
+    add_db_arguments(db)
+
+    trace = subparsers.add_parser("trace", help="Lee una traza de trajectory_trace.py")
+    trace.add_argument("path", help="Archivo de traza")
+
+    benchmark = subparsers.add_parser("benchmark", help="Datos sinteticos en memoria (mide solo el calculo)")
+    benchmark.add_argument("--rows", type=int, default=50_000_000, help="Filas totales")
+    benchmark.add_argument("--animals", type=int, default=1000, help="Animales")
+    benchmark.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    thresholds = ActivityThresholds(max_gap_seconds=args.max_gap, utc_offset_hours=args.utc_offset)
+    labels: Dict[int, str] = {}
+
+    if args.source == "db":
+        configure(config_from_args(args))
+        plan, fetch = db_passes(args.pass_rows, args.since, args.until, args.animal)
+    elif args.source == "trace":
+        plan, fetch, device_ids = trace_passes(args.path, args.pass_rows)
+        labels = dict(enumerate(device_ids))
+    else:
+        fixes = max(2, args.rows // args.animals)
+        per_pass = max(1, args.pass_rows // fixes)
+        rng = np.random.default_rng(args.seed)
+        plan = [(first, min(first + per_pass, args.animals) - 1, (min(first + per_pass, args.animals) - first) * fixes)
+                for first in range(0, args.animals, per_pass)]
+
+        def fetch(first: int, last: int) -> Pass:
+            return synthetic_pass(first, last - first + 1, fixes, rng)
+
+    total_rows = sum(rows for _, _, rows in plan)
+    print(f"{total_rows:,} lecturas en {len(plan)} pasadas de hasta {args.pass_rows:,} filas", file=sys.stderr)
+    start = time.monotonic()
+    progress = Progress(total_rows)
+    days = analyze((fetch(first, last) for first, last, _ in plan), thresholds, progress)
+    summary = animal_summary(days)
+    elapsed = time.monotonic() - start
+
+    if args.source == "db" and len(summary):
+        labels = db_animal_labels(summary["animal"].tolist())
+
+    print(f"\n{len(summary):,} animales, {len(days):,} animal-dias, {total_rows:,} lecturas en {elapsed:.1f}s")
+    print_summary(summary, labels, args.limit)
+    if args.csv:
+        write_csv(args.csv, SUMMARY_HEADERS, summary_rows(summary, labels))
+        print(f"Resumen por animal: {args.csv}")
+    if args.daily_csv:
+        write_csv(args.daily_csv, DAILY_HEADERS, daily_rows(days, labels))
+        print(f"Resumen por dia: {args.daily_csv}")
+
+
+if __name__ == "__main__":
+    main()
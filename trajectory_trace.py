@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Grabacion y reproduccion de trayectorias GPS
+Las lecturas se guardan en un archivo binario por columnas: bloques de hasta
+`block_rows` lecturas donde cada campo (timestamp, dispositivo, latitud, ...)
+es un array NumPy contiguo. Los deviceId se guardan una sola vez, como
+diccionario incremental, y cada lectura referencia su indice.
+
+Una corrida grabada se puede reenviar al API a velocidad real (1x), acelerada
+(Nx) o tan rapido como se pueda (--speed 0), para reproducir exactamente la
+misma carga al comparar versiones del API.
+
+Formato:
+  cabecera:  b"GPSTRACE" + version (uint16)
+  bloque:    b"BLK\\0" + filas (uint32) + deviceIds nuevos (uint32)
+             + cada deviceId nuevo (largo uint16 + UTF-8)
+             + una columna por campo de COLUMNS (little-endian)
+"""
+
+import argparse
+import asyncio
+import math
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from gps_transport import DEFAULT_API_BASE_URL, EMULATOR_NAMES, AsyncTrackerSender, create_emulator, create_sender
+from sim_clock import VirtualClock
+
+FILE_HEADER = struct.Struct("<8sH")
+BLOCK_HEADER = struct.Struct("<4sII")
+DEVICE_ID_LENGTH = struct.Struct("<H")
+MAGIC = b"GPSTRACE"
+BLOCK_MAGIC = b"BLK\0"
+VERSION = 1
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Campos del payload tracker-data -> tipo de la columna. Los campos que un
+# emulador no envia se guardan como NaN (floats) o -1 (enteros) y se omiten al reproducir.
+COLUMNS: List[Tuple[str, str]] = [
+    ("latitude", "<f8"),
+    ("longitude", "<f8"),
+    ("altitude", "<f8"),
+    ("speed", "<f8"),
+    ("heading", "<f8"),
+    ("accuracy", "<f8"),
+    ("temperature", "<f8"),
+    ("batteryLevel", "<i2"),
+    ("signalStrength", "<i2"),
+    ("activityLevel", "<i2"),
+]
+
+
+def timestamp_to_us(timestamp: str) -> int:
+    """ISO 8601 -> microsegundos desde epoch (exacto, sin pasar por float)"""
+    delta = datetime.fromisoformat(timestamp) - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def us_to_timestamp(timestamp_us: int) -> str:
+    return (EPOCH + timedelta(microseconds=timestamp_us)).isoformat()
+
+
+class TraceRecorder:
+    """Acumula lecturas por columnas y las escribe en bloques"""
+
+    def __init__(self, path: str, block_rows: int = 65536):
+        self.path = path
+        self.block_rows = block_rows
+        self.rows = 0
+        self._file = open(path, "wb")
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self._device_index: Dict[str, int] = {}
+        self._new_devices: List[str] = []
+        self._timestamps: List[int] = []
+        self._devices: List[int] = []
+        self._columns: Dict[str, list] = {name: [] for name, _ in COLUMNS}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record(self, payload: dict):
+        device_id = payload["deviceId"]
+        index = self._device_index.get(device_id)
+        if index is None:
+            index = self._device_index[device_id] = len(self._device_index)
+            self._new_devices.append(device_id)
+
+        self._timestamps.append(timestamp_to_us(payload["timestamp"]))
+        self._devices.append(index)
+        for name, dtype in COLUMNS:
+            missing = -1 if dtype == "<i2" else math.nan
+            self._columns[name].append(payload.get(name, missing))
+
+        if len(self._timestamps) >= self.block_rows:
+            self.flush()
+
+    def record_many(self, payloads: List[dict]):
+        for payload in payloads:
+            self.record(payload)
+
+    def flush(self):
+        rows = len(self._timestamps)
+        if not rows:
+            return
+
+        parts = [BLOCK_HEADER.pack(BLOCK_MAGIC, rows, len(self._new_devices))]
+        for device_id in self._new_devices:
+            encoded = device_id.encode("utf-8")
+            parts.append(DEVICE_ID_LENGTH.pack(len(encoded)) + encoded)
+        parts.append(np.asarray(self._timestamps, dtype="<i8").tobytes())
+        parts.append(np.asarray(self._devices, dtype="<u4").tobytes())
+        for name, dtype in COLUMNS:
+            parts.append(np.asarray(self._columns[name], dtype=dtype).tobytes())
+        self._file.write(b"".join(parts))
+
+        self.rows += rows
+        self._new_devices = []
+        self._timestamps = []
+        self._devices = []
+        self._columns = {name: [] for name, _ in COLUMNS}
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class TraceBlock:
+    """Un bloque leido: columnas NumPy y la tabla de deviceIds acumulada hasta el"""
+
+    def __init__(self, device_ids: List[str], timestamps: np.ndarray, devices: np.ndarray,
+                 columns: Dict[str, np.ndarray]):
+        self.device_ids = device_ids
+        self.timestamps = timestamps
+        self.devices = devices
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def payloads(self, start: int = 0, stop: Optional[int] = None,
+                 timestamp: Optional[str] = None) -> List[dict]:
+        """Payloads tracker-data de las filas [start, stop); `timestamp` reemplaza el grabado"""
+        stop = len(self) if stop is None else stop
+        values = {name: column[start:stop].tolist() for name, column in self.columns.items()}
+        devices = self.devices[start:stop].tolist()
+        timestamps = self.timestamps[start:stop].tolist()
+
+        payloads = []
+        for row in range(stop - start):
+            payload = {"deviceId": self.device_ids[devices[row]]}
+            for name, dtype in COLUMNS:
+                value = values[name][row]
+                if dtype == "<i2":
+                    if value >= 0:
+                        payload[name] = value
+                elif not math.isnan(value):
+                    payload[name] = value
+            payload["timestamp"] = timestamp or us_to_timestamp(timestamps[row])
+            payloads.append(payload)
+        return payloads
+
+
+def read_trace(path: str) -> Iterator[TraceBlock]:
+    """Lee el archivo bloque por bloque (la memoria depende del bloque, no del archivo)"""
+    device_ids: List[str] = []
+    with open(path, "rb") as f:
+        magic, version = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} no es una traza GPS valida")
+
+        while True:
+            header = f.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                break
+            block_magic, rows, new_devices = BLOCK_HEADER.unpack(header)
+            if block_magic != BLOCK_MAGIC:
+                raise ValueError(f"Bloque corrupto en {path}")
+
+            for _ in range(new_devices):
+                (length,) = DEVICE_ID_LENGTH.unpack(f.read(DEVICE_ID_LENGTH.size))
+                device_ids.append(f.read(length).decode("utf-8"))
+
+            timestamps = np.frombuffer(f.read(rows * 8), dtype="<i8")
+            devices = np.frombuffer(f.read(rows * 4), dtype="<u4")
+            columns = {}
+            for name, dtype in COLUMNS:
+                itemsize = np.dtype(dtype).itemsize
+                columns[name] = np.frombuffer(f.read(rows * itemsize), dtype=dtype)
+            yield TraceBlock(device_ids, timestamps, devices, columns)
+
+
+def iter_payloads(path: str) -> Iterator[dict]:
+    for block in read_trace(path):
+        yield from block.payloads()
+
+
+async def replay_trace(path: str, sender: AsyncTrackerSender, speed: float = 1.0,
+                       restamp: bool = False) -> Tuple[int, float]:
+    """Reenvia la traza respetando la separacion entre lecturas dividida por `speed`
+
+    speed=0 envia lo mas rapido posible. Con `restamp` cada lectura lleva la hora
+    en que se envia en lugar de la grabada. Devuelve (lecturas, segundos).
+    """
+    pending = set()
+    first_us = None
+    start = time.monotonic()
+    total = 0
+
+    async with sender:
+        for block in read_trace(path):
+            if first_us is None and len(block):
+                first_us = int(block.timestamps[0])
+
+            # Grupos de lecturas consecutivas con el mismo timestamp (una iteracion del emulador)
+            edges = np.flatnonzero(np.diff(block.timestamps)) + 1
+            bounds = np.concatenate(([0], edges, [len(block)])).tolist()
+
+            for group_start, group_stop in zip(bounds[:-1], bounds[1:]):
+                if speed > 0:
+                    due = start + (int(block.timestamps[group_start]) - first_us) / 1_000_000 / speed
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                timestamp = datetime.now(timezone.utc).isoformat() if restamp else None
+                payloads = block.payloads(group_start, group_stop, timestamp)
+                total += len(payloads)
+
+                if speed > 0:
+                    task = asyncio.ensure_future(sender.send_many(payloads))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                else:
+                    await sender.send_many(payloads)
+
+        if pending:
+            await asyncio.wait(pending)
+
+    return total, time.monotonic() - start
+
+
+def record_emulator(name: str, path: str, ticks: int, interval: float, seed: Optional[int],
+                    start: Optional[datetime] = None) -> int:
+    """Graba `ticks` iteraciones de un emulador sin enviarlas, con reloj simulado cada `interval` segundos"""
+    clock = VirtualClock(start, speed=0)
+    emulator = create_emulator(name, DEFAULT_API_BASE_URL, seed, clock)
+
+    with TraceRecorder(path) as recorder:
+        for _ in range(ticks):
+            recorder.record_many(emulator.generate_readings())
+            clock.sleep(interval)
+    return recorder.rows
+
+
+def print_info(path: str):
+    rows = 0
+    first_us = last_us = None
+    device_count = 0
+    for block in read_trace(path):
+        if not len(block):
+            continue
+        rows += len(block)
+        device_count = len(block.device_ids)
+        block_min, block_max = int(block.timestamps.min()), int(block.timestamps.max())
+        first_us = block_min if first_us is None else min(first_us, block_min)
+        last_us = block_max if last_us is None else max(last_us, block_max)
+
+    print(f"Lecturas: {rows:,}")
+    print(f"Dispositivos: {device_count:,}")
+    if rows:
+        print(f"Desde: {us_to_timestamp(first_us)}")
+        print(f"Hasta: {us_to_timestamp(last_us)}")
+        print(f"Duracion: {(last_us - first_us) / 1_000_000:,.0f} segundos")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Graba y reproduce trayectorias GPS")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record = subparsers.add_parser("record", help="Graba un emulador sin enviar al API")
+    record.add_argument("path", help="Archivo de traza a crear")
+    record.add_argument("--emulator", choices=EMULATOR_NAMES, default="10cows")
+    record.add_argument("--ticks", type=int, default=180, help="Iteraciones a grabar")
+    record.add_argument("--interval", type=float, default=20.0, help="Segundos simulados entre iteraciones")
+    record.add_argument("--seed", type=int, default=None, help="Semilla para trayectorias reproducibles")
+    record.add_argument("--start", default=None, help="Fecha/hora ISO de la primera lectura (default: ahora)")
+
+    replay = subparsers.add_parser("replay", help="Reenvia una traza al API")
+    replay.add_argument("path", help="Archivo de traza")
+    replay.add_argument("--api", default=DEFAULT_API_BASE_URL, help="URL base del API")
+    replay.add_argument("--speed", type=float, default=1.0,
+                        help="Multiplicador de velocidad (1 = tiempo real, 0 = lo mas rapido posible)")
+    replay.add_argument("--concurrency", type=int, default=100, help="Envios simultaneos maximos")
+    replay.add_argument("--batch-size", type=int, default=0,
+                        help="Lecturas por lote a /tracker-data/batch (0 = una lectura por request)")
+    replay.add_argument("--restamp", action="store_true",
+                        help="Usar la hora de envio como timestamp en lugar de la grabada")
+
+    info = subparsers.add_parser("info", help="Resumen de una traza")
+    info.add_argument("path", help="Archivo de traza")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        start = datetime.fromisoformat(args.start) if args.start else None
+        rows = record_emulator(args.emulator, args.path, args.ticks, args.interval, args.seed, start)
+        print(f"Grabadas {rows:,} lecturas en {args.path}")
+    elif args.command == "info":
+        print_info(args.path)
+    else:
+        sender = create_sender(args.api, args.concurrency, args.batch_size)
+        try:
+            total, elapsed = asyncio.run(replay_trace(args.path, sender, args.speed, args.restamp))
+            print(f"Reproducidas {total:,} lecturas en {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f}/s)")
+        except KeyboardInterrupt:
+            print("\nReproduccion detenida por el usuario")
+        print(f"Enviadas: {sender.sent} | Fallidas: {sender.failed}")
+
+
+if __name__ == "__main__":
+    main()